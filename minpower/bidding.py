@@ -3,7 +3,6 @@ from commonscripts import update_attributes, pairwise
 from optimization import value, OptimizationObject
 from config import user_config
 import re
-from pyomo.environ import Piecewise
 
 
 class Bid(OptimizationObject):
@@ -56,7 +55,7 @@ class Bid(OptimizationObject):
             in_pts = dict(
                 (t, self.discrete_input_points) for t in self.times.set)
 
-            pw_representation = Piecewise(
+            pw_representation = self._parent_problem()._backend.Piecewise(
                 self.times.set,
                 self.get_variable('cost', time=None, indexed=True),
                 self.input_variable(),
@@ -84,7 +83,7 @@ class Bid(OptimizationObject):
                 # see coopr/examples/pyomo/piecewise/example3.py
                 return mapping[input_var]
 
-            pw_representation = Piecewise(self.times.set,
+            pw_representation = self._parent_problem()._backend.Piecewise(self.times.set,
                                           self.get_variable(
                                               'cost', time=None, indexed=True),
                                           self.input_variable(),
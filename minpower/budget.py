@@ -0,0 +1,79 @@
+"""
+Share a solver time budget between the stages of a rolling UC
+(see `user_config.solver_time_budget`).
+
+Each stage gets the MIP gap and the solver time limit given by
+:func:`stage_limits`, based on the budget which remains and on how long
+the stages so far have taken to solve. Easy stages leave more time for
+the hard ones. When the stages are slower than the budget allows, the
+gap is loosened (up to `user_config.mipgap_max`).
+"""
+import logging
+import numpy as np
+from config import user_config
+
+# the number of recent stages used to estimate a stage's solve time
+history_length = 5
+
+# a stage may use this many times its share of the remaining budget
+share_multiplier = 2.0
+
+# the smallest time limit, as a fraction of the share of the whole budget
+min_time_fraction = 0.1
+
+
+def stage_limits(stage, n_stages, solve_times, mipgaps,
+                 budget=None, mipgap=None, mipgap_max=None):
+    '''
+    Get the MIP gap and the solver time limit for a stage.
+
+    The stage's share of the budget is the remaining budget
+    split evenly over the remaining stages. Its time limit is
+    `share_multiplier` times that share.
+    The gap goes from `mipgap` (when recent stages took at most half
+    their share) to `mipgap_max` (when they took at least twice their
+    share), geometrically in between. Stages which ended with a gap
+    above `mipgap_max` were stopped by their time limit and count as
+    taking twice their share.
+    (With a `mipgap` of zero the gap goes linearly up to `mipgap_max`.)
+
+    :param stage: the number of the stage (from zero)
+    :param n_stages: the number of stages
+    :param solve_times: the solve times of the stages so far
+    :param mipgaps: the gaps of the stages so far
+    :returns: the MIP gap and the time limit (in seconds)
+    '''
+    if budget is None:
+        budget = user_config.solver_time_budget
+    if mipgap is None:
+        mipgap = user_config.mipgap
+    if mipgap_max is None:
+        mipgap_max = max(user_config.mipgap_max, mipgap)
+
+    solve_times = _finite(solve_times)
+    remaining = budget - solve_times.sum()
+    share = remaining / max(n_stages - stage, 1)
+    min_time = min_time_fraction * budget / n_stages
+    if share <= min_time:
+        logging.warning('the solver time budget is used up')
+        return mipgap_max, min_time
+
+    time_limit = min(share_multiplier * share, remaining)
+    recent_times = solve_times[-history_length:]
+    if not len(recent_times):
+        return mipgap, time_limit
+
+    pace = recent_times.mean() / share
+    recent_gaps = _finite(mipgaps)[-history_length:]
+    if (recent_gaps > mipgap_max).any():
+        pace = max(pace, 2.0)
+    fraction = np.clip((np.log2(max(pace, 0.5)) + 1) / 2.0, 0, 1)
+    if mipgap <= 0:
+        return fraction * mipgap_max, time_limit
+    return mipgap * (mipgap_max / mipgap) ** fraction, time_limit
+
+
+def _finite(values):
+    values = np.array([np.nan if v is None else v for v in values],
+                      dtype=float)
+    return values[np.isfinite(values)]
@@ -0,0 +1,170 @@
+"""
+Clustered unit commitment (see `user_config.cluster_units`).
+Identical units at a bus are modeled as one
+:class:`~generators.Generator_Cluster`, with an integer commitment.
+With linear costs and no ramp limits the cluster is an exact model of
+its units. The cluster's solution is split back among its units,
+for the results and for the next stage's initial conditions.
+"""
+import numpy as np
+import pandas as pd
+
+import bidding
+from generators import Generator, Generator_Cluster
+
+# the parameters which make units identical
+# (along with their bus and cost curve)
+cluster_parameters = ['pmin', 'pmax', 'minuptime', 'mindowntime',
+                      'startupcost', 'shutdowncost', 'mustrun']
+
+
+def can_cluster(gen):
+    '''
+    can a unit be part of a cluster: a (controllable) generator with
+    a linear cost curve, no ramp limits and no fast start
+    '''
+    return type(gen) is Generator and gen.bid_points is None and \
+        bidding.is_linear(gen.cost_coeffs) and \
+        gen.rampratemax is None and gen.rampratemin is None and \
+        not gen.faststart
+
+
+def cluster_key(gen):
+    return (gen.bus, tuple(gen.cost_coeffs)) + \
+        tuple(getattr(gen, name) for name in cluster_parameters)
+
+
+def cluster_generators(generators):
+    '''
+    Group the identical units into clusters.
+    Returns the list of :class:`~generators.Generator_Cluster` objects
+    (for the groups of more than one unit).
+    '''
+    groups = dict()
+    keys = []
+    for gen in filter(can_cluster, generators):
+        key = cluster_key(gen)
+        if key not in groups:
+            groups[key] = []
+            keys.append(key)
+        groups[key].append(gen)
+    shared = [k for k in keys if len(groups[k]) > 1]
+    return [Generator_Cluster(groups[k], index=i)
+            for i, k in enumerate(shared)]
+
+
+def replace_members(generators, clusters):
+    '''the generators, with each cluster in place of its units'''
+    clustered = dict()
+    for cluster in clusters:
+        for gen in cluster.members:
+            clustered[gen] = cluster
+    out, added = [], set()
+    for gen in generators:
+        gen = clustered.get(gen, gen)
+        if gen not in added:
+            added.add(gen)
+            out.append(gen)
+    return out
+
+
+def split_commitment(count, initial_status, initial_hours, intervalhrs):
+    '''
+    Split a cluster's commitment (the number of units on at each time)
+    among its units. The units which have been off (on) longest are
+    started (shut down) first, so the units keep to their min up and
+    down times when the cluster does.
+    Returns an array of the status (times by units).
+    '''
+    on = np.asarray(initial_status) == 1
+    hours = np.array(initial_hours, dtype=float)
+    status = np.zeros((len(count), len(on)), dtype=int)
+    for t, n in enumerate(count):
+        change = n - on.sum()
+        if change != 0:
+            starting = change > 0
+            candidates = np.flatnonzero(on != starting)
+            longest = candidates[np.argsort(
+                -hours[candidates], kind='mergesort')][:abs(change)]
+            on[longest] = starting
+            hours[longest] = 0
+        hours += intervalhrs
+        status[t] = on
+    return status
+
+
+def _replace_columns(df, clusters, unit_columns):
+    '''replace each cluster's column of `df` with its units' columns'''
+    columns = dict((name, [name]) for name in df.columns)
+    for cluster in clusters:
+        columns[str(cluster)] = [str(gen) for gen in cluster.members]
+    order = [unit for name in df.columns for unit in columns[name]]
+    return pd.concat([df, pd.DataFrame(unit_columns, index=df.index)],
+                     axis=1)[order]
+
+
+def disaggregate(clusters, power, status, intervalhrs):
+    '''
+    Replace the clusters' columns of the `power` and `status` DataFrames
+    (of times by generator name) with columns for their units.
+    The power of a cluster is shared equally by its units which are on.
+    '''
+    if not clusters:
+        return power, status
+    unit_power, unit_status = {}, {}
+    for cluster in clusters:
+        name = str(cluster)
+        on = split_commitment(
+            np.round(status[name].values).astype(int),
+            [gen.initial_status for gen in cluster.members],
+            [gen.initial_status_hours for gen in cluster.members],
+            intervalhrs)
+        share = power[name].values / np.maximum(on.sum(axis=1), 1)
+        for k, gen in enumerate(cluster.members):
+            unit_status[str(gen)] = on[:, k]
+            unit_power[str(gen)] = on[:, k] * share
+    return _replace_columns(power, clusters, unit_power), \
+        _replace_columns(status, clusters, unit_status)
+
+
+def disaggregate_costs(clusters, status, totalcost, fuelcost, incremental):
+    '''
+    Replace the clusters' columns of the cost DataFrames with columns
+    for their units, given the units' `status` (from :func:`disaggregate`).
+    The operating cost of a cluster is shared equally by its units which
+    are on and the startup and shutdown costs go to the units which
+    start up and shut down.
+    '''
+    if not clusters:
+        return totalcost, fuelcost, incremental
+    unit_total, unit_fuel, unit_incremental = {}, {}, {}
+    for cluster in clusters:
+        name = str(cluster)
+        names = [str(gen) for gen in cluster.members]
+        on = status[names].values
+        previous = np.vstack([
+            [gen.initial_status for gen in cluster.members], on[:-1]])
+        started, stopped = (on > previous), (on < previous)
+        share = fuelcost[name].values / np.maximum(on.sum(axis=1), 1)
+        for k, unit in enumerate(names):
+            unit_fuel[unit] = on[:, k] * share
+            unit_total[unit] = unit_fuel[unit] + \
+                cluster.startupcost * started[:, k] + \
+                cluster.shutdowncost * stopped[:, k]
+            unit_incremental[unit] = incremental[name].where(on[:, k] == 1)
+    return _replace_columns(totalcost, clusters, unit_total), \
+        _replace_columns(fuelcost, clusters, unit_fuel), \
+        _replace_columns(incremental, clusters, unit_incremental)
+
+
+def aggregate(clusters, power, status):
+    '''add the clusters' columns (the totals of their units) to `power` and `status`'''
+    if not clusters:
+        return power, status
+    power, status = power.copy(), status.copy()
+    for cluster in clusters:
+        names = [str(gen) for gen in cluster.members]
+        if all(name in status for name in names):
+            power[str(cluster)] = power[names].sum(axis=1)
+            status[str(cluster)] = status[names].sum(axis=1)
+    return power, status
@@ -21,23 +21,45 @@ option_types = dict(
     breakpoints=int,
     hours_commitment=int,
     hours_overlap=int,
+    reuse_stage_model=bool,
 
     cost_load_shedding=float,
     cost_wind_shedding=float,
     economic_wind_shed=bool,
+    elastic_shedding=bool,
+    shedding_slacks=bool,
     dispatch_decommit_allowed=bool,
     solver=str,
     mipgap=float,
     solver_time_limit=float,
+    solver_time_budget=float,
+    mipgap_max=float,
+    warm_start=bool,
+    solver_race=str,
+    solver_io=str,
+    model_backend=str,
+    indexed_constraints=bool,
+    updown_formulation=str,
+    ramp_formulation=str,
+    network_formulation=str,
+    network_reduction=bool,
+    aggregate_noncontrollable=bool,
+    cluster_units=bool,
+    presolve=bool,
+    contingencies=bool,
+    contingency_threads=int,
 
     reserve_fixed=float,
     reserve_load_fraction=float,
 
     faststart_resolve=bool,
+    fast_resolve=bool,
 
     visualization=bool,
     logging_level=int,
     problem_file=bool,
+    problem_file_format=str,
+    problem_file_gzip=bool,
     output_prefix=bool,
     debugger=bool,
 
@@ -203,12 +225,46 @@ def setup_parser_args(parser):
             help='number hours per commitment in a rolling UC (exclusive of overlap)')
     add_opt(parser, 'hours_overlap', '-o',
             help='number hours to overlap commitments in a rolling UC')
+    add_opt(parser, 'reuse_stage_model',
+            help='keep the first stage model of a rolling UC and only update its parameters in later stages')
 
     solver_opt = parser.add_argument_group('Solver options')
     add_opt(solver_opt, 'mipgap',
             help='the MIP gap solution tolerence')
     add_opt(solver_opt, 'solver_time_limit',
             help='the MIP solver time limit (in seconds)')
+    add_opt(solver_opt, 'solver_time_budget',
+            help='the total solver time for all stages of a rolling UC (in seconds) - each stage\'s time limit and MIP gap are set from the remaining budget and the solve times of the stages so far')
+    add_opt(solver_opt, 'mipgap_max',
+            help='the loosest MIP gap used when stages are solving slower than the solver time budget allows')
+    add_opt(solver_opt, 'warm_start',
+            help='start each rolling UC stage from the previous stage\'s commitment (for solvers which take a MIP start)')
+    add_opt(solver_opt, 'solver_race',
+            help='solve with several solvers (or solver settings) in parallel and take the first to finish, e.g. "glpk, cbc, cbc randomCbcSeed=7" (results of each race are added to solver-race.csv)')
+    add_opt(solver_opt, 'solver_io',
+            help='how the problem is passed to the solver: "file" (the default), "python" (in-process, through pyomo\'s gurobi or cplex python interfaces) or "auto" (in-process if the solver\'s python interface is installed)')
+    add_opt(solver_opt, 'model_backend',
+            help='how the model is built: "pyomo" or "sparse" (builds sparse coefficient arrays directly, much faster for large problems)')
+    add_opt(solver_opt, 'indexed_constraints',
+            help='make each family of constraints (e.g. power balance) one constraint indexed by time, instead of one constraint per time')
+    add_opt(solver_opt, 'updown_formulation',
+            help='how the min up/down times are modeled: "one variable sum of status" (status windows), "three variable sum of status" (status windows with startup/shutdown indicators) or "three variable sum of startups" (the tight windows of startup/shutdown indicators)')
+    add_opt(solver_opt, 'ramp_formulation',
+            help='how the ramp limits are modeled: "status change" (ramps limited through the status differences) or "generation above minimum" (the tight startup/shutdown ramp limits on the power above pmin, with startup/shutdown indicators)')
+    add_opt(solver_opt, 'network_formulation',
+            help='how the transmission network is modeled: "angle" (bus angles and line flow constraints) or "ptdf" (power transfer distribution factors, adding only the line limits which are violated and re-solving)')
+    add_opt(solver_opt, 'network_reduction',
+            help='eliminate the buses with no generators or loads (by Kron reduction) - they get no angle variables or power balance constraints and the line flows are expressions of the remaining bus angles')
+    add_opt(solver_opt, 'aggregate_noncontrollable',
+            help='fold the non-controllable generators with no cost (which are never shed) into one net load parameter per bus - their schedules are only used in the results')
+    add_opt(solver_opt, 'cluster_units',
+            help='model each group of identical units (with linear costs and no ramp limits) at a bus as one cluster with an integer commitment - the cluster solution is split back among the units')
+    add_opt(solver_opt, 'presolve',
+            help='use the generator parameters and initial conditions to leave out the ramp and min up/down time constraints which can never bind and to fix (by their bounds) the statuses forced by the initial conditions')
+    add_opt(solver_opt, 'contingencies',
+            help='secure the commitment against single line outages (N-1) - the post-outage flows are screened after each solve and only the violated limits are added (and the problem re-solved)')
+    add_opt(solver_opt, 'contingency_threads',
+            help='the number of threads used to screen the line outages (0 uses one per core)')
 
     reserve = parser.add_argument_group('Reserve',
                                         'Does the system require reserve? The default is no reserve.')
@@ -229,6 +285,15 @@ def setup_parser_args(parser):
     add_opt(parser, 'economic_wind_shed',
             help='is wind allowed to be shed for economic reasons ' +
             '(default is to allow wind shedding only if infeasible)')
+    add_opt(parser, 'elastic_shedding',
+            help='build every stage with load (and wind) shedding allowed, ' +
+            'so that each stage is solved once and load is shed ' +
+            'whenever that costs less than generating it ' +
+            '(default is to re-solve infeasible stages with shedding)')
+    add_opt(parser, 'shedding_slacks',
+            help='build every stage with load (and wind) shedding slacks ' +
+            'fixed at zero, which are released to re-solve an infeasible ' +
+            'stage without rebuilding its model')
 
     stochastic = parser.add_argument_group('Stochastic UC',
                                            'options to modify the behavior of a stochastic problem')
@@ -237,6 +302,10 @@ def setup_parser_args(parser):
     add_opt(stochastic, 'faststart_resolve', '-F',
             help="""allow faststart units which are off to be
                 started up during resolve with observed wind values""")
+    add_opt(stochastic, 'fast_resolve',
+            help='resolve with observed wind values in the solved model, ' +
+            'dropping the overlap and reserve constraints and fixing ' +
+            'the statuses in place (instead of rebuilding the model)')
 
     stochastic_mode = stochastic.add_mutually_exclusive_group()
     add_opt(stochastic_mode, 'deterministic_solve', '-D',
@@ -263,6 +332,10 @@ def setup_parser_args(parser):
             help='use pdb when an error is raised')
     add_opt(debugging, 'problem_file',
             help='flag to write the problem formulation to a problem.lp file')
+    add_opt(debugging, 'problem_file_format',
+            help='format for problem files: "lp" or "mps" (free MPS) -- also used for the solver input files of the sparse backend')
+    add_opt(debugging, 'problem_file_gzip',
+            help='compress the problem file with gzip')
     add_opt(debugging, 'logging_level',
             help='set the level of detail for logging')
     add_opt(debugging, 'standalone_restart',
@@ -0,0 +1,86 @@
+"""
+Security against single line outages (N-1 contingencies,
+see `user_config.contingencies`).
+
+The line outage distribution factors give the flow on each
+(monitored) line after an outage of another line. After each solve,
+all of the post-outage flows are screened and the limits which they
+violate are added to the problem (which is then re-solved).
+"""
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import numpy as np
+import network
+
+# outages which leave less than this fraction of a line's flow
+# on the rest of the network split it into islands
+islanding_tolerance = 1e-6
+
+
+def lodf_matrix(ptdf, ends):
+    '''
+    The line outage distribution factors: the change in the flow
+    on each line per MW of flow on an outaged line (before its outage).
+
+    :param ptdf: the distribution factors (see :func:`network.ptdf_matrix`)
+    :param ends: the (from, to) bus indices of each line
+    :returns: an array of (monitored lines, outaged lines) and the
+        indices of the lines whose outage does not island the network
+    '''
+    frm, to = np.array(ends, dtype=int).reshape(-1, 2).T
+    # the flow on each line from a transfer across each line's ends
+    transfers = ptdf[:, frm] - ptdf[:, to]
+    remaining = 1 - np.diag(transfers)
+    outages = np.flatnonzero(np.abs(remaining) > islanding_tolerance)
+    lodf = np.zeros(transfers.shape)
+    lodf[:, outages] = transfers[:, outages] / remaining[outages]
+    lodf[outages, outages] = -1
+    return lodf, outages
+
+
+def screen(flows, lodf, outages, pmin, pmax, threads=None,
+           tolerance=network.limit_tolerance):
+    '''
+    Find the post-outage flows which are above or below their limits.
+    The times are screened in parallel.
+
+    :param flows: an array of line flows (lines, times)
+    :param lodf: the outage distribution factors (see :func:`lodf_matrix`)
+    :param outages: the indices of the outages to screen
+    :param threads: the number of threads (by default, one per core)
+    :returns: the (monitored line, outaged line, time) indices of the
+        flows above their upper limit and of those below their lower limit
+    '''
+    if threads is None or threads < 1:
+        threads = multiprocessing.cpu_count()
+    n_times = flows.shape[1]
+    chunks = [times for times in
+              np.array_split(np.arange(n_times), min(threads, n_times))
+              if len(times)]
+    pmin = np.asarray(pmin, dtype=float)[:, None] - tolerance
+    pmax = np.asarray(pmax, dtype=float)[:, None] + tolerance
+    lodf = lodf[:, outages]
+
+    def screen_times(times):
+        high, low = [], []
+        for t in times:
+            post = flows[:, t, None] + lodf * flows[outages, t]
+            for found, violated in [(high, post > pmax), (low, post < pmin)]:
+                lines, outaged = np.nonzero(violated)
+                found.append(np.column_stack([
+                    lines, outages[outaged], np.repeat(t, len(lines))]))
+        return high, low
+
+    if len(chunks) > 1:
+        pool = ThreadPool(len(chunks))
+        try:
+            results = pool.map(screen_times, chunks)
+        finally:
+            pool.close()
+    else:
+        results = map(screen_times, chunks)
+
+    high = [found for chunk_high, chunk_low in results for found in chunk_high]
+    low = [found for chunk_high, chunk_low in results for found in chunk_low]
+    empty = np.zeros((0, 3), dtype=int)
+    return np.vstack([empty] + high), np.vstack([empty] + low)
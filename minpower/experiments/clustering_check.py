@@ -0,0 +1,51 @@
+"""
+Compare the clustered unit commitment (see `user_config.cluster_units`)
+with the full model on some cases: the solver time, the speedup,
+and the cost difference of the clustered solution.
+
+usage: python clustering_check.py [case directories]
+"""
+import os
+import sys
+from pandas import DataFrame
+
+from minpower import solve
+from minpower.config import user_config
+
+test_dir = os.path.join(os.path.dirname(__file__), '..', 'tests')
+default_cases = ['uc', 'uc-rolling']
+
+
+def check(datadir, cluster_units):
+    user_config.update(dict(cluster_units=cluster_units,
+                            duals=False, visualization=False))
+    sln = solve.solve_problem(datadir, shell=False, csv=False)
+    return dict(solve_time=sln.solve_time, cost=sln.objective,
+                clusters=len(sln.power_system.clusters))
+
+
+def compare(datadir):
+    full, clustered = check(datadir, False), check(datadir, True)
+    return dict(
+        case=os.path.basename(os.path.normpath(datadir)),
+        clusters=clustered['clusters'],
+        solve_time_full=full['solve_time'],
+        solve_time_clustered=clustered['solve_time'],
+        speedup=full['solve_time'] / clustered['solve_time'],
+        cost_full=full['cost'],
+        cost_difference=(clustered['cost'] - full['cost']) / full['cost'])
+
+
+def main(cases):
+    results = DataFrame([compare(datadir) for datadir in cases])
+    return results.set_index('case')[
+        ['clusters', 'solve_time_full', 'solve_time_clustered', 'speedup',
+         'cost_full', 'cost_difference']]
+
+
+if __name__ == "__main__":
+    cases = sys.argv[1:] or \
+        [os.path.join(test_dir, case) for case in default_cases]
+    results = main(cases)
+    print results.to_string()
+    results.to_csv('clustering.csv')
@@ -1,25 +1,88 @@
-from minpower import solve, config
+"""
+Compare the min up/down time formulations
+(see `user_config.updown_formulation`) and the ramp limit formulations
+(see `user_config.ramp_formulation`) on some unit commitments:
+the root gap (between the LP relaxation and the MIP), the time to solve
+the MIP and its branch and bound nodes (if the solver reports them)
+for each formulation.
+
+usage: python formulation_speed_check.py [formulation] [case directories]
+"""
+import os
 import sys
+import time
+from pandas import DataFrame
+from pyomo import environ as pyomo
+
+from minpower import get_data, powersystems, solve
+from minpower.config import user_config
+from minpower.generators import updown_formulations, ramp_formulations
+
+test_dir = os.path.join(os.path.dirname(__file__), '..', 'tests')
+default_cases = ['uc', 'uc-rolling', 'uc-WW-5-2']
+
+# the option which sets each formulation
+formulation_options = dict(
+    [(name, 'updown_formulation') for name in updown_formulations] +
+    [(name, 'ramp_formulation') for name in ramp_formulations])
+
+
+def create_problem(datadir, formulation):
+    user_config.update({formulation_options[formulation]: formulation},
+                       directory=datadir, model_backend='pyomo', duals=False)
+    generators, loads, lines, times, scenario_tree, data = \
+        get_data.parsedir()
+    power_system = powersystems.PowerSystem(generators, loads, lines)
+    solve.create_problem(power_system, times, scenario_tree)
+    return power_system
+
+
+def relax_integers(model):
+    '''make the integer variables continuous (within their bounds)'''
+    relaxed = []
+    for var in model.active_components(pyomo.Var).values():
+        if isinstance(var.domain, pyomo.base.BooleanSet):
+            relaxed.append((var, var.domain))
+            var.domain = pyomo.UnitInterval
+        elif isinstance(var.domain, pyomo.base.IntegerSet):
+            relaxed.append((var, var.domain))
+            var.domain = pyomo.Reals
+    return relaxed
+
+
+def check(datadir, formulation):
+    power_system = create_problem(datadir, formulation)
+    relaxed = relax_integers(power_system._model)
+    power_system.solve()
+    relaxation = power_system.objective
+    for var, domain in relaxed:
+        var.domain = domain
+
+    start = time.time()
+    power_system.solve()
+    elapsed = time.time() - start
+    gap = (power_system.objective - relaxation) / abs(power_system.objective)
+    return dict(root_gap=gap, solve_time=elapsed,
+                nodes=power_system.mip_nodes,
+                objective=power_system.objective)
+
 
+def main(formulations, cases):
+    results = DataFrame([
+        dict(case=os.path.basename(os.path.normpath(datadir)),
+             formulation=formulation, **check(datadir, formulation))
+        for datadir in cases for formulation in formulations])
+    return results.set_index(['case', 'formulation'])[
+        ['root_gap', 'solve_time', 'nodes', 'objective']]
 
-def test(resultsfile='out.txt', logfile='out.log'):
-    sys.stdout = open(resultsfile, 'w+')
-    solve.solve_problem(
-        datadir='/home/adam/ercot-data/ercot-2010-test-system/',
-        shell=True,
-        problemfile=False,
-        visualization=False,
-        csv=False,
-        solver='cplex',
-        num_breakpoints=10,
-        hours_commitment=24,
-        hours_commitment_overlap=12,
-        get_duals=False,
-        logging_file=logfile,
-        solution_file=False
-    )
 
 if __name__ == "__main__":
-    config.updown_formulation = sys.argv[1]
-    filename = config.updown_formulation.replace(' ', '-')
-    test(resultsfile=filename + '.txt', logfile=filename + '.log')
+    args = sys.argv[1:]
+    formulations = updown_formulations + ramp_formulations
+    if args and args[0] in formulation_options:
+        formulations = [args.pop(0)]
+    cases = args or [os.path.join(test_dir, case) for case in default_cases]
+    results = main(formulations, cases)
+    print results.to_string()
+    filename = formulations[0] if len(formulations) == 1 else 'formulations'
+    results.to_csv(filename.replace(' ', '-') + '.csv')
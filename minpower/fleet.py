@@ -0,0 +1,134 @@
+"""
+The parameters and initial conditions of the (controllable) generators,
+held as arrays by a :class:`GeneratorFleet`. Each generator in the fleet
+has a stable integer index into the arrays and reads and writes its
+values through them, so that fleet-wide computations (like handing the
+final conditions of one stage to the next) are array operations.
+"""
+import numpy as np
+import pandas as pd
+
+# the parameters held by the fleet (a missing value, like the ramp rate
+# of a generator without ramp limits, is NaN in the arrays)
+parameters = ['pmin', 'pmax', 'minuptime', 'mindowntime',
+              'rampratemax', 'rampratemin',
+              'startupramplimit', 'shutdownramplimit',
+              'startupcost', 'shutdowncost', 'noloadcost', 'fuelcost']
+
+# the initial conditions (NaN until they are set)
+conditions = ['initial_power', 'initial_status', 'initial_status_hours']
+
+
+class FleetAttribute(object):
+
+    '''
+    A generator attribute which is kept in its fleet's arrays
+    (or on the generator, until it joins a fleet).
+    '''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, gen, cls=None):
+        if gen is None:
+            return self
+        fleet = gen.__dict__.get('_fleet')
+        if fleet is not None:
+            return fleet.get(self.name, gen._fleet_index)
+        try:
+            return gen.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, gen, val):
+        fleet = gen.__dict__.get('_fleet')
+        if fleet is not None:
+            fleet.set(self.name, gen._fleet_index, val)
+        else:
+            gen.__dict__[self.name] = val
+
+
+class GeneratorFleet(object):
+
+    '''
+    The arrays of the generators' parameters and initial conditions.
+    The generators join the fleet (in order): their values move
+    into the arrays and their attributes become views of them.
+
+    :param generators: a list of :class:`~generators.Generator` objects
+    '''
+
+    def __init__(self, generators):
+        self.generators = list(generators)
+        self.names = [str(gen) for gen in self.generators]
+        self._arrays = dict()
+        for name in parameters + conditions:
+            values = [getattr(gen, name, None) for gen in self.generators]
+            self._arrays[name] = np.array(
+                [np.nan if val is None else val for val in values],
+                dtype=float)
+        for index, gen in enumerate(self.generators):
+            for name in parameters + conditions:
+                gen.__dict__.pop(name, None)
+            gen._fleet, gen._fleet_index = self, index
+        # the final conditions of the last stage solved
+        self.final_conditions = None
+
+    def __len__(self):
+        return len(self.generators)
+
+    def get(self, name, index):
+        val = self._arrays[name][index]
+        if val != val:  # NaN
+            if name in conditions:
+                raise AttributeError(name)
+            return None
+        return int(val) if name == 'initial_status' else float(val)
+
+    def set(self, name, index, val):
+        self._arrays[name][index] = np.nan if val is None else val
+
+    def values(self, name):
+        '''the array of a parameter or initial condition'''
+        return self._arrays[name]
+
+    def committed(self):
+        '''the generators which are initially on'''
+        return self._arrays['initial_status'] == 1
+
+    def hours_in_status(self, status, intervalhrs):
+        '''
+        The hours that each generator has been in its final status
+        at the end of a `status` DataFrame (of times by generator name).
+        This includes the initial hours if the status never changed.
+        '''
+        stat = status[self.names].values
+        same = stat == stat[-1]
+        intervals = np.cumprod(same[::-1], axis=0).sum(axis=0)
+        hours = intervals * float(intervalhrs)
+        unchanged = (intervals == len(stat)) & \
+            (self._arrays['initial_status'] == stat[-1])
+        hours[unchanged] += self._arrays['initial_status_hours'][unchanged]
+        return hours
+
+    def set_final_conditions(self, status, power, hours):
+        '''keep the final conditions (arrays in fleet order) of a stage'''
+        self.final_conditions = pd.DataFrame(dict(
+            status=np.asarray(status, dtype=float),
+            power=np.asarray(power, dtype=float),
+            hoursinstatus=np.asarray(hours, dtype=float)),
+            index=self.names)
+
+    def set_initial_conditions(self):
+        '''start from the final conditions of the last stage (if any)'''
+        final = self.final_conditions
+        if final is None:
+            return
+        if final.power.isnull().any():
+            raise ValueError('inital power cannot be null')
+        status = (final.status.values != 0).astype(int)
+        self._arrays['initial_status'][:] = status
+        # power is zero when off
+        self._arrays['initial_power'][:] = final.power.values * status
+        self._arrays['initial_status_hours'][:] = final.hoursinstatus.values
+        self.final_conditions = None
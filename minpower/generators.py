@@ -3,9 +3,29 @@ import logging
 from config import user_config
 from commonscripts import update_attributes, bool_to_int
 
-from optimization import value, OptimizationObject
+from optimization import value, OptimizationObject, LinearSum, linear_sum
 from schedule import is_init
 import bidding
+import fleet
+
+# the min up/down time formulations (see `user_config.updown_formulation`):
+# windows of the status variables (the original formulation),
+# those windows with startup and shutdown indicators,
+# or the tight windows of the indicators (Rajan and Takriti)
+updown_formulations = [
+    'one variable sum of status',
+    'three variable sum of status',
+    'three variable sum of startups',
+]
+
+# the ramp limit formulations (see `user_config.ramp_formulation`):
+# limits on the change in power through the status differences
+# (the original formulation), or the tight limits on the power above
+# the minimum with startup and shutdown indicators (Morales-Espana et al.)
+ramp_formulations = [
+    'status change',
+    'generation above minimum',
+]
 
 
 class Generator(OptimizationObject):
@@ -37,6 +57,9 @@ class Generator(OptimizationObject):
     :param bus: bus name that the generator is connected to
     """
 
+    # the number of units (see :class:`Generator_Cluster`)
+    units = 1
+
     def __init__(self, kind='generic',
                  pmin=0, pmax=500,
                  minuptime=0, mindowntime=0,
@@ -75,21 +98,30 @@ class Generator(OptimizationObject):
 
         self.is_controllable = True
         self.is_stochastic = False
+        # folded into its bus's net load (see `can_aggregate`)
+        self.aggregated = False
         self.commitment_problem = True
+        # startup and shutdown indicator variables
+        # (see `user_config.updown_formulation`)
+        self.startup_indicators = False
+        self._initial_parameters = False
+        # the status of a must run unit which starts on is a constant
+        # (see `user_config.presolve`)
+        self._fixed_status = False
         self.build_cost_model()
         self.init_optimization()
 
     def power(self, time=None, scenario=None):
         '''real power output at time'''
         if time is not None and is_init(time):
-            return self.initial_power
+            return self._initial_condition('power')
         else:
             return self.get_variable('power', time, scenario=scenario, indexed=True)
 
     def power_available(self, time=None, scenario=None):
         '''power availble (constrained by pmax, ramprate, ...) at time'''
         if time is not None and is_init(time):
-            return self.initial_power
+            return self._initial_condition('power')
 
         var_name = 'power_available' if self.commitment_problem \
             and self.reserve_required else 'power'
@@ -99,20 +131,55 @@ class Generator(OptimizationObject):
         '''on/off status at time'''
         if self.commitment_problem or user_config.dispatch_decommit_allowed:
             if time is not None and is_init(time):
-                return self.initial_status
+                return self._initial_condition('status')
             else:
                 return self.get_variable('status', time, scenario=scenario, indexed=True)
         else:
-            return 1
+            return self.units
 
     def status_change(self, t, times):
         '''is the unit changing status between t and t-1'''
         if t > 0:
             previous_status = self.status(times[t - 1])
         else:
-            previous_status = self.initial_status
+            previous_status = self._initial_condition('status')
         return self.status(times[t]) - previous_status
 
+    def startup(self, time, scenario=None):
+        '''is the unit starting up at time (an indicator variable)'''
+        return self.get_variable('startup', time, scenario=scenario, indexed=True)
+
+    def shutdown(self, time, scenario=None):
+        '''is the unit shutting down at time (an indicator variable)'''
+        return self.get_variable('shutdown', time, scenario=scenario, indexed=True)
+
+    def _changed(self, time, tPrev):
+        '''the status change (from the indicators, if there are any)'''
+        if self.startup_indicators:
+            return self.startup(time) - self.shutdown(time)
+        return self.status(time) - self.status(tPrev)
+
+    def _started(self, time, tPrev):
+        '''the startup indicator (or the status change if there is none)'''
+        if self.startup_indicators:
+            return self.startup(time)
+        return self.status(time) - self.status(tPrev)
+
+    def _stopped(self, time, tPrev):
+        '''the shutdown indicator (or minus the status change)'''
+        if self.startup_indicators:
+            return self.shutdown(time)
+        return self.status(tPrev) - self.status(time)
+
+    def _initial_condition(self, name):
+        '''
+        the initial power or status - a parameter if the model
+        is a template for later stages (see `user_config.reuse_stage_model`)
+        '''
+        if self._initial_parameters:
+            return self.get_parameter('initial_' + name, None, indexed=True)
+        return getattr(self, 'initial_' + name)
+
     def cost(self, time, scenario=None, evaluate=False):
         '''total cost at time (operating + startup + shutdown)'''
         return self.operatingcost(time, scenario, evaluate) + \
@@ -120,7 +187,8 @@ class Generator(OptimizationObject):
             self.cost_shutdown(time, scenario, evaluate)
 
     def cost_startup(self, time, scenario=None, evaluate=False):
-        if self.startupcost == 0 or not self.commitment_problem:
+        if self.startupcost == 0 or not self.commitment_problem or \
+                self._fixed_status:
             return 0
         else:
             c = self.get_variable(
@@ -128,7 +196,8 @@ class Generator(OptimizationObject):
             return c if not evaluate else value(c)
 
     def cost_shutdown(self, time, scenario=None, evaluate=False):
-        if self.shutdowncost == 0 or not self.commitment_problem:
+        if self.shutdowncost == 0 or not self.commitment_problem or \
+                self._fixed_status:
             return 0
         else:
             c = self.get_variable(
@@ -148,10 +217,10 @@ class Generator(OptimizationObject):
         return self.bids.output_incremental(self.power(time, scenario)) if value(self.status(time, scenario)) else None
 
     def cost_first_stage(self, times):
-        return sum(self.cost_startup(time) + self.cost_shutdown(time) for time in times)
+        return linear_sum(self.cost_startup(time) + self.cost_shutdown(time) for time in times)
 
     def cost_second_stage(self, times):
-        return sum(self.operatingcost(time) for time in times)
+        return linear_sum(self.operatingcost(time) for time in times)
 
     def getstatus(self, tend, times, status):
         return dict(
@@ -247,76 +316,292 @@ class Generator(OptimizationObject):
         Also create the :class:`bidding.Bid` objects and their variables.
         '''
         self.commitment_problem = len(times) > 1
-        self.add_variable('power', index=times.set, low=0, high=self.pmax)
-
+        # initial conditions are parameters in stage templates
+        # (and for clusters, whose initial min up/down times
+        # are the numbers of units which must stay on or off)
+        self._initial_parameters = self.commitment_problem and \
+            (self._parent_problem().reuse_stage_model or self.units > 1)
+        self._presolve(times)
+
+        pmax = self.units * self.pmax
+        self.add_variable('power', index=times.set, low=0, high=pmax)
+
+        # the status of a cluster is the number of its units which are on
+        status_kind = dict(kind='Binary') if self.units == 1 else \
+            dict(kind='Integer', low=0, high=self.units)
         if self.commitment_problem or user_config.dispatch_decommit_allowed:
-            self.add_variable('status', index=times.set, kind='Binary',
-                              fixed_value=1 if self.mustrun else None)
+            self.add_variable('status', index=times.set,
+                              fixed_value=self.units if self.mustrun else None,
+                              **status_kind)
+
+        # a cluster's min up/down times are windows of the indicators
+        # (which count its units' startups and shutdowns)
+        self.updown_formulation = self._parent_problem().updown_formulation \
+            if self.units == 1 else 'three variable sum of startups'
+        self.tight_ramping = self.commitment_problem and \
+            self._parent_problem().ramp_formulation == 'generation above minimum'
+        self.startup_indicators = self.commitment_problem and (
+            self.updown_formulation != 'one variable sum of status' or
+            self.tight_ramping)
+        if self._fixed_status and self.startup_indicators and \
+                not self.tight_ramping:
+            # a fixed status has no changes to indicate
+            self.startup_indicators = False
+            self.presolved['columns'] += 2 * len(times)
+        if self.startup_indicators:
+            self.add_variable('startup', index=times.set, **status_kind)
+            self.add_variable('shutdown', index=times.set, **status_kind)
 
         if self.commitment_problem:
             # power_available exists for easier reserve requirement
             self.reserve_required = self._parent_problem().reserve_required
             if self.reserve_required:
                 self.add_variable(
-                    'power_available', index=times.set, low=0, high=self.pmax)
-            if self.startupcost > 0:
+                    'power_available', index=times.set, low=0, high=pmax)
+            if self.startupcost > 0 and not self._fixed_status:
                 self.add_variable('startupcost', index=times.set,
-                                  low=0, high=self.startupcost)
-            if self.shutdowncost > 0:
+                                  low=0, high=self.units * self.startupcost)
+            if self.shutdowncost > 0 and not self._fixed_status:
                 self.add_variable('shutdowncost', index=times.set,
-                                  low=0, high=self.shutdowncost)
+                                  low=0, high=self.units * self.shutdowncost)
+            if self._fixed_status:
+                self.presolved['columns'] += len(times) * (
+                    (self.startupcost > 0) + (self.shutdowncost > 0))
+            self._fix_forced_variables(times)
+
+        if self._initial_parameters:
+            scalars, indexed = self._initial_parameter_values(times)
+            for name, val in scalars.items():
+                self.add_parameter(name, default=val)
+            for name, values in indexed.items():
+                self.add_parameter(name, index=times.set, values=values)
 
         self.bids = bidding.Bid(times=times, **self.bid_params)
         return
 
+    def _presolve(self, times):
+        '''
+        Find the parts of the model which the parameters and initial
+        conditions make redundant (see `user_config.presolve`):
+        ramp limits which can never bind, the status of a must run unit
+        which starts on and the statuses forced by the initial
+        min up/down times.
+        '''
+        self.presolved = dict(rows=0, columns=0)
+        self._presolving = self.commitment_problem and \
+            self._parent_problem().presolve
+        presolve = self._presolving
+        capacity = self.pmax - self.pmin
+        # a unit which can cross its whole range (and start up and
+        # shut down) within its ramp limits is never limited by them
+        self._ramp_up = self.rampratemax is not None and not (
+            presolve and self.startupramplimit is not None and
+            self.rampratemax >= capacity and
+            self.pmax <= self.startupramplimit <=
+            self.rampratemax + self.pmin)
+        self._ramp_down = self.rampratemin is not None and not (
+            presolve and self.shutdownramplimit is not None and
+            self.rampratemin <= -capacity and
+            self.rampratemin - self.pmin <= self.shutdownramplimit <=
+            -self.pmax)
+        self._fixed_status = presolve and self.mustrun and \
+            not self._initial_parameters and self.initial_status == 1
+        self._forced_on = self._forced_off = 0
+        if presolve and not self.mustrun and not self._initial_parameters:
+            self._forced_on, self._forced_off = \
+                self._initial_intervals_remaining(times)
+
+    def _fix_forced_variables(self, times):
+        '''
+        bound the variables which the initial conditions fix:
+        the statuses forced by the initial min up/down times
+        (with no startups or shutdowns) and the first power output
+        (within the initial ramp limits)
+        '''
+        forced_on = self._forced_on > 0
+        fixed = []
+        for t in range(self._forced_on + self._forced_off):
+            time = times[t]
+            if forced_on:
+                self.status(time).setlb(1)
+            else:
+                self.status(time).setub(0)
+                self.power(time).setub(0)
+                fixed.append(self.power(time))
+            fixed.append(self.status(time))
+            unchanged = [self.startup(time), self.shutdown(time)] \
+                if self.startup_indicators else []
+            for name in ['startupcost', 'shutdowncost']:
+                if getattr(self, name) > 0:
+                    unchanged.append(
+                        self.get_variable(name, time, indexed=True))
+            for var in unchanged:
+                var.setub(0)
+            fixed.extend(unchanged)
+        if self._fixed_status and self.startup_indicators:
+            # (which the tight ramp limits use)
+            for time in times:
+                for var in [self.startup(time), self.shutdown(time)]:
+                    var.setub(0)
+                    fixed.append(var)
+        self.presolved['columns'] += len(fixed)
+
+        if self._presolving and not self._initial_parameters:
+            # the initial ramp limits are bounds on the first power
+            first = self.power(times[0])
+            if self.rampratemax is not None and \
+                    self.initial_power + self.rampratemax < self.pmax:
+                first.setub(min(first.ub,
+                                self.initial_power + self.rampratemax))
+            if self.rampratemin is not None and \
+                    self.initial_power + self.rampratemin > self.pmin:
+                first.setlb(self.initial_power + self.rampratemin)
+
+    def set_warm_start(self, times, power, status):
+        '''
+        Set starting values for the variables (a MIP start).
+        `power` and `status` (indexed by timestamp) come from an earlier
+        solution. Times after them hold the last status and power.
+        '''
+        if not self.commitment_problem:
+            return
+        previous_status = last_status = \
+            value(self._initial_condition('status'))
+        last_power = value(self._initial_condition('power'))
+        for timestamp, time in zip(times.times, times):
+            if timestamp in status.index:
+                last_status, last_power = status[timestamp], power[timestamp]
+            P = min(max(last_power, self.pmin * last_status),
+                    self.pmax * last_status)
+
+            if not self.mustrun:
+                self.status(time).value = last_status
+            self.power(time).value = P
+            if self.reserve_required:
+                self.power_available(time).value = P
+            change = last_status - previous_status
+            if self.startup_indicators:
+                self.startup(time).value = max(change, 0)
+                self.shutdown(time).value = max(-change, 0)
+            if self.startupcost > 0:
+                self.get_variable('startupcost', time, indexed=True).value = \
+                    self.startupcost * max(change, 0)
+            if self.shutdowncost > 0:
+                self.get_variable('shutdowncost', time, indexed=True).value = \
+                    self.shutdowncost * max(-change, 0)
+            previous_status = last_status
+
+    def _initial_intervals_remaining(self, times):
+        '''the intervals that the unit must stay on (or off) from the start'''
+        tEnd = len(times)
+        if self.minuptime > 0:
+            up_intervals_remaining = roundoff((self.minuptime - self.initial_status_hours) / times.intervalhrs)
+            min_up_intervals_remaining_init = int(
+                min(tEnd, up_intervals_remaining * self.initial_status))
+        else:
+            min_up_intervals_remaining_init = 0
+        if self.mindowntime > 0:
+            down_intervals_remaining = roundoff((self.mindowntime - self.initial_status_hours) / times.intervalhrs)
+            min_down_intervals_remaining_init = int(min(tEnd, down_intervals_remaining * (self.initial_status == 0)))
+        else:
+            min_down_intervals_remaining_init = 0
+        return min_up_intervals_remaining_init, min_down_intervals_remaining_init
+
+    def _initial_parameter_values(self, times):
+        '''
+        the values of the initial condition parameters:
+        scalars and (time indexed) min up/down time requirements
+        '''
+        scalars = dict(initial_power=self.initial_power,
+                       initial_status=self.initial_status)
+        # without a binding initial ramp limit, the limit is just pmax (or 0)
+        if self.rampratemax is not None:
+            ramp_high = self.initial_power + self.rampratemax
+            scalars['initial_ramp_high'] = \
+                ramp_high if ramp_high < self.pmax else self.pmax
+        if self.rampratemin is not None:
+            ramp_low = self.initial_power + self.rampratemin
+            scalars['initial_ramp_low'] = \
+                ramp_low if ramp_low > self.pmin else 0
+
+        up_init, down_init = self._initial_intervals_remaining(times)
+        indexed = {}
+        if self.minuptime > 0:
+            indexed['initial_up_required'] = dict(
+                (time, int(t < up_init)) for t, time in enumerate(times))
+        if self.mindowntime > 0:
+            indexed['initial_down_required'] = dict(
+                (time, int(t < down_init)) for t, time in enumerate(times))
+        return scalars, indexed
+
+    def update_parameters(self, times):
+        '''set the initial conditions of a stage template'''
+        if not self._initial_parameters:
+            return
+        scalars, indexed = self._initial_parameter_values(times)
+        for name, val in scalars.items():
+            self.update_parameter(name, val)
+        for name, values in indexed.items():
+            self.update_parameter(name, values)
+
     def create_objective(self, times):
         return sum(self.cost(time) for time in times)
 
     def create_constraints(self, times):
         '''create the optimization constraints for a generator over all times'''
-        def roundoff(n):
-            m = int(n)
-            if n != m:  # pragma: no cover
-                raise ValueError('min up/down times must be integer number of intervals, not {}'.format(n))
-            return m
-
         if self.commitment_problem:
+            # the rows which are left out by the presolve
+            self.presolved['rows'] = 0
             # set initial and final time constraints
             tInitial = times.initialTimestr
-            tEnd = len(times)
-            if self.minuptime > 0:
-                up_intervals_remaining = roundoff((self.minuptime - self.initial_status_hours) / times.intervalhrs)
-                min_up_intervals_remaining_init = int(
-                    min(tEnd, up_intervals_remaining * self.initial_status))
-            else:
+
+            # calculate up down intervals
+            min_up_intervals = roundoff(self.minuptime / times.intervalhrs)
+            min_down_intervals = roundoff(self.mindowntime / times.intervalhrs)
+
+            if self._initial_parameters:
+                # the initial constraints of a stage template
+                # cover every interval they could apply to
                 min_up_intervals_remaining_init = 0
-            if self.mindowntime > 0:
-                down_intervals_remaining = roundoff((self.mindowntime - self.initial_status_hours) / times.intervalhrs)
-                min_down_intervals_remaining_init = int(min(tEnd, down_intervals_remaining * (self.initial_status == 0)))
-            else:
                 min_down_intervals_remaining_init = 0
+                self._create_initial_constraints(
+                    times, min_up_intervals, min_down_intervals)
+            else:
+                min_up_intervals_remaining_init, min_down_intervals_remaining_init = \
+                    self._initial_intervals_remaining(times)
+
             # initial up down time
+            # (the presolve bounds the forced statuses instead)
             if min_up_intervals_remaining_init > 0:
-                self.add_constraint('minuptime', tInitial, 0 >= sum([(1 - self.status(times[t])) for t in range(min_up_intervals_remaining_init)]))
+                if self._forced_on or self._fixed_status:
+                    self.presolved['rows'] += 1
+                else:
+                    self.add_constraint('minuptime', tInitial, 0 >= sum([(1 - self.status(times[t])) for t in range(min_up_intervals_remaining_init)]))
             if min_down_intervals_remaining_init > 0:
-                self.add_constraint('mindowntime', tInitial, 0 == sum([self.status(times[t]) for t in range(min_down_intervals_remaining_init)]))
+                if self._forced_off:
+                    self.presolved['rows'] += 1
+                else:
+                    self.add_constraint('mindowntime', tInitial, 0 == sum([self.status(times[t]) for t in range(min_down_intervals_remaining_init)]))
 
             # initial ramp rate
-            if self.rampratemax is not None:
+            # (the presolve bounds the first power instead)
+            if self.rampratemax is not None and not self._initial_parameters:
                 if self.initial_power + self.rampratemax < self.pmax:
-                    E = self.power(
-                        times[0]) - self.initial_power <= self.rampratemax
-                    self.add_constraint('ramp lim high', tInitial, E)
-
-            if self.rampratemin is not None:
+                    if self._presolving:
+                        self.presolved['rows'] += 1
+                    else:
+                        E = self.power(
+                            times[0]) - self.initial_power <= self.rampratemax
+                        self.add_constraint('ramp lim high', tInitial, E)
+
+            if self.rampratemin is not None and not self._initial_parameters:
                 if self.initial_power + self.rampratemin > self.pmin:
-                    E = self.rampratemin <= self.power(
-                        times[0]) - self.initial_power
-                    self.add_constraint('ramp lim low', tInitial, E)
-
-            # calculate up down intervals
-            min_up_intervals = roundoff(self.minuptime / times.intervalhrs)
-            min_down_intervals = roundoff(self.mindowntime / times.intervalhrs)
+                    if self._presolving:
+                        self.presolved['rows'] += 1
+                    else:
+                        E = self.rampratemin <= self.power(
+                            times[0]) - self.initial_power
+                        self.add_constraint('ramp lim low', tInitial, E)
 
             # reserve
             if self.reserve_required:
@@ -325,13 +610,15 @@ class Generator(OptimizationObject):
                 self.add_constraint_set('max gen power avail', times.set, reserve_req)
 
             # ramping power
-            if self.rampratemax is not None:
+            if self.tight_ramping:
+                self._create_tight_ramping(times, min_up_intervals)
+            elif self._ramp_up:
                 def ramp_max(model, t):
                     tPrev = get_tPrev(t, model, times)
                     ramp_limit = self.rampratemax * self.status(tPrev)
                     if self.startupramplimit is not None:
-                        ramp_limit += self.startupramplimit * (
-                            self.status(t) - self.status(tPrev))
+                        ramp_limit += self.startupramplimit * \
+                            self._changed(t, tPrev)
                         # + self.pmax * (1 - self.status(times[t]))
                     return self.power_available(t) - self.power(tPrev) <= ramp_limit
 
@@ -346,24 +633,33 @@ class Generator(OptimizationObject):
 #                        self.shutdownramplimit * -1 * self.status_change(t, times)
 #                        )
 
-            if self.rampratemin is not None:
+            if self._ramp_down and not self.tight_ramping:
                 def ramp_min(model, t):
                     tPrev = get_tPrev(t, model, times)
                     ramp_limit = self.rampratemin * self.status(t)
                     # + self.pmax * (1 - self.status(times[t-1]))
                     if self.shutdownramplimit is not None:
                         ramp_limit += self.shutdownramplimit * \
-                            (-1 * (self.status(t) - self.status(tPrev)))
+                            (-1 * self._changed(t, tPrev))
 
                     return ramp_limit <= self.power_available(t) - self.power(tPrev)
                 self.add_constraint_set('ramp limit low', times.set, ramp_min)
 
+            # the ramp limits which can never bind
+            self.presolved['rows'] += len(times) * (
+                (self.rampratemax is not None and not self._ramp_up) +
+                (self.rampratemin is not None and not self._ramp_down))
+
             # start up and shut down costs
-            if self.startupcost > 0:
+            # (which a unit with a fixed status doesn't have)
+            if self._fixed_status:
+                self.presolved['rows'] += len(times) * (
+                    (self.startupcost > 0) + (self.shutdowncost > 0))
+            if self.startupcost > 0 and not self._fixed_status:
                 def startupcostmin(model, t):
                     tPrev = get_tPrev(t, model, times)
-                    return self.cost_startup(t) >= self.startupcost * (
-                        self.status(t) - self.status(tPrev))
+                    return self.cost_startup(t) >= \
+                        self.startupcost * self._started(t, tPrev)
                 self.add_constraint_set('startup cost min', times.set, startupcostmin)
 
                 # these tightening constraints make stochastic problems take a very long time
@@ -376,10 +672,11 @@ class Generator(OptimizationObject):
 #                    return self.cost_startup(t) <= self.startupcost * (1 - self.status(tPrev))
 #                self.add_constraint_set('startup cost max prev', times.set, startupcostmax_prev)
 
-            if self.shutdowncost > 0:
+            if self.shutdowncost > 0 and not self._fixed_status:
                 def shutdowncost(model, t):
                     tPrev = get_tPrev(t, model, times)
-                    return self.cost_shutdown(t) >= self.shutdowncost * -1 * (self.status(t) - self.status(tPrev))
+                    return self.cost_shutdown(t) >= \
+                        self.shutdowncost * self._stopped(t, tPrev)
                 self.add_constraint_set('shutdown cost', times.set, shutdowncost)
 
             # note: costs must be >= constraints
@@ -389,22 +686,34 @@ class Generator(OptimizationObject):
             # unit shutdowns if the unit has a startup cost
             # solution is to use the min and max constraints together.
 
-            # TODO: convert these to constraint list form
-            for t, time in enumerate(times):
-
-                # min up time
-                if t >= min_up_intervals_remaining_init and self.minuptime > 0:
-                    no_shut_down = range(t, min(tEnd, t + min_up_intervals))
-                    min_up_intervals_remaining = min(tEnd - t, min_up_intervals)
-                    E = sum([self.status(times[s]) for s in no_shut_down]) >= min_up_intervals_remaining * self.status_change(t, times)
-                    self.add_constraint('min up time', time, E)
-                # min down time
-                if t >= min_down_intervals_remaining_init and self.mindowntime > 0:
-                    no_start_up = range(t, min(tEnd, t + min_down_intervals))
-                    min_down_intervals_remaining = min(
-                        tEnd - t, min_down_intervals)
-                    E = sum([1 - self.status(times[s]) for s in no_start_up]) >= min_down_intervals_remaining * -1 * self.status_change(t, times)
-                    self.add_constraint('min down time', time, E)
+            if self._fixed_status:
+                # the indicators (if any) are fixed at zero
+                # and the min up/down times always hold
+                windows = \
+                    self.updown_formulation == 'three variable sum of startups'
+                up_rows = len(times) if windows else (self.minuptime > 0) * \
+                    (len(times) - min_up_intervals_remaining_init)
+                down_rows = len(times) if windows else \
+                    (self.mindowntime > 0) * len(times)
+                self.presolved['rows'] += up_rows + down_rows + \
+                    self.startup_indicators * len(times)
+            else:
+                if self.startup_indicators:
+                    # the indicators of the status changes
+                    def status_change(model, t):
+                        tPrev = get_tPrev(t, model, times)
+                        return self.startup(t) - self.shutdown(t) == \
+                            self.status(t) - self.status(tPrev)
+                    self.add_constraint_set('status change', times.set, status_change)
+
+                if self.updown_formulation == 'three variable sum of startups':
+                    self._create_updown_windows(
+                        times, min_up_intervals, min_down_intervals)
+                else:
+                    self._create_updown_sums(
+                        times, min_up_intervals, min_down_intervals,
+                        min_up_intervals_remaining_init,
+                        min_down_intervals_remaining_init)
 
         # min/max power limits
         # these always apply (even if not a UC problem)
@@ -419,6 +728,165 @@ class Generator(OptimizationObject):
 
         return
 
+    def _create_updown_sums(self, times, min_up_intervals, min_down_intervals,
+                            min_up_intervals_remaining_init,
+                            min_down_intervals_remaining_init):
+        '''
+        the min up/down time constraints: if the unit starts up (shuts down),
+        it is on (off) for the next min up (down) time intervals
+        '''
+        tEnd = len(times)
+        # a window of one interval can't bind (unless it also bounds
+        # the indicators), so the presolve leaves it out
+        one_interval = self._presolving and not self.startup_indicators
+        up_rows = self.minuptime > 0 and \
+            not (one_interval and min_up_intervals <= 1)
+        down_rows = self.mindowntime > 0 and \
+            not (one_interval and min_down_intervals <= 1)
+        self.presolved['rows'] += \
+            (self.minuptime > 0 and not up_rows) * \
+            (tEnd - min_up_intervals_remaining_init) + \
+            (self.mindowntime > 0 and not down_rows) * \
+            (tEnd - min_down_intervals_remaining_init)
+        # TODO: convert these to constraint list form
+        for t, time in enumerate(times):
+            # min up time
+            if t >= min_up_intervals_remaining_init and up_rows:
+                no_shut_down = range(t, min(tEnd, t + min_up_intervals))
+                min_up_intervals_remaining = min(tEnd - t, min_up_intervals)
+                started = self.startup(time) if self.startup_indicators \
+                    else self.status_change(t, times)
+                E = sum([self.status(times[s]) for s in no_shut_down]) >= min_up_intervals_remaining * started
+                self.add_constraint('min up time', time, E)
+            # min down time
+            if t >= min_down_intervals_remaining_init and down_rows:
+                no_start_up = range(t, min(tEnd, t + min_down_intervals))
+                min_down_intervals_remaining = min(
+                    tEnd - t, min_down_intervals)
+                stopped = self.shutdown(time) if self.startup_indicators \
+                    else -1 * self.status_change(t, times)
+                E = sum([1 - self.status(times[s]) for s in no_start_up]) >= min_down_intervals_remaining * stopped
+                self.add_constraint('min down time', time, E)
+
+    def _create_updown_windows(self, times, min_up_intervals,
+                               min_down_intervals):
+        '''
+        the tight min up/down time constraints: a unit which started up
+        (shut down) within the last min up (down) time intervals is on (off).
+        A window of one interval just bounds the indicators by the status.
+        '''
+        up_window = max(min_up_intervals, 1)
+        down_window = max(min_down_intervals, 1)
+        for t, time in enumerate(times):
+            started = linear_sum(self.startup(times[k])
+                                 for k in range(max(0, t - up_window + 1), t + 1))
+            self.add_constraint('min up time', time, started <= self.status(time))
+            stopped = linear_sum(self.shutdown(times[k])
+                                 for k in range(max(0, t - down_window + 1), t + 1))
+            self.add_constraint('min down time', time,
+                                stopped <= self.units - self.status(time))
+
+    def _above_min(self, time, available=False):
+        '''the power above pmin (zero when off)'''
+        power = self.power_available(time) if available else self.power(time)
+        return power - self.pmin * self.status(time)
+
+    def _create_tight_ramping(self, times, min_up_intervals):
+        '''
+        the tight ramp limits on the power above pmin:
+        the startup (shutdown) ramp limit caps the power in the interval
+        after startup (before shutdown) and the ramp rates limit the
+        change in the power above pmin while the unit stays on.
+        Like the ramp rates, the limits on the power before shutdown
+        are set for the time of the shutdown.
+        '''
+        capacity = self.pmax - self.pmin
+        # the power which the unit can have just after startup
+        # and just before shutdown (as with the status change formulation,
+        # these limits only apply along with the ramp rates)
+        startup_power = shutdown_power = self.pmax
+        if self.rampratemax is not None and self.startupramplimit is not None:
+            startup_power = min(self.pmax,
+                                max(self.pmin, self.startupramplimit))
+        if self.rampratemin is not None and self.shutdownramplimit is not None:
+            shutdown_power = min(self.pmax,
+                                 max(self.pmin, -self.shutdownramplimit))
+
+        if startup_power < self.pmax or shutdown_power < self.pmax:
+            # a unit which stays on for at least two intervals cannot
+            # start up and then shut down in the next interval,
+            # so both limits can be in one constraint
+            combined = min_up_intervals >= 2
+            for t, time in enumerate(times):
+                if t > 0:
+                    tPrev = times[t - 1]
+                    limit = capacity * self.status(tPrev) - \
+                        (self.pmax - shutdown_power) * self.shutdown(time)
+                    if combined:
+                        limit -= (self.pmax - startup_power) * \
+                            self.startup(tPrev)
+                    name = 'ramp capacity' if combined \
+                        else 'ramp capacity shutdown'
+                    self.add_constraint(
+                        name, time,
+                        self._above_min(tPrev, available=True) <= limit)
+                if not combined or t == len(times) - 1:
+                    limit = capacity * self.status(time) - \
+                        (self.pmax - startup_power) * self.startup(time)
+                    self.add_constraint(
+                        'ramp capacity startup', time,
+                        self._above_min(time, available=True) <= limit)
+
+        if self._ramp_up:
+            def ramp_max(model, t):
+                tPrev = get_tPrev(t, model, times)
+                ramp_limit = self.rampratemax * self.status(t) + \
+                    (startup_power - self.pmin - self.rampratemax) * \
+                    self.startup(t)
+                return self._above_min(t, available=True) - \
+                    self._above_min(tPrev) <= ramp_limit
+            self.add_constraint_set('ramp limit high', times.set, ramp_max)
+
+        if self._ramp_down:
+            def ramp_min(model, t):
+                tPrev = get_tPrev(t, model, times)
+                ramp_limit = -self.rampratemin * self.status(tPrev) + \
+                    (shutdown_power - self.pmin + self.rampratemin) * \
+                    self.shutdown(t)
+                return self._above_min(tPrev) - \
+                    self._above_min(t, available=True) <= ramp_limit
+            self.add_constraint_set('ramp limit low', times.set, ramp_min)
+
+    def _create_initial_constraints(self, times, min_up_intervals,
+                                    min_down_intervals):
+        '''
+        the initial min up/down time and ramp rate constraints,
+        with right hand sides set by the initial condition parameters
+        '''
+        tInitial = times.initialTimestr
+        tEnd = len(times)
+        if self.minuptime > 0 and not self.mustrun:
+            for t in range(min(tEnd, min_up_intervals)):
+                required = self.get_parameter(
+                    'initial_up_required', times[t], indexed=True)
+                self.add_constraint('initial min up time', times[t],
+                                    self.status(times[t]) >= required)
+        if self.mindowntime > 0 and not self.mustrun:
+            for t in range(min(tEnd, min_down_intervals)):
+                required = self.get_parameter(
+                    'initial_down_required', times[t], indexed=True)
+                self.add_constraint('initial min down time', times[t],
+                                    self.status(times[t]) + required <= self.units)
+
+        if self.rampratemax is not None:
+            self.add_constraint('ramp lim high', tInitial,
+                                self.power(times[0]) <= self.get_parameter(
+                                    'initial_ramp_high', None, indexed=True))
+        if self.rampratemin is not None:
+            self.add_constraint('ramp lim low', tInitial,
+                                self.power(times[0]) >= self.get_parameter(
+                                    'initial_ramp_low', None, indexed=True))
+
     def __str__(self):
         return 'g{ind}'.format(ind=self.index)
 
@@ -427,6 +895,84 @@ def get_tPrev(t, model, times):
     return model.times.prev(t) if t != model.times.first() else times.initialTime
 
 
+def roundoff(n):
+    m = int(n)
+    if n != m:  # pragma: no cover
+        raise ValueError('min up/down times must be integer number of intervals, not {}'.format(n))
+    return m
+
+
+# the parameters and initial conditions of a generator
+# are views of its fleet's arrays (see :class:`~fleet.GeneratorFleet`)
+for _name in fleet.parameters + fleet.conditions:
+    setattr(Generator, _name, fleet.FleetAttribute(_name))
+
+
+class Generator_Cluster(Generator):
+
+    """
+    A cluster of identical generators (see `user_config.cluster_units`),
+    which are committed together: its status is the number of units
+    which are on and its power is their total output.
+    The limits and costs are those of one unit.
+
+    :param members: list of the identical :class:`Generator` objects
+    :param index: numbering of the cluster
+    """
+
+    def __init__(self, members, index=None):
+        unit = members[0]
+        kwds = dict((name, getattr(unit, name)) for name in [
+            'kind', 'pmin', 'pmax', 'minuptime', 'mindowntime',
+            'costcurveequation', 'heatrateequation', 'fuelcost',
+            'startupcost', 'shutdowncost', 'mustrun'])
+        Generator.__init__(self, index=index, bus=unit.bus,
+                           name='+'.join(str(gen.name) for gen in members),
+                           **kwds)
+        self.members = list(members)
+        self.units = len(self.members)
+
+    def truecost(self, time, scenario=None):
+        '''exact cost of the cluster's power (shared by the units which are on)'''
+        on = round(value(self.status(time, scenario)))
+        if not on:
+            return 0
+        return on * self.bids.output_true(
+            value(self.power(time, scenario)) / on)
+
+    def incrementalcost(self, time, scenario=None):
+        '''change in cost with change in power at time (for a unit which is on)'''
+        on = round(value(self.status(time, scenario)))
+        if not on:
+            return None
+        return self.bids.output_incremental(
+            value(self.power(time, scenario)) / on)
+
+    def _initial_parameter_values(self, times):
+        '''
+        the cluster's initial conditions: the total power and number of
+        units on, and the numbers of units which must stay on (or off)
+        '''
+        scalars = dict(
+            initial_power=sum(gen.initial_power for gen in self.members),
+            initial_status=sum(gen.initial_status for gen in self.members))
+        remaining = [gen._initial_intervals_remaining(times)
+                     for gen in self.members]
+        indexed = {}
+        if self.minuptime > 0:
+            indexed['initial_up_required'] = dict(
+                (time, sum(int(t < up) for up, down in remaining))
+                for t, time in enumerate(times))
+        if self.mindowntime > 0:
+            indexed['initial_down_required'] = dict(
+                (time, sum(int(t < down) for up, down in remaining))
+                for t, time in enumerate(times))
+        return scalars, indexed
+
+    def __str__(self):
+        return 'cluster{ind}'.format(ind=self.index)
+
+
 class Generator_nonControllable(Generator):
 
     """
@@ -455,23 +1001,47 @@ class Generator_nonControllable(Generator):
         self.build_cost_model()
         self.init_optimization()
         self.is_stochastic = False
+        self.aggregated = False
         self.shedding_mode = sheddingallowed and user_config.economic_wind_shed
+        self.shedding_slack = False
+
+    def can_aggregate(self):
+        '''
+        can the generator be folded into its bus's net load
+        (see `user_config.aggregate_noncontrollable`) -
+        it has no cost, is never shed and has no observed values
+        '''
+        return not (self.sheddingallowed or self.bid_points is not None or
+                    any(self.cost_coeffs) or self.observed_values is not None)
 
     def power(self, time, scenario=None):
         if self.shedding_mode:
             power = self.get_variable('power_used', time,
                                       scenario=scenario, indexed=True)
+        elif self.shedding_slack:
+            power = self._power_less_shed(time, scenario)
         else:
             power = self.power_available(time)
         return power
 
+    def _power_less_shed(self, time, scenario=None):
+        return LinearSum([self.power_available(time, scenario=scenario)]).add(
+            self.shed(time, scenario=scenario), -1).expression()
+
     def status(self, time=None, scenarios=None):
         return True
 
     def power_available(self, time=None, scenario=None):
+        if self.aggregated:
+            # the scheduled power (which is in the bus's net load)
+            return self._schedule_values[str(time)]
         return self.get_parameter('power', time, indexed=True)
 
     def shed(self, time, scenario=None, evaluate=False):
+        if self.shedding_slack:
+            shed = self.get_variable('power_shed', time,
+                                     scenario=scenario, indexed=True)
+            return value(shed) if evaluate else shed
         Pused = self.power(time, scenario=scenario)
         Pavail = self.power_available(time, scenario=scenario)
         if evaluate:
@@ -491,12 +1061,28 @@ class Generator_nonControllable(Generator):
             hoursinstatus=0)
 
     def create_variables(self, times):
+        if self.aggregated:
+            # no model components - the bus has the power
+            self._schedule_values = self._scheduled_values(times)
+            return
         if self.shedding_mode:
             self.create_variables_shedding(times)
+        self.create_shedding_slack(times)
         self.add_parameter('power', index=times.set,
-                           values=dict([(t, self.get_scheduled_ouput(t)) for t in times]))
+                           values=self._scheduled_values(times))
         self.create_bids(times)
 
+    def _scheduled_values(self, times):
+        return dict([(t, self.get_scheduled_ouput(s))
+                     for t, s in zip(times, times.schedule_strings())])
+
+    def update_parameters(self, times):
+        '''set the power schedule of a stage template'''
+        if self.aggregated:
+            self._schedule_values = self._scheduled_values(times)
+            return
+        self.update_parameter('power', self._scheduled_values(times))
+
     def create_bids(self, times):
         self.bids = bidding.Bid(
             polynomial=self.cost_coeffs,
@@ -510,6 +1096,28 @@ class Generator_nonControllable(Generator):
     def create_variables_shedding(self, times):
         self.add_variable('power_used', index=times.set, low=0)
 
+    def create_shedding_slack(self, times):
+        '''
+        the power shed, which is fixed at zero until shedding
+        is allowed (see `user_config.shedding_slacks`)
+        '''
+        self.shedding_slack = self.sheddingallowed and \
+            not self.shedding_mode and \
+            self._parent_problem().shedding_slacks
+        if self.shedding_slack:
+            self.add_variable('power_shed', index=times.set, low=0, high=0)
+
+    def set_shedding_slack(self, times, allowed, scenario=None):
+        '''
+        allow shedding (up to the available power)
+        or fix the power shed at zero
+        '''
+        shed = self.get_variable('power_shed', scenario=scenario,
+                                 indexed=True)
+        for time in times:
+            limit = value(self.power_available(time, scenario=scenario))
+            shed[str(time)].setub(max(limit, 0) if allowed else 0)
+
     def create_constraints(self, times):
         if self.shedding_mode:
             for time in times:
@@ -520,6 +1128,8 @@ class Generator_nonControllable(Generator):
         return self.operatingcost(time, scenario=scenario, evaluate=evaluate)
 
     def operatingcost(self, time=None, scenario=None, evaluate=False):
+        if self.aggregated:
+            return 0
         return self.bids.output(time, scenario=scenario) + \
             user_config.cost_wind_shedding * self.shed(time, scenario=scenario, evaluate=evaluate)
 
@@ -527,6 +1137,8 @@ class Generator_nonControllable(Generator):
         return self.cost(time)
 
     def incrementalcost(self, time, scenario=None):
+        if self.aggregated:
+            return 0
         return self.bids.output_incremental(self.power(time))
 
     def cost_startup(self, time, scenario=None):
@@ -539,7 +1151,9 @@ class Generator_nonControllable(Generator):
         return 0
 
     def cost_second_stage(self, times):
-        return sum(self.cost(time) for time in times)
+        if self.aggregated:
+            return 0
+        return linear_sum(self.cost(time) for time in times)
 
     def get_scheduled_ouput(self, time):
         return float(self.schedule.ix[time])
@@ -574,14 +1188,18 @@ class Generator_Stochastic(Generator_nonControllable):
 
         self.is_stochastic = not \
             (user_config.perfect_solve or user_config.deterministic_solve)
+        self.aggregated = False
         self.build_cost_model()
         self.init_optimization()
         self.startupcost = 0
         self.shutdowncost = 0
         self.fuelcost = float(fuelcost)
         self.shedding_mode = sheddingallowed and user_config.economic_wind_shed
+        self.shedding_slack = False
 
     def power(self, time, scenario=None):
+        if self.shedding_slack:
+            return self._power_less_shed(time, scenario)
         return self.get_variable(
             'power_used' if self.shedding_mode else 'power',
             time=time, scenario=scenario, indexed=True)
@@ -590,6 +1208,9 @@ class Generator_Stochastic(Generator_nonControllable):
         return self.get_variable('power',
                                  time=time, scenario=scenario, indexed=True)
 
+    def can_aggregate(self):
+        return False
+
     def _get_scenario_values(self, times, s=0):
         # scenario values are structured as a pd.Panel
         # with axes: day, scenario, {prob, [hours]}
@@ -605,6 +1226,7 @@ class Generator_Stochastic(Generator_nonControllable):
     def create_variables(self, times):
         if self.shedding_mode:
             self.create_variables_shedding(times)
+        self.create_shedding_slack(times)
 
         if self.is_stochastic:
             # initialize parameter set to first scenario value
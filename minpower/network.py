@@ -0,0 +1,75 @@
+"""
+Sensitivities of the DC power flow, computed from the (sparse)
+admittance matrix of a :class:`~powersystems.PowerSystem`.
+These are used by the PTDF network formulation
+(see `user_config.network_formulation`).
+"""
+import numpy as np
+
+# the network formulations: bus angles and line flow
+# constraints, or power transfer distribution factors
+formulations = ['angle', 'ptdf']
+
+# line flows within this tolerance (in MW) of a limit are not violations
+limit_tolerance = 1e-5
+
+# smaller distribution factors are left out of the line limit constraints
+ptdf_tolerance = 1e-9
+
+
+def dense_admittance(Bmatrix):
+    '''the admittance matrix (stored by row, as dicts) as an array'''
+    n = len(Bmatrix)
+    B = np.zeros((n, n))
+    for i, row in enumerate(Bmatrix):
+        for j, Bij in row.items():
+            B[i, j] = Bij
+    return B
+
+
+def reactance_matrix(Bmatrix, swing=0):
+    '''
+    The inverse of the admittance matrix, without the swing bus.
+    Its row and column (for the swing bus) are zero, so that the
+    angles of the buses are the matrix times the bus injections.
+    '''
+    B = dense_admittance(Bmatrix)
+    others = np.arange(len(B)) != swing
+    X = np.zeros(B.shape)
+    try:
+        X[np.ix_(others, others)] = np.linalg.inv(B[np.ix_(others, others)])
+    except np.linalg.LinAlgError:
+        raise ValueError('the network is not connected - ' +
+                         'use the angle network formulation')
+    return X
+
+
+def ptdf_matrix(X, ends, reactances):
+    '''
+    The power transfer distribution factors: the flow on each line
+    from injecting 1MW at each bus (and taking it out at the swing bus).
+
+    :param X: the reactance matrix (see :func:`reactance_matrix`)
+    :param ends: the (from, to) bus indices of each line
+    :param reactances: the reactance of each line
+    :returns: an array of (lines, buses)
+    '''
+    frm, to = np.array(ends, dtype=int).reshape(-1, 2).T
+    return (X[frm] - X[to]) / np.asarray(reactances, dtype=float)[:, None]
+
+
+def violated_limits(flows, pmin, pmax, tolerance=limit_tolerance):
+    '''
+    Find the line flows which are above or below their limits.
+
+    :param flows: an array of line flows (lines, times)
+    :param pmin: the lower limit of each line
+    :param pmax: the upper limit of each line
+    :returns: the (line, time) indices of the flows above
+        their upper limit and of those below their lower limit
+    '''
+    pmin = np.asarray(pmin, dtype=float)[:, None]
+    pmax = np.asarray(pmax, dtype=float)[:, None]
+    high = np.argwhere(flows > pmax + tolerance)
+    low = np.argwhere(flows < pmin - tolerance)
+    return high, low
@@ -3,12 +3,19 @@ An optimization command library for Minpower.
 Basically a wrapper around Coopr's `pyomo.ConcreteModel` class.
 """
 import logging
+import numbers
+import os
 import time
 import weakref
 from commonscripts import quiet, not_quiet, update_attributes, joindir
 from pyomo import environ as pyomo
+from pyomo.core.base.expr import _SumExpression, _ExpressionBase
 from pyomo.opt.base import solvers as cooprsolver
+from pyomo.opt.solver.shellcmd import SystemCallSolver
 from config import user_config
+import sparsemodel
+import problem_writer
+import racing
 import pandas as pd
 
 # make pyomo recognize that True == 1
@@ -18,7 +25,23 @@ pyomo.base.numvalue.KnownConstants[
 variable_kinds = dict(
     Continuous=pyomo.Reals,
     Binary=pyomo.Boolean,
-    Boolean=pyomo.Boolean)
+    Boolean=pyomo.Boolean,
+    Integer=pyomo.Integers)
+
+# the modeling libraries which can be used to build the problem
+model_backends = dict(
+    pyomo=pyomo,
+    sparse=sparsemodel)
+
+
+def get_backend(name=None):
+    '''get the modeling library to use (set by `user_config.model_backend`)'''
+    if name is None:
+        name = user_config.model_backend
+    try:
+        return model_backends[name]
+    except KeyError:
+        raise ValueError('unknown model backend "{}"'.format(name))
 
 
 def full_filename(filename):
@@ -99,7 +122,7 @@ class OptimizationObject(object):
         '''
         Create a new variable and add it to the object's variables and the model's variables.
         :param name: name of optimization variable.
-        :param kind: type of variable, specified by string. {Continuous or Binary/Boolean}
+        :param kind: type of variable, specified by string. {Continuous, Binary/Boolean or Integer}
         :param low: low limit of variable
         :param high: high limit of variable
         :param fixed_value: a fixed value for a variable (making it a parameter)
@@ -108,14 +131,16 @@ class OptimizationObject(object):
         '''
         def map_args(kind='Continuous', low=None, high=None):
             return dict(bounds=(low, high), domain=variable_kinds[kind])
+        backend = self._parent_problem()._backend
         orig_name = name
         if index is None:
             name = self._t_id(name, time)
             if fixed_value is None:
-                var = pyomo.Var(name=name, **map_args(**kwargs))
+                var = backend.Var(name=name, **map_args(**kwargs))
                 self._parent_problem().add_component_to_problem(var)
             else:
-                var = pyomo.Param(name=name, default=fixed_value)
+                var = backend.Param(name=name, default=fixed_value,
+                                    mutable=True)
                 # add var
                 self._parent_problem().add_component_to_problem(var)
                 # and set value
@@ -125,10 +150,11 @@ class OptimizationObject(object):
             name = self._id(name)
 
             if fixed_value is None:
-                var = pyomo.Var(index, name=name, **map_args(**kwargs))
+                var = backend.Var(index, name=name, **map_args(**kwargs))
                 self._parent_problem().add_component_to_problem(var)
             else:
-                var = pyomo.Param(index, name=name, default=fixed_value)
+                var = backend.Param(index, name=name, default=fixed_value,
+                                    mutable=True)
                 self._parent_problem().add_component_to_problem(var)
                 var = self._parent_problem().get_component(name)
                 for i in index:
@@ -136,8 +162,11 @@ class OptimizationObject(object):
 
     def add_parameter(self, name, index=None, values=None, mutable=True, default=None, **kwargs):
         name = self._id(name)
+        backend = self._parent_problem()._backend
+        # an index of None makes a scalar parameter (set by its default)
+        args = () if index is None else (index,)
         self._parent_problem().add_component_to_problem(
-            pyomo.Param(index, name=name, mutable=mutable, default=default, **kwargs))
+            backend.Param(*args, name=name, mutable=mutable, default=default, **kwargs))
         if values is not None:
             if pd.Series(values).count() != len(values):
                 raise ValueError('a parameter value cannot be NaN')
@@ -145,14 +174,30 @@ class OptimizationObject(object):
             for i in index:
                 var[i] = values[i]
 
+    def update_parameter(self, name, values):
+        '''set new values for a (mutable) parameter'''
+        param = self.get_parameter(name, None, indexed=True)
+        if param.is_indexed():
+            if pd.Series(values).count() != len(values):
+                raise ValueError('a parameter value cannot be NaN')
+            for i, val in values.items():
+                param[i] = val
+        else:
+            param.value = values
+
     def add_constraint(self, name, time, expression):
         '''Create a new constraint and add it to the object's constraints and the model's constraints.'''
+        problem = self._parent_problem()
+        if problem._in_constraint_family(time):
+            problem._constraint_family(self._id(name)).add(str(time), expression)
+            return
         cname = self._t_id(name, time)
-        self._parent_problem().add_component_to_problem(pyomo.Constraint(name=cname, expr=expression))
+        problem.add_component_to_problem(problem._backend.Constraint(name=cname, expr=expression))
 
     def add_constraint_set(self, name, index, expression):
         cname = self._id(name)
-        self._parent_problem().add_component_to_problem(pyomo.Constraint(index, name=cname, rule=expression))
+        backend = self._parent_problem()._backend
+        self._parent_problem().add_component_to_problem(backend.Constraint(index, name=cname, rule=expression))
 
     def get_dual(self, cname, time=None):
         '''get the dual of a constraint of an LP problem'''
@@ -164,28 +209,40 @@ class OptimizationObject(object):
 
     def get_variable(self, name, time=None, indexed=False, scenario=None):
         if indexed:
-            var_name = self._id(name)
-            if time is None:
-                return self._parent_problem().get_component(var_name, scenario)
-            else:
-                index = str(time)
-                return self._parent_problem().get_component(var_name, scenario)[index]
+            var = self._get_handle(name, scenario=scenario, indexed=True)
+            return var if time is None else var[str(time)]
         else:
-            var_name = self._t_id(name, time)
-            return self._parent_problem().get_component(var_name, scenario)
+            return self._get_handle(name, time, scenario)
 
     def get_constraint(self, name, time):
-        return self._parent_problem().get_component(self._t_id(name, time))
+        problem = self._parent_problem()
+        if problem._in_constraint_family(time):
+            return problem.get_component(self._id(name))[str(time)]
+        return problem.get_component(self._t_id(name, time))
 
     def get_parameter(self, name, time, indexed=False):
         if indexed:
-            name = self._id(name)
-            if time is None:
-                return self._parent_problem().get_component(name)
-            else:
-                return self._parent_problem().get_component(name)[str(time)]
+            param = self._get_handle(name, indexed=True)
+            return param if time is None else param[str(time)]
         else:
-            return self._parent_problem().get_component(self._t_id(name, time))
+            return self._get_handle(name, time)
+
+    def _get_handle(self, name, time=None, scenario=None, indexed=False):
+        '''
+        Get one of this object's model components.
+        The component is looked up by name once, then
+        cached by the problem until the model changes.
+        '''
+        problem = self._parent_problem()
+        key = (self, name, scenario) if indexed else \
+            (self, name, time, scenario)
+        try:
+            return problem._handles[key]
+        except KeyError:
+            cname = self._id(name) if indexed else self._t_id(name, time)
+            component = problem.get_component(cname, scenario)
+            problem._handles[key] = component
+            return component
 
     def add_children(self, objects, name):
         '''Add a child :class:`~optimization.OptimizationObject` to this object.'''
@@ -242,8 +299,13 @@ class OptimizationObject(object):
         return 'opt_obj{ind}'.format(ind=self.index)
 
     def _remove_component(self, name, time=None):
+        problem = self._parent_problem()
+        problem._clear_handles()
+        if problem._in_constraint_family(time):
+            problem._remove_family_constraint(self._id(name), time)
+            return
         key = self._t_id(name, time)
-        delattr(self._parent_problem()._model, key)
+        delattr(problem._model, key)
 
     def values(self, name, reindex=None):
         '''return the values of an indexed pyomo component as a Series'''
@@ -256,13 +318,27 @@ class OptimizationObject(object):
 
 class OptimizationProblem(OptimizationObject):
 
-    '''an optimization problem/model based on pyomo'''
+    '''
+    an optimization problem/model based on pyomo
+    (or on :mod:`sparsemodel`, see `user_config.model_backend`)
+    '''
 
     def __init__(self):
         self.init_optimization()
 
     def init_optimization(self):
-        self._model = pyomo.ConcreteModel('power system problem')
+        self._backend = get_backend()
+        self._model = self._backend.ConcreteModel('power system problem')
+        self._indexed_constraints = user_config.indexed_constraints
+        self._handles = dict()
+        self._warm_start = False
+        # the binaries are fixed without preprocessing the model
+        # (see `fix_binary_variables_in_place`)
+        self._fixed_in_place = False
+        # the (mipgap, time limit) of the next solves, if not the configured
+        self._solver_limits = None
+        # the contenders' times in each solver race
+        self.solver_race_log = []
         self.stochastic_formulation = False
         self.solved = False
         self.children = dict()
@@ -280,29 +356,66 @@ class OptimizationProblem(OptimizationObject):
         '''add a optimization component to the model'''
         if ':' in component.name:
             raise ValueError('no colons allowed in optimization object names')
+        if not isinstance(component, self._backend.Constraint):
+            # the component may replace a cached one
+            self._clear_handles()
         self._model.add_component(component.name, component)
 
+    def _clear_handles(self):
+        '''forget the cached components (see `_get_handle`)'''
+        self._handles.clear()
+
     def add_objective(self, expression, sense=pyomo.minimize):
         '''add an objective to the problem'''
-        self._model.objective = pyomo.Objective(name='objective', expr=expression, sense=sense)
+        self._model.objective = self._backend.Objective(name='objective', expr=expression, sense=sense)
 
     def add_set(self, name, items, ordered=False):
         '''add a :class:`pyomo.Set` to the problem'''
-        self._model.add_component(name, pyomo.Set(initialize=items, name=name, ordered=ordered))
+        self._model.add_component(name, self._backend.Set(initialize=items, name=name, ordered=ordered))
 
     def add_variable(self, name, **kwargs):
         '''create a new variable and add it to the root problem'''
         def map_args(kind='Continuous', low=None, high=None):
             return dict(bounds=(low, high), domain=variable_kinds[kind])
-        var = pyomo.Var(name=name, **map_args(**kwargs))
+        var = self._backend.Var(name=name, **map_args(**kwargs))
         self._model.add_component(name, var)
 
     def add_constraint(self, name, expression, time=None):
+        if self._in_constraint_family(time):
+            self._constraint_family(name).add(str(time), expression)
+            return
         cname = self._t_id(name, time) if time is not None else name
-        self._model.add_component(cname, pyomo.Constraint(name=name, expr=expression))
+        self._model.add_component(cname, self._backend.Constraint(name=cname, expr=expression))
+
+    def _in_constraint_family(self, time):
+        '''
+        In the indexed constraint formulation
+        (see `user_config.indexed_constraints`), constraints for a time in
+        the problem's times are rows of one indexed constraint per family.
+        '''
+        return self._indexed_constraints and time is not None and \
+            str(time) in self._model.times
+
+    def _constraint_family(self, cname):
+        '''get (or create) the indexed constraint for a family'''
+        try:
+            return getattr(self._model, cname)
+        except AttributeError:
+            self._model.add_component(cname, self._backend.Constraint(
+                self._model.times, name=cname, rule=_skip_constraint))
+            return getattr(self._model, cname)
+
+    def _remove_family_constraint(self, cname, time):
+        family = getattr(self._model, cname)
+        if self._backend is pyomo:
+            # pyomo constraints don't support item deletion - the member
+            # is left out of the problem (and replaced if it is added again)
+            family[str(time)].deactivate()
+        else:
+            del family[str(time)]
 
     def add_suffix(self, name):
-        self._model.add_component(name, pyomo.Suffix(direction=pyomo.Suffix.IMPORT))
+        self._model.add_component(name, self._backend.Suffix(direction=pyomo.Suffix.IMPORT))
 
     def get_component(self, name, scenario=None):
         '''Get an optimization component'''
@@ -321,12 +434,17 @@ class OptimizationProblem(OptimizationObject):
                 raise
 
     def write_model(self, filename):
+        '''write the problem to an LP or MPS file (by the filename extension)'''
         try:
-            self._model.write(filename, symbolic_solver_labels=True)
-        except:
+            problem_writer.write_problem(self._model, filename)
+        except NotImplementedError:
             self._model.pprint(filename)
 
     def _remove_component(self, name, time=None):
+        self._clear_handles()
+        if self._in_constraint_family(time):
+            self._remove_family_constraint(name, time)
+            return
         key = self._t_id(name, time) if time is not None else name
         delattr(self._model, key)
 
@@ -334,6 +452,14 @@ class OptimizationProblem(OptimizationObject):
         delattr(self._model, 'objective')
 
     def reset_model(self):
+        self._clear_handles()
+        self._fixed_in_place = False
+        if self._backend is not pyomo:
+            # sparse models hold no pyomo objects, so there is nothing to leak
+            self.solved = False
+            self._model = self._backend.ConcreteModel()
+            return
+
         instances = [self._model]
         if self.stochastic_formulation:
             instances.append(self._stochastic_instance)
@@ -395,6 +521,9 @@ class OptimizationProblem(OptimizationObject):
         self._model = pyomo.ConcreteModel()
 
     def show_model(self):
+        if self._backend is not pyomo:
+            self._model.pprint()
+            return
         components = self._model.components._component
         items = [pyomo.Set, pyomo.Param, pyomo.Var,
                  pyomo.Objective, pyomo.Constraint]
@@ -410,6 +539,7 @@ class OptimizationProblem(OptimizationObject):
 
     def update_variables(self):
         '''Replace the variables with their numeric value.'''
+        self._clear_handles()
         for name, var in self._model.active_components(pyomo.Var).items():
             try:
                 setattr(self._model, name, value(var))
@@ -437,14 +567,18 @@ class OptimizationProblem(OptimizationObject):
             instance = self._model.create()
             logging.debug('... model created')
 
-        results, elapsed = self._solve_instance(instance, solver)
+        results, elapsed = self._solve_instance(
+            instance, solver, fixed_in_place=self._fixed_in_place)
 
         if self.solved:
             self.solution_time = elapsed  # results.Solver[0]['Wallclock time']
             logging.info('Problem solved in {}s.'.format(self.solution_time))
 
         if user_config.problem_file:
-            self.write_model(full_filename('problem.lp'))
+            self.write_model(full_filename(problem_writer.problem_filename(
+                'problem',
+                user_config.problem_file_format,
+                user_config.problem_file_gzip)))
 
         if not self.solved:
             if user_config.problem_file and self.stochastic_formulation:
@@ -455,16 +589,24 @@ class OptimizationProblem(OptimizationObject):
         instance.load(results, allow_consistent_values_for_fixed_vars=True)
         logging.debug('... solution loaded')
 
+        while self.add_lazy_constraints():
+            # re-solve (from the last solution, if the solver takes
+            # a warm start) until no lazy constraint is violated
+            self._warm_start = True
+            instance = self._model.create()
+            results, elapsed = self._solve_instance(
+                instance, solver, fixed_in_place=self._fixed_in_place)
+            if not self.solved:
+                raise OptimizationError('problem not solved')
+            self.solution_time += elapsed
+            instance.load(results, allow_consistent_values_for_fixed_vars=True)
+            logging.debug('... re-solved with lazy constraints')
+
         if get_duals:
             # resolve with fixed variables
             logging.info('resolving fixed-integer LP for duals')
-            _fix_binary_variables(instance)
-
-            results, elapsed = self._solve_instance(
-                instance, get_duals=get_duals)
+            results, elapsed = self._solve_duals(instance)
             self.solution_time += elapsed
-
-            instance.load(results)
             logging.debug('... LP problem solved')
 
         if self.stochastic_formulation:
@@ -481,10 +623,42 @@ class OptimizationProblem(OptimizationObject):
     def __str__(self):
         return 'system'
 
+    def add_lazy_constraints(self):
+        '''
+        Add any constraints which were left out of the model
+        and are violated by the solution (as the problem is
+        re-solved, the solution is checked again).
+
+        :returns: the number of constraints added
+        '''
+        return 0
+
+    def _solve_duals(self, instance):
+        '''
+        Fix the binary variables at their solved values and resolve the LP.
+        The solved model is reused: the binaries are fixed in place and,
+        unless the solver works from pyomo's preprocessed expressions,
+        the model is not preprocessed again.
+        Only the duals are loaded back into the instance.
+        '''
+        in_place = not self.stochastic_formulation and \
+            _fixes_in_place(self._opt_solver)
+        _fix_binary_variables(instance, preprocess=not in_place)
+        results, elapsed = self._solve_instance(
+            instance, get_duals=True, fixed_in_place=in_place)
+
+        # the variable values are unchanged from the MIP solution
+        for solution in results.solution:
+            solution.variable = {}
+        instance.load(results)
+        return results, elapsed
+
     def _solve_instance(self, instance,
                         solver=user_config.solver,
                         get_duals=False,
                         keepfiles=False,
+                        fixed_in_place=False,
+                        **kwds
                         ):
 
         if user_config.keep_lp_files:
@@ -493,39 +667,51 @@ class OptimizationProblem(OptimizationObject):
         suffixes = ['dual'] if get_duals else []
 
         if not hasattr(self, '_opt_solver'):
-            kwds = {}
-#            try:
-#                if solver == 'gurobi':
-#                    import gurobipy
-#                    kwds['solver_io'] = 'python'
-#                elif solver == 'cplex':
-#                    import cplex
-#                    kwds['solver_io'] = 'python'
-#            except ImportError: pass
-
-            self._opt_solver = cooprsolver.SolverFactory(solver, **kwds)
-            self._opt_solver.options.mipgap = user_config.mipgap
-
-            if self._opt_solver is None:
-                msg = 'solver "{}" not found by coopr'.format(solver)
-                raise OptimizationError(msg)
-
-        if user_config.solver_time_limit:
-            self._opt_solver.options.timelimit = user_config.solver_time_limit
+            self._opt_solver = get_solver(solver, self._backend)
+
+        mipgap, time_limit = self.solver_limits()
+        _set_solver_limits(self._opt_solver, mipgap, time_limit, kwds)
 
         # if we are debugging, show the solver output
         show_solver_output = user_config.logging_level <= 10
 
+        # a starting solution is only used for the next MIP solve
+        if self._warm_start and not get_duals:
+            if _warm_start_capable(self._opt_solver):
+                kwds['warmstart'] = True
+            else:
+                logging.debug('{} does not take a warm start'.format(solver))
+            self._warm_start = False
+
         start = time.time()
 
         quiet_fn = not_quiet if keepfiles or show_solver_output else quiet
 
+        relaxed = []
+        if fixed_in_place and isinstance(self._opt_solver, SystemCallSolver):
+            # pyomo's writers take fixed variables (as bounds) only when
+            # asked and would still declare the binaries as integers
+            kwds['output_fixed_variable_bounds'] = True
+            relaxed = _relax_fixed_domains(instance)
+
         with quiet_fn():
-            results = self._opt_solver.solve(instance,
-                                             suffixes=suffixes,
-                                             keepfiles=keepfiles,
-                                             tee=show_solver_output,
-                                             )
+            try:
+                if user_config.solver_race and \
+                        not (get_duals or fixed_in_place):
+                    # the duals (and the fixed resolves)
+                    # always come from the main solver
+                    results = self._race_solvers(
+                        instance, suffixes, keepfiles)
+                else:
+                    results = self._opt_solver.solve(
+                        instance,
+                        suffixes=suffixes,
+                        keepfiles=keepfiles,
+                        tee=show_solver_output,
+                        **kwds)
+            finally:
+                for var, domain in relaxed:
+                    var.domain = domain
         try:
             self._opt_solver._symbol_map = None  # this should mimic the memory leak bugfix at: software.sandia.gov/trac/coopr/changeset/5449
         except AttributeError:
@@ -539,16 +725,68 @@ class OptimizationProblem(OptimizationObject):
                 logging.debug('solution gap={}'.format(self.mipgap))
             except AttributeError:
                 self.mipgap = None
+            self.mip_nodes = branch_and_bound_nodes(results)
 
         return results, elapsed
 
+    def set_solver_limits(self, mipgap, time_limit):
+        '''
+        set the MIP gap and the solver time limit (in seconds)
+        of the next solves, instead of the configured ones
+        '''
+        self._solver_limits = (mipgap, time_limit)
+
+    def solver_limits(self):
+        '''the MIP gap and the solver time limit (zero for no limit)'''
+        if self._solver_limits is None:
+            return user_config.mipgap, user_config.solver_time_limit
+        return self._solver_limits
+
+    def _race_solvers(self, instance, suffixes, keepfiles):
+        '''
+        Solve with all of the `user_config.solver_race` contenders
+        in parallel and take the first to finish.
+        Each contender's time and termination is added to
+        `solver_race_log` and to solver-race.csv.
+        '''
+        mipgap, time_limit = self.solver_limits()
+        started = pd.Timestamp(time.time(), unit='s')
+        results, records = racing.race(
+            instance, racing.parse_contenders(user_config.solver_race),
+            None, suffixes, user_config.problem_file_format, keepfiles,
+            mipgap=mipgap, time_limit=time_limit)
+
+        log = pd.DataFrame(records, columns=[
+            'solver', 'time', 'termination', 'winner'])
+        log.insert(0, 'race', len(self.solver_race_log))
+        log.insert(0, 'started', started)
+        self.solver_race_log.append(log)
+        filename = full_filename('solver-race.csv')
+        log.to_csv(filename, mode='a', index=False,
+                   header=not os.path.exists(filename))
+        return results
+
     def fix_binary_variables(self, fix_offs=True):
         _fix_binary_variables(
             self._model,
             self.stochastic_formulation,
             fix_offs)
 
+    def fix_binary_variables_in_place(self):
+        '''
+        Fix the binary variables at their solved values for the
+        next solves, without preprocessing the model again
+        (unless the solver works from pyomo's preprocessed expressions).
+        The next solve starts from the solution, if the solver
+        takes a warm start.
+        '''
+        self._fixed_in_place = not self.stochastic_formulation and \
+            _fixes_in_place(self._opt_solver)
+        _fix_binary_variables(self._model, preprocess=not self._fixed_in_place)
+        self._warm_start = True
+
     def _unfix_variables(self):
+        self._fixed_in_place = False
         _unfix_variables(self._model)
 
     def _fix_variables(self, names):
@@ -558,8 +796,32 @@ class OptimizationProblem(OptimizationObject):
         for key in self._model.active_components(pyomo.Constraint).keys():
             delattr(self._model, key)
 
-
-def _fix_binary_variables(instance, is_stochastic=False, fix_offs=True):
+    def _remove_constraints_for_times(self, times):
+        '''
+        remove the constraints for some times (the rows of the indexed
+        constraints and the constraints named for the times),
+        keeping the rest of the model
+        '''
+        self._clear_handles()
+        strings = set(str(time) for time in times)
+        suffixes = tuple('_' + string for string in strings)
+        constraints = self._model.active_components(pyomo.Constraint)
+        for name, constraint in constraints.items():
+            if constraint.is_indexed():
+                for key in filter(lambda key: key in strings,
+                                  constraint.keys()):
+                    self._remove_family_constraint(name, key)
+            elif name.endswith(suffixes):
+                delattr(self._model, name)
+
+
+def _skip_constraint(model, index):
+    '''rows of constraint families are added one at a time'''
+    return pyomo.Constraint.Skip
+
+
+def _fix_binary_variables(instance, is_stochastic=False, fix_offs=True,
+                          preprocess=True):
     '''fix binary variables to their solved values to create an LP problem'''
     active_vars = instance.active_components(pyomo.Var)
     for var in active_vars.values():
@@ -580,9 +842,36 @@ def _fix_binary_variables(instance, is_stochastic=False, fix_offs=True):
             lambda blk: type(blk) != pyomo.Piecewise,
             instance.active_components(pyomo.Block).values()
         ):
-            _fix_binary_variables(scenario_block)
-    # need to preprocess after fixing
-    instance.preprocess()
+            _fix_binary_variables(scenario_block, preprocess=False)
+    if preprocess:
+        # need to preprocess after fixing
+        instance.preprocess()
+
+
+def _fixes_in_place(opt_solver):
+    '''
+    can the solver take variables fixed without preprocessing the model?
+    problem files are generated from the current expressions;
+    pyomo's python interfaces use the preprocessed ones
+    '''
+    return isinstance(opt_solver, (SystemCallSolver,
+                                   sparsemodel.SparseSolver))
+
+
+def _relax_fixed_domains(instance):
+    '''
+    make integer variables which are all fixed continuous
+    (so that the fixed problem is written as an LP).
+    Returns the (variable, domain) pairs to restore.
+    '''
+    relaxed = []
+    for var in instance.active_components(pyomo.Var).values():
+        if isinstance(var.domain, (pyomo.base.IntegerSet,
+                                   pyomo.base.BooleanSet)) and \
+                all(var[key].fixed for key in var):
+            relaxed.append((var, var.domain))
+            var.domain = pyomo.Reals
+    return relaxed
 
 
 def _fix_variables(names, instance):
@@ -615,9 +904,81 @@ def value(variable):
     try:
         return variable.value
     except AttributeError:
+        if isinstance(variable, _ExpressionBase):
+            return variable()
         return variable  # just a number
 
 
+class LinearSum(object):
+
+    '''
+    A sum of many terms (variables, expressions or numbers,
+    each times a coefficient), collected in flat lists and
+    built into a single linear expression by :meth:`expression`.
+    Python's `sum` instead builds (and may copy) a new
+    expression for each term added.
+    '''
+
+    def __init__(self, terms=(), coef=1.0):
+        self.args, self.coefs = [], []
+        self.constant = 0.0
+        self.extend(terms, coef)
+
+    def add(self, term, coef=1.0):
+        '''add `coef` times `term` to the sum'''
+        if coef == 0:
+            return self
+        if isinstance(term, numbers.Number):
+            self.constant += coef * term
+        elif isinstance(term, LinearSum):
+            self._splice(term.args, term.coefs, term.constant, coef)
+        elif type(term) is _SumExpression:
+            # take the terms of a pyomo sum, rather than nesting it
+            self._splice(term._args, term._coef, term._const, coef)
+        elif type(term) is sparsemodel.LinearExpression:
+            self._splice(term._args, [term._coef] * len(term._args), 0, coef)
+        else:
+            self.args.append(term)
+            self.coefs.append(coef)
+        return self
+
+    def extend(self, terms, coef=1.0):
+        '''add `coef` times each of the `terms` to the sum'''
+        for term in terms:
+            self.add(term, coef)
+        return self
+
+    def _splice(self, args, coefs, constant, coef):
+        self.args.extend(args)
+        self.coefs.extend(coef * c for c in coefs)
+        self.constant += coef * constant
+
+    def expression(self):
+        '''the sum, as an expression of the model backend'''
+        if not self.args:
+            return self.constant
+        if isinstance(self.args[0], sparsemodel._Numeric):
+            args = [arg if coef == 1 else
+                    sparsemodel.LinearExpression((arg,), coef)
+                    for arg, coef in zip(self.args, self.coefs)]
+            if self.constant:
+                args.append(self.constant)
+            return sparsemodel.LinearExpression(tuple(args))
+        expr = _SumExpression()
+        expr._args = list(self.args)
+        expr._coef = list(self.coefs)
+        expr._const = self.constant
+        return expr
+
+
+def linear_sum(terms, coef=1.0):
+    '''
+    The sum of the `terms` (times `coef`) as one flat linear expression.
+    Use instead of `sum` for sums over many generators or times.
+    '''
+    return LinearSum(terms, coef).expression()
+
+
 def detect_status(results, solver):
     '''decide between a solver success or failure'''
     status_text = str(results.solver[0]['Termination condition'])
@@ -639,6 +1000,15 @@ def detect_status(results, solver):
     return success
 
 
+def branch_and_bound_nodes(results):
+    '''the number of branch and bound nodes (if the solver reports it)'''
+    try:
+        return int(results.Solver[0].Statistics.Branch_and_bound
+                   .Number_of_created_subproblems)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 def get_objective(results, name='objective'):
     value = 0
     try:
@@ -649,6 +1019,92 @@ def get_objective(results, name='objective'):
     return value
 
 
+solver_io_modes = ['auto', 'python', 'file']
+
+# solvers which pyomo can run through their own python modules
+pyomo_python_solvers = ['gurobi', 'cplex']
+
+# the relative MIP gap options of solvers which don't call it mipgap
+mipgap_options = dict(cbc='ratio')
+
+
+def get_solver(name, backend=pyomo, solver_io=None, problem_format=None):
+    '''
+    Get the interface to a solver (set by `user_config.solver_io`).
+    By default solvers are given problem files (`file`).
+    Solvers with one of pyomo's python interfaces (gurobi and cplex,
+    for the pyomo backend) can be run in-process (`python`), or
+    in-process if the interface is installed, with a fallback
+    to files (`auto`).
+    '''
+    if solver_io is None:
+        solver_io = user_config.solver_io
+    if problem_format is None:
+        problem_format = user_config.problem_file_format
+    if solver_io not in solver_io_modes:
+        raise ValueError('unknown solver io "{}"'.format(solver_io))
+
+    opt_solver = None
+    if solver_io != 'file':
+        opt_solver = _python_solver(name, backend)
+        if opt_solver is None and solver_io == 'python':
+            raise OptimizationError(
+                'no python interface to solver "{}" is installed'.format(name))
+
+    if opt_solver is None:
+        if backend is pyomo:
+            opt_solver = cooprsolver.SolverFactory(name)
+        else:
+            opt_solver = backend.SolverFactory(name,
+                                               problem_format=problem_format)
+    else:
+        logging.debug('solving {} in-process'.format(name))
+
+    if opt_solver is None:
+        raise OptimizationError('solver "{}" not found by coopr'.format(name))
+    return opt_solver
+
+
+def mipgap_option(name):
+    '''the name of the solver's relative MIP gap option'''
+    return mipgap_options.get(name, 'mipgap')
+
+
+def _set_solver_limits(opt_solver, mipgap, time_limit, kwds):
+    '''
+    Set the MIP gap and the time limit (zero for no limit) of the
+    next solve. Solvers given problem files take the time limit as
+    the `timelimit` keyword of `solve` (`kwds`), e.g. cbc's ``-sec``
+    or glpk's ``--tmlim``. Pyomo's python interfaces ignore the keyword
+    and take a `timelimit` option. No limit clears an earlier one.
+    '''
+    opt_solver.options[mipgap_option(opt_solver.name)] = mipgap
+    opt_solver.options.pop('timelimit', None)
+    if not time_limit:
+        return
+    if isinstance(opt_solver, (SystemCallSolver, sparsemodel.SparseSolver)):
+        kwds['timelimit'] = time_limit
+    else:
+        opt_solver.options.timelimit = time_limit
+
+
+def _warm_start_capable(opt_solver):
+    try:
+        return opt_solver.warm_start_capable()
+    except AttributeError:
+        return False
+
+
+def _python_solver(name, backend):
+    '''pyomo's in-process interface to the solver, if one is installed'''
+    if backend is pyomo and name in pyomo_python_solvers:
+        opt_solver = cooprsolver.SolverFactory(name, solver_io='python')
+        if opt_solver is not None and \
+                opt_solver.available(exception_flag=False):
+            return opt_solver
+    return None
+
+
 class OptimizationError(Exception):
 
     '''Error that occurs within solving an optimization problem.'''
@@ -11,8 +11,15 @@ import logging
 
 from commonscripts import update_attributes, getattrL, flatten
 from config import user_config
-from optimization import value, OptimizationObject, OptimizationProblem, OptimizationError
+from optimization import (value, OptimizationObject, OptimizationProblem,
+                          OptimizationError, LinearSum, linear_sum)
 import stochastic
+import network
+from generators import updown_formulations, ramp_formulations
+from fleet import GeneratorFleet
+import contingency
+import reduction
+import clustering
 
 from pyomo.environ import Block
 import numpy as np
@@ -40,6 +47,8 @@ class Load(OptimizationObject):
             self.cost_shedding = user_config.cost_load_shedding
         self.init_optimization()
         self.shedding_mode = False
+        self.shedding_slack = False
+        self.schedule_parameter = False
 
     def power(self, time, scenario=None, evaluate=False):
         if self.shedding_mode:
@@ -48,11 +57,21 @@ class Load(OptimizationObject):
             if evaluate:
                 power = value(power)
             return power
+        elif self.shedding_slack and not evaluate:
+            return LinearSum([self.get_scheduled_output(time)]).add(
+                self.shed(time, scenario), -1).expression()
+        elif self.shedding_slack:
+            return self.get_scheduled_output(time, evaluate) - \
+                self.shed(time, scenario, evaluate)
         else:
-            return self.get_scheduled_output(time)
+            return self.get_scheduled_output(time, evaluate)
 
     def shed(self, time, scenario=None, evaluate=False):
-        return self.get_scheduled_output(time) - self.power(time, scenario, evaluate)
+        if self.shedding_slack:
+            shed = self.get_variable('shed', time,
+                                     scenario=scenario, indexed=True)
+            return value(shed) if evaluate else shed
+        return self.get_scheduled_output(time, evaluate) - self.power(time, scenario, evaluate)
 
     def cost(self, time, scenario=None):
         return self.cost_shedding * self.shed(time, scenario)
@@ -61,11 +80,38 @@ class Load(OptimizationObject):
         return 0
 
     def cost_second_stage(self, times):
-        return sum(self.cost(time) for time in times)
+        return linear_sum(self.cost(time) for time in times)
 
     def create_variables(self, times):
+        # stage templates keep the schedule as a parameter
+        self.schedule_parameter = self._parent_problem().reuse_stage_model
+        if self.schedule_parameter:
+            self.add_parameter('power_scheduled', index=times.set,
+                               values=self._scheduled_values(times))
+        self.shedding_slack = self.sheddingallowed and \
+            not self.shedding_mode and self._parent_problem().shedding_slacks
         if self.shedding_mode:
-            self.add_variable('power', index=times.set, low=0)
+            self.create_variables_shedding(times)
+        elif self.shedding_slack:
+            # fixed at zero until shedding is allowed
+            self.add_variable('shed', index=times.set, low=0, high=0)
+
+    def create_variables_shedding(self, times):
+        self.add_variable('power', index=times.set, low=0)
+
+    def set_shedding_slack(self, times, allowed, scenario=None):
+        '''
+        allow shedding (up to the scheduled load)
+        or fix the amount shed at zero
+        '''
+        shed = self.get_variable('shed', scenario=scenario, indexed=True)
+        for time in times:
+            limit = self.get_scheduled_output(time, evaluate=True)
+            shed[str(time)].setub(max(limit, 0) if allowed else 0)
+
+    def update_parameters(self, times):
+        '''set the schedule of a stage template'''
+        self.update_parameter('power_scheduled', self._scheduled_values(times))
 
     def create_constraints(self, times):
         if self.shedding_mode:
@@ -79,9 +125,16 @@ class Load(OptimizationObject):
     def __str__(self):
         return 'd{ind}'.format(ind=self.index)
 
-    def get_scheduled_output(self, time):
+    def get_scheduled_output(self, time, evaluate=False):
+        if self.schedule_parameter:
+            power = self.get_parameter('power_scheduled', time, indexed=True)
+            return value(power) if evaluate else power
         return float(self.schedule.ix[time])
 
+    def _scheduled_values(self, times):
+        return dict([(t, float(self.schedule.ix[s]))
+                     for t, s in zip(times, times.schedule_strings())])
+
 
 class Line(OptimizationObject):
 
@@ -98,28 +151,65 @@ class Line(OptimizationObject):
         self.init_optimization()
 
     def power(self, time):
+        problem = self._parent_problem()
+        if problem.ptdf_formulation:
+            return problem.line_flow(self, time)
+        if problem.network_reduced and problem.flow_lines[self] is not self:
+            return problem.flow_lines[self].power(time)
         return self.get_variable('power', time, indexed=True)
 
     def price(self, time):
         '''congestion price on line'''
+        problem = self._parent_problem()
+        if problem.ptdf_formulation:
+            return problem.line_price(self, time)
+        if problem.network_reduced:
+            # from the duals of the limits on the flow
+            if not user_config.duals:
+                return None
+            return -sum(self.get_dual('line limit ' + kind, time)
+                        for kind in problem.line_limit_kinds[self])
         return self.get_dual('line flow', time)
 
+    def _has_flow(self):
+        '''
+        does the line have its own power variable (in the reduced
+        network, lines with the same flow share one variable)
+        '''
+        problem = self._parent_problem()
+        return not problem.network_reduced or problem.flow_lines[self] is self
+
     def create_variables(self, times):
-        self.add_variable('power', index=times.set)
+        if self._has_flow():
+            self.add_variable('power', index=times.set)
 
     def create_constraints(self, times, buses):
-        '''create the constraints for a line over all times'''
-        busNames = getattrL(buses, 'name')
-        iFrom, iTo = busNames.index(self.frombus), busNames.index(self.tobus)
+        '''
+        create the constraints for a line over all times
+        (`buses` is a dict of the buses by name)
+        '''
+        problem = self._parent_problem()
+        reduced = problem.network_reduced
+        has_flow = self._has_flow()
+        limits = problem.line_limit_kinds[self] if reduced \
+            else ['high', 'low']
         for t in times:
-            line_flow_ij = self.power(t) == \
-                1 / self.reactance * (buses[iFrom].angle(t) -
-                                      buses[iTo].angle(t))
-            self.add_constraint('line flow', t, line_flow_ij)
-            self.add_constraint(
-                'line limit high', t, self.power(t) <= self.pmax)
-            self.add_constraint(
-                'line limit low', t, self.pmin <= self.power(t))
+            power = self.power(t)
+            if has_flow:
+                if reduced:
+                    # in terms of the angles of the remaining buses
+                    flow = problem.reduced_line_flow(self, t)
+                else:
+                    busFrom, busTo = buses[self.frombus], buses[self.tobus]
+                    flow = 1 / self.reactance * \
+                        (busFrom.angle(t) - busTo.angle(t))
+                self.add_constraint('line flow', t, power == flow)
+            if 'high' in limits:
+                self.add_constraint(
+                    'line limit high', t, power <= self.pmax)
+            if 'low' in limits:
+                self.add_constraint(
+                    'line limit low', t, self.pmin <= power)
         return
 
     def __str__(self):
@@ -145,8 +235,32 @@ class Bus(OptimizationObject):
         self.init_optimization()
 
     def angle(self, time):
+        problem = self._parent_problem()
+        if problem.ptdf_formulation:
+            return problem.bus_angle(self, time)
         return self.get_variable('angle', time, indexed=True)
 
+    def aggregated_power(self, time):
+        '''
+        the power of the bus's aggregated non-controllable generators
+        (see `user_config.aggregate_noncontrollable`)
+        '''
+        return self.get_parameter('aggregated_power', time, indexed=True)
+
+    def _aggregated_values(self, times):
+        return dict((t, sum(gen.power(t) for gen in self.generators
+                            if gen.aggregated)) for t in times)
+
+    def update_parameters(self, times):
+        '''set the aggregated power of a stage template'''
+        if self.has_aggregated:
+            self.update_parameter('aggregated_power',
+                                  self._aggregated_values(times))
+
+    def injection(self, time):
+        '''net power into the network (in the PTDF formulation)'''
+        return self.get_variable('injection', time, indexed=True)
+
     def price(self, time):
         return self.get_dual('power balance', time)
 
@@ -154,20 +268,29 @@ class Bus(OptimizationObject):
         if evaluate:
             return sum(value(gen.power(t)) for gen in self.generators)
         else:
-            return sum(gen.power(t) for gen in self.generators)
+            return linear_sum(gen.power(t) for gen in self.generators)
 
     def Pload(self, t, evaluate=False):
         if evaluate:
             return sum(value(ld.power(t)) for ld in self.loads)
         else:
-            return sum(ld.power(t) for ld in self.loads)
+            return linear_sum(ld.power(t) for ld in self.loads)
 
     def power_balance(self, t, Bmatrix, allBuses):
-        if len(allBuses) == 1:
-            lineFlowsFromBus = 0
-        else:
-            lineFlowsFromBus = sum([Bmatrix[self.index][otherBus.index] * otherBus.angle(t) for otherBus in allBuses])  # P_{ij}=sum_{i} B_{ij}*theta_j ???
-        return sum([-lineFlowsFromBus, -self.Pload(t), self.Pgen(t)])
+        balance = LinearSum(gen.power(t) for gen in self.generators
+                            if not gen.aggregated)
+        if self.has_aggregated:
+            balance.add(self.aggregated_power(t))
+        balance.extend((ld.power(t) for ld in self.loads), -1)
+        if self._parent_problem().ptdf_formulation:
+            # the network is modeled by the system's line limits
+            balance.add(self.injection(t), -1)
+        elif len(allBuses) > 1:
+            # the flow out of the bus, P_i=sum_j B_ij*theta_j
+            # (over the bus and its neighbors - the rest of B is zero)
+            for j, Bij in Bmatrix[self.index].items():
+                balance.add(allBuses[j].angle(t), -Bij)
+        return balance.expression()
 
     def create_variables(self, times):
         self.add_children(self.generators, 'generators')
@@ -189,7 +312,14 @@ class Bus(OptimizationObject):
         for load in self.loads:
             load.create_variables(times)
         logging.debug('created load variables')
-        self.add_variable('angle', index=times.set)
+        self.has_aggregated = any(gen.aggregated for gen in self.generators)
+        if self.has_aggregated:
+            self.add_parameter('aggregated_power', index=times.set,
+                               values=self._aggregated_values(times))
+        if self._parent_problem().ptdf_formulation:
+            self.add_variable('injection', index=times.set)
+        else:
+            self.add_variable('angle', index=times.set)
         logging.debug('created bus variables ... returning')
         return
 
@@ -197,12 +327,12 @@ class Bus(OptimizationObject):
         return self.cost_first_stage(times) + self.cost_second_stage(times)
 
     def cost_first_stage(self, times):
-        return sum(gen.cost_first_stage(times) for gen in self.generators) + \
-            sum(load.cost_first_stage(times) for load in self.loads)
+        return LinearSum(gen.cost_first_stage(times) for gen in self.generators).extend(
+            load.cost_first_stage(times) for load in self.loads).expression()
 
     def cost_second_stage(self, times):
-        return sum(gen.cost_second_stage(times) for gen in self.generators) + \
-            sum(load.cost_second_stage(times) for load in self.loads)
+        return LinearSum(gen.cost_second_stage(times) for gen in self.generators).extend(
+            load.cost_second_stage(times) for load in self.loads).expression()
 
     def create_constraints(self, times, Bmatrix, buses, include_children=True):
         if include_children:
@@ -214,7 +344,8 @@ class Bus(OptimizationObject):
         for time in times:
             self.add_constraint('power balance', time, self.power_balance(
                 time, Bmatrix, buses) == 0)  # power balance must be zero
-            if nBus > 1 and self.isSwing:
+            if nBus > 1 and self.isSwing and \
+                    not self._parent_problem().ptdf_formulation:
                 self.add_constraint('swing bus', time, self.angle(
                     time) == 0)  # swing bus has angle=0
         return
@@ -251,50 +382,118 @@ class PowerSystem(OptimizationProblem):
         if lines is None:  # pragma: no cover
             lines = []
 
-        buses = self.make_buses_list(loads, generators)
+        # the identical units are modeled as clusters
+        # (see `user_config.cluster_units`)
+        self.clusters = clustering.cluster_generators(generators) \
+            if user_config.cluster_units else []
+        buses = self.make_buses_list(
+            loads, clustering.replace_members(generators, self.clusters),
+            lines)
         self.create_admittance_matrix(buses, lines)
+        # the parameters and initial conditions of the controllable
+        # generators, as arrays
+        self.fleet = GeneratorFleet(
+            filter(lambda gen: gen.is_controllable, generators))
+        if user_config.network_formulation not in network.formulations:
+            raise ValueError('unknown network formulation "{}"'.format(
+                user_config.network_formulation))
+        if user_config.updown_formulation not in updown_formulations:
+            raise ValueError('unknown min up/down time formulation "{}"'
+                             .format(user_config.updown_formulation))
+        self.updown_formulation = user_config.updown_formulation
+        if user_config.ramp_formulation not in ramp_formulations:
+            raise ValueError('unknown ramp formulation "{}"'
+                             .format(user_config.ramp_formulation))
+        self.ramp_formulation = user_config.ramp_formulation
+        # leave out the generator rows and columns which the parameters
+        # and initial conditions make redundant (see `user_config.presolve`)
+        self.presolve = user_config.presolve
+        # the PTDF formulation has no bus angles or line flow variables
+        # and adds only the line limits which the solutions violate
+        self.ptdf_formulation = len(buses) > 1 and \
+            user_config.network_formulation == 'ptdf'
+        # secure the commitment against single line outages
+        self.contingencies = user_config.contingencies and len(lines) > 1
+        if self.ptdf_formulation or self.contingencies:
+            self.create_ptdf(buses, lines)
+        if self.contingencies:
+            self.lodf, self._outages = contingency.lodf_matrix(
+                self.ptdf, self._line_ends)
+        # eliminate the buses with no generators or loads
+        # (the PTDF formulation has no bus angles to eliminate)
+        self.network_reduced = user_config.network_reduction and \
+            len(buses) > 1 and not self.ptdf_formulation
+        if self.network_reduced:
+            buses = self.reduce_network(buses, lines)
         self.init_optimization()
 
         self.add_children(buses, 'buses')
         self.add_children(lines, 'lines')
+        self._buses_by_name = dict((bus.name, bus) for bus in buses)
+        self._clear_views()
+        # fold the non-controllable generators with no cost
+        # (which are never shed) into the buses' net loads
+        self.aggregate_noncontrollable = user_config.aggregate_noncontrollable
+        for gen in self.get_generators_noncontrollable():
+            self._set_aggregation(gen)
 
         self.is_stochastic = len(
             filter(lambda gen: gen.is_stochastic, generators)) > 0
+        if self.is_stochastic and \
+                (self.ptdf_formulation or self.contingencies):
+            raise NotImplementedError(
+                'the PTDF network formulation and line contingencies ' +
+                'are not implemented for stochastic problems')
+        if self.is_stochastic and self.clusters:
+            raise NotImplementedError(
+                'clustered units are not implemented for stochastic problems')
         self.shedding_mode = False
-
-    def make_buses_list(self, loads, generators):
+        # shedding slacks (fixed at zero) are released to allow shedding
+        # without rebuilding the model (see `user_config.shedding_slacks`)
+        self.shedding_slacks = user_config.shedding_slacks
+        self._released_slack_times = None
+        # keep a stage's model as a template for the next stage
+        # (see `user_config.reuse_stage_model`)
+        self.reuse_stage_model = False
+        self.stage_template = None
+
+    def make_buses_list(self, loads, generators, lines=()):
         """
         Create list of :class:`powersystems.Bus` objects
-        from the load and generator bus names. Otherwise
+        from the load, generator and line bus names. Otherwise
         (as in ED,UC) create just one (system)
         :class:`powersystems.Bus` instance.
 
         :param loads: a list of :class:`powersystems.Load` objects
         :param generators: a list of :class:`powersystems.Generator` objects
+        :param lines: a list of :class:`powersystems.Line` objects
         :returns: a list of :class:`powersystems.Bus` objects
         """
         busNameL = []
         busNameL.extend(getattrL(generators, 'bus'))
         busNameL.extend(getattrL(loads, 'bus'))
+        for line in lines:
+            busNameL.extend([line.frombus, line.tobus])
         busNameL = pd.Series(pd.unique(busNameL)).dropna().tolist()
 
         if len(busNameL) == 0:
             busNameL = [None]
 
         buses = []
-        swingHasBeenSet = False
-
+        busesByName = {}
         for b, busNm in enumerate(busNameL):
             newBus = Bus(name=busNm, index=b)
-            for gen in generators:
-                if gen.bus == newBus.name:
-                    newBus.generators.append(gen)
-                if not swingHasBeenSet:
-                    newBus.isSwing = swingHasBeenSet = True
-            for ld in loads:
-                if ld.bus == newBus.name:
-                    newBus.loads.append(ld)
             buses.append(newBus)
+            busesByName[busNm] = newBus
+        if generators:
+            buses[0].isSwing = True
+
+        for gen in generators:
+            if gen.bus in busesByName:
+                busesByName[gen.bus].generators.append(gen)
+        for ld in loads:
+            if ld.bus in busesByName:
+                busesByName[ld.bus].loads.append(ld)
         return buses
 
     def create_admittance_matrix(self, buses, lines):
@@ -303,25 +502,148 @@ class PowerSystem(OptimizationProblem):
         with elements = total admittance of line from bus i to j.
         Used in calculating the power balance for OPF problems.
 
+        The matrix is sparse and is stored by row:
+        `Bmatrix[i]` is a dict of the non-zero elements of row i
+        (bus i itself and the buses connected to it by lines).
+
         :param buses: list of :class:`~powersystems.Line` objects
         :param lines: list of :class:`~powersystems.Bus` objects
         """
-        nB = len(buses)
-        self.Bmatrix = np.zeros((nB, nB))
-        namesL = [bus.name for bus in buses]
+        self.Bmatrix = [dict() for bus in buses]
+        busIndex = dict((bus.name, bus.index) for bus in buses)
         for line in lines:
-            busFrom = buses[namesL.index(line.frombus)]
-            busTo = buses[namesL.index(line.tobus)]
-            self.Bmatrix[busFrom.index, busTo.index] += -1 / line.reactance
-            self.Bmatrix[busTo.index, busFrom.index] += -1 / line.reactance
-        for i in range(0, nB):
-            self.Bmatrix[i, i] = -1 * sum(self.Bmatrix[i, :])
+            i, j = busIndex[line.frombus], busIndex[line.tobus]
+            admittance = 1.0 / line.reactance
+            for row, col in [(i, j), (j, i)]:
+                self.Bmatrix[row][col] = \
+                    self.Bmatrix[row].get(col, 0) - admittance
+                self.Bmatrix[row][row] = \
+                    self.Bmatrix[row].get(row, 0) + admittance
+
+    def create_ptdf(self, buses, lines):
+        """
+        Creates the power transfer distribution factors (`ptdf`,
+        the flow on each line from an injection at each bus) and the
+        reactance matrix (`Xmatrix`) for the PTDF network formulation
+        (and for line contingencies).
+        """
+        busIndex = dict((bus.name, bus.index) for bus in buses)
+        swing = [bus.index for bus in buses if bus.isSwing] or [0]
+        self.Xmatrix = network.reactance_matrix(self.Bmatrix, swing[0])
+        self._line_ends = [(busIndex[line.frombus], busIndex[line.tobus])
+                           for line in lines]
+        self.ptdf = network.ptdf_matrix(
+            self.Xmatrix, self._line_ends,
+            [line.reactance for line in lines])
+        self._line_rows = dict((line, k) for k, line in enumerate(lines))
+
+    def reduce_network(self, buses, lines):
+        """
+        Eliminate the zero injection buses by Kron reduction of the
+        admittance matrix (see :mod:`reduction`). The remaining
+        buses are re-indexed and the flow on each line is kept
+        (`_line_factors`) in terms of their angles.
+
+        Lines with the same flow (e.g. in series, through eliminated
+        buses) share one power variable (that of the first line,
+        `flow_lines`) and the tightest of their limits
+        (`line_limit_kinds`), so that the problem has no duplicates.
+
+        :param buses: list of :class:`~powersystems.Bus` objects
+        :param lines: list of :class:`~powersystems.Line` objects
+        :returns: the remaining buses
+        """
+        Bmatrix, angles = reduction.kron_reduce(
+            self.Bmatrix, reduction.zero_injection_buses(buses))
+        kept = [bus for bus in buses if bus.index not in angles]
+        angle_factors = dict((bus.name, {bus: 1.0}) for bus in kept)
+        for z, factors in angles.items():
+            angle_factors[buses[z].name] = dict(
+                (buses[k], factor) for k, factor in factors.items())
+
+        self._line_factors = dict()
+        same_flow = dict()
+        for line in lines:
+            factors = reduction.line_flow_factors(
+                angle_factors[line.frombus], angle_factors[line.tobus],
+                line.reactance)
+            self._line_factors[line] = factors
+            key = tuple(sorted((bus.index, round(factor, 9))
+                               for bus, factor in factors.items()))
+            same_flow.setdefault(key, []).append(line)
+        self.flow_lines, self.line_limit_kinds = dict(), dict()
+        for key, group in same_flow.items():
+            tightest = dict(
+                high=min(group, key=lambda line: line.pmax),
+                low=max(group, key=lambda line: line.pmin))
+            for line in group:
+                self.flow_lines[line] = group[0]
+                # (a line to a dead end of eliminated buses has no flow)
+                self.line_limit_kinds[line] = [
+                    kind for kind in ['high', 'low']
+                    if key and tightest[kind] is line]
+
+        index = dict((bus.index, k) for k, bus in enumerate(kept))
+        self.Bmatrix = [dict((index[j], Bij)
+                             for j, Bij in Bmatrix[bus.index].items())
+                        for bus in kept]
+        for bus in kept:
+            bus.index = index[bus.index]
+        logging.info('eliminated {} zero injection buses'.format(
+            len(angles)))
+        return kept
+
+    def get_bus(self, name):
+        '''the bus with a name'''
+        try:
+            return self._buses_by_name[name]
+        except KeyError:
+            raise ValueError('no bus named "{}"'.format(name))
+
+    def add_generator(self, generator):
+        '''add a generator (at one of the system's buses)'''
+        self.get_bus(generator.bus).generators.append(generator)
+        self._set_aggregation(generator)
+        self._clear_views()
+
+    def _set_aggregation(self, generator):
+        if not generator.is_controllable:
+            generator.aggregated = self.aggregate_noncontrollable and \
+                generator.can_aggregate()
+
+    def add_load(self, load):
+        '''add a load (at one of the system's buses)'''
+        self.get_bus(load.bus).loads.append(load)
+        self._clear_views()
+
+    def _clear_views(self):
+        '''forget the lists of components (after the components change)'''
+        self._views = dict()
+
+    def _view(self, name, make_view):
+        '''
+        A list of the system's components, which is made once
+        (until the components change). The list is shared,
+        so it shouldn't be modified.
+        '''
+        try:
+            return self._views[name]
+        except KeyError:
+            view = self._views[name] = make_view()
+            return view
 
     def loads(self):
-        return flatten(bus.loads for bus in self.buses)
+        return self._view(
+            'loads', lambda: flatten(bus.loads for bus in self.buses))
 
     def generators(self):
-        return flatten(bus.generators for bus in self.buses)
+        return self._view(
+            'generators', lambda: flatten(bus.generators for bus in self.buses))
+
+    def units(self):
+        '''the generators, with the clusters split into their units'''
+        return self._view('units', lambda: flatten(
+            getattr(gen, 'members', [gen]) for gen in self.generators()))
 
     def create_variables(self, times):
         self.add_variable('cost_first_stage')
@@ -330,10 +652,51 @@ class PowerSystem(OptimizationProblem):
         times.set = self._model.times
         for bus in self.buses:
             bus.create_variables(times)
-        for line in self.lines:
-            line.create_variables(times)
+        if not self.ptdf_formulation:
+            for line in self.lines:
+                line.create_variables(times)
+        self._network_times = times
         logging.debug('... created power system vars... returning')
 
+    def has_stage_template(self, times):
+        '''can the model of the last stage be reused for the times'''
+        template = self.stage_template
+        return self.reuse_stage_model and template is not None and \
+            template._set == times._set and \
+            template.intervalhrs == times.intervalhrs
+
+    def update_stage(self, times):
+        '''
+        Reuse the model of the last stage for the times by
+        updating its parameters: the schedules and initial conditions.
+        '''
+        times.set = self._model.times
+        # binary variables are fixed in the resolve for duals
+        self._unfix_variables()
+        for load in self.loads():
+            load.update_parameters(times)
+        for gen in self.generators():
+            gen.update_parameters(times)
+        for bus in self.buses:
+            bus.update_parameters(times)
+        self.stage_template = times
+        self._network_times = times
+
+    def reset_model(self):
+        self.stage_template = None
+        super(PowerSystem, self).reset_model()
+
+    def set_warm_start(self, times, power, status):
+        '''
+        Start the next solve from an earlier solution's
+        generator `power` and `status` (see `user_config.warm_start`).
+        '''
+        power, status = clustering.aggregate(self.clusters, power, status)
+        for gen in self.get_generators_controllable():
+            if str(gen) in status:
+                gen.set_warm_start(times, power[str(gen)], status[str(gen)])
+        self._warm_start = True
+
     def cost_first_stage(self, scenario=None):
         return self.get_component('cost_first_stage', scenario=scenario)
 
@@ -349,25 +712,193 @@ class PowerSystem(OptimizationProblem):
                 self.add_suffix('dual')
             for bus in self.buses:
                 bus.create_constraints(times, self.Bmatrix, self.buses)
-            for line in self.lines:
-                line.create_constraints(times, self.buses)
+            # the limits which have been added lazily
+            self._line_limits = set()
+            self._contingency_limits = set()
+            if self.ptdf_formulation:
+                self._create_network_constraints(times)
+            else:
+                for line in self.lines:
+                    line.create_constraints(times, self._buses_by_name)
+            if self.presolve and len(times) > 1:
+                self._count_presolved()
 
         # system reserve constraint
-        self._has_reserve = not self.shedding_mode and \
+        # (which is dropped when re-solving an infeasible stage)
+        self._has_reserve = \
+            (not self.shedding_mode or user_config.elastic_shedding) and \
             (self.reserve_fixed > 0 or self.reserve_load_fraction > 0)
         if self._has_reserve:
+            loads, generators = self.loads(), self.generators()
             for time in times:
-                required_generation_availability = self.reserve_fixed + (1.0 + self.reserve_load_fraction) * sum(load.power(time) for load in self.loads())
-                generation_availability = sum(
-                    gen.power_available(time) for gen in self.generators())
+                required_generation_availability = LinearSum(
+                    (load.power(time) for load in loads),
+                    1.0 + self.reserve_load_fraction).add(
+                    self.reserve_fixed).expression()
+                generation_availability = LinearSum(
+                    gen.power_available(time) for gen in generators
+                    if not gen.aggregated).extend(
+                    bus.aggregated_power(time) for bus in self.buses
+                    if bus.has_aggregated).expression()
                 self.add_constraint('reserve', generation_availability >= required_generation_availability, time=time)
 
+        self._create_system_cost_constraints(times)
+
+    def _count_presolved(self):
+        '''total (and log) the generator rows and columns left out or fixed by the presolve'''
+        generators = self.get_generators_controllable()
+        self.presolved = dict(
+            (name, sum(gen.presolved[name] for gen in generators))
+            for name in ['rows', 'columns'])
+        logging.info('presolve removed {rows} rows and {columns} columns'
+                     .format(**self.presolved))
+
+    def _create_system_cost_constraints(self, times):
         self.add_constraint('system_cost_first_stage',
                             self.cost_first_stage() ==
-                            sum(bus.cost_first_stage(times) for bus in self.buses))
+                            linear_sum(bus.cost_first_stage(times) for bus in self.buses))
         self.add_constraint('system_cost_second_stage',
                             self.cost_second_stage() ==
-                            sum(bus.cost_second_stage(times) for bus in self.buses))
+                            linear_sum(bus.cost_second_stage(times) for bus in self.buses))
+
+    def _create_network_constraints(self, times):
+        '''
+        the PTDF formulation's power balance: the bus injections sum to zero
+        (the line limits are added as they are violated)
+        '''
+        self._line_flows = None
+        for time in times:
+            self.add_constraint('network balance', linear_sum(
+                bus.injection(time) for bus in self.buses) == 0, time=time)
+
+    def add_lazy_constraints(self):
+        '''
+        Find the line flows of the solution and add the limits which
+        they violate: the limits of the lines (in the PTDF formulation)
+        and the limits on the flows after any line outage
+        (see `user_config.contingencies`).
+        '''
+        if not self.lines or \
+                not (self.ptdf_formulation or self.contingencies):
+            return 0
+        times = self._network_times
+        flows = self._solved_line_flows(times)
+        added = 0
+        if self.ptdf_formulation:
+            added += self._add_line_limits(flows, times)
+        if self.contingencies:
+            added += self._add_contingency_limits(flows, times)
+        return added
+
+    def _solved_line_flows(self, times):
+        '''the solution's line flows, as an array of (lines, times)'''
+        if not self.ptdf_formulation:
+            return np.array([[value(line.power(t)) for t in times]
+                             for line in self.lines], dtype=float)
+        injections = np.array([[value(bus.injection(t)) for t in times]
+                               for bus in self.buses], dtype=float)
+        self._line_flows = self.ptdf.dot(injections)
+        self._flow_columns = dict((str(t), k) for k, t in enumerate(times))
+        return self._line_flows
+
+    def _add_line_limits(self, flows, times):
+        high, low = network.violated_limits(
+            flows,
+            [line.pmin for line in self.lines],
+            [line.pmax for line in self.lines])
+        added = 0
+        for kind, violations in [('high', high), ('low', low)]:
+            for row, col in violations:
+                line, time = self.lines[row], times[col]
+                key = (kind, line, str(time))
+                if key in self._line_limits:
+                    # already a constraint - within the solver's tolerance
+                    continue
+                self._add_limit(line, 'line limit', kind, time,
+                                self._flow_expression([row], [1.0], time))
+                self._line_limits.add(key)
+                added += 1
+        if added:
+            logging.info('added {} violated line limits'.format(added))
+        return added
+
+    def _add_contingency_limits(self, flows, times):
+        high, low = contingency.screen(
+            flows, self.lodf, self._outages,
+            [line.pmin for line in self.lines],
+            [line.pmax for line in self.lines],
+            threads=user_config.contingency_threads)
+        added = 0
+        for kind, violations in [('high', high), ('low', low)]:
+            for row, outage, col in violations:
+                line, time = self.lines[row], times[col]
+                outaged = self.lines[outage]
+                key = (kind, line, outaged, str(time))
+                if key in self._contingency_limits:
+                    continue
+                # the flow on the line after the outage
+                flow = self._flow_expression(
+                    [row, outage], [1.0, float(self.lodf[row, outage])], time)
+                self._add_limit(line, 'contingency {} limit'.format(outaged),
+                                kind, time, flow)
+                self._contingency_limits.add(key)
+                added += 1
+        if added:
+            logging.info('added {} violated contingency limits'.format(added))
+        return added
+
+    def _add_limit(self, line, name, kind, time, flow):
+        line.add_constraint(name + ' ' + kind, time,
+                            flow <= line.pmax if kind == 'high'
+                            else line.pmin <= flow)
+
+    def _flow_expression(self, rows, coefs, time):
+        '''
+        a weighted sum of the flows on some lines - of the line power
+        variables or (in the PTDF formulation) of the bus injections
+        '''
+        flow = LinearSum()
+        if not self.ptdf_formulation:
+            for row, coef in zip(rows, coefs):
+                flow.add(self.lines[row].power(time), coef)
+            return flow.expression()
+        factors = np.dot(coefs, self.ptdf[rows])
+        for i in np.flatnonzero(np.abs(factors) > network.ptdf_tolerance):
+            flow.add(self.buses[i].injection(time), float(factors[i]))
+        return flow.expression()
+
+    def line_flow(self, line, time):
+        '''the solved flow on a line (in the PTDF formulation)'''
+        return self._line_flows[self._line_rows[line],
+                                self._flow_columns[str(time)]]
+
+    def line_price(self, line, time):
+        '''
+        the congestion price of a line (in the PTDF formulation),
+        from the duals of its limits (zero if none were needed)
+        '''
+        if not user_config.duals:
+            return None
+        price = 0
+        for kind in ['high', 'low']:
+            if (kind, line, str(time)) in self._line_limits:
+                price -= line.get_dual('line limit ' + kind, time)
+        return price
+
+    def reduced_line_flow(self, line, time):
+        '''
+        the flow on a line of the reduced network, in terms of the
+        angles of the remaining buses
+        '''
+        flow = LinearSum()
+        for bus, factor in self._line_factors[line].items():
+            flow.add(bus.angle(time), factor)
+        return flow.expression()
+
+    def bus_angle(self, bus, time):
+        '''the solved angle of a bus (in the PTDF formulation)'''
+        injections = [value(b.injection(time)) for b in self.buses]
+        return float(np.dot(self.Xmatrix[bus.index], injections))
 
     def iden(self, time=None):
         name = 'system'
@@ -379,20 +910,25 @@ class PowerSystem(OptimizationProblem):
         return sum([load.schedule for load in self.loads()])
 
     def total_scheduled_generation(self):
-        return sum(gen.schedule for gen in self.generators() if not gen.is_controllable)
+        return sum(gen.schedule for gen in self.get_generators_noncontrollable())
 
     def get_generators_controllable(self):
-        return filter(lambda gen: gen.is_controllable, self.generators())
+        return self._view('controllable', lambda: filter(
+            lambda gen: gen.is_controllable, self.generators()))
 
     def get_generators_noncontrollable(self):
-        return filter(lambda gen: not gen.is_controllable, self.generators())
+        return self._view('noncontrollable', lambda: filter(
+            lambda gen: not gen.is_controllable, self.generators()))
 
     def get_generators_without_scenarios(self):
-        return filter(lambda gen: getattr(gen, 'is_stochastic', False) == False, self.generators())
+        return self._view('without_scenarios', lambda: filter(
+            lambda gen: getattr(gen, 'is_stochastic', False) == False,
+            self.generators()))
 
     def get_generator_with_scenarios(self):
-        gens = filter(lambda gen: getattr(gen, 'is_stochastic',
-                                          False), self.generators())
+        gens = self._view('with_scenarios', lambda: filter(
+            lambda gen: getattr(gen, 'is_stochastic', False),
+            self.generators()))
         if len(gens) > 1:  # pragma: no cover
             raise NotImplementedError(
                 'Dont handle the case of multiple stochastic generators')
@@ -402,36 +938,45 @@ class PowerSystem(OptimizationProblem):
             return gens[0]
 
     def get_generator_with_observed(self):
-        return filter(lambda gen: getattr(gen, 'observed_values', None) is not None, self.generators())[0]
+        return self._view('with_observed', lambda: filter(
+            lambda gen: getattr(gen, 'observed_values', None) is not None,
+            self.generators()))[0]
 
     def get_finalconditions(self, sln):
+        '''keep the fleet's conditions at the end of a stage'''
         times = sln.times
 
         tEnd = times.last_non_overlap()  # like 2011-01-01 23:00:00
         tEndstr = times.non_overlap().last()  # like t99
 
-        status = sln.generators_status
-
-        for gen in self.generators():
-            g = str(gen)
-            stat = status[g]
-            if sln.is_stochastic:
-                gen.finalstatus = dict(
-                    power=sln.generators_power[g][tEnd],
-                    status=sln.generators_status[g][tEnd],
-                    hoursinstatus=gen.gethrsinstatus(times.non_overlap(), stat)
-                )
-            else:
-                gen.finalstatus = gen.getstatus(tEndstr,
-                                                times.non_overlap(), stat)
+        fleet = self.fleet
+        hours = fleet.hours_in_status(sln.generators_status,
+                                      times.non_overlap().intervalhrs)
+        if sln.is_stochastic or self.clusters:
+            # the clustered units are only in the results
+            status = sln.generators_status.ix[tEnd][fleet.names].values
+            power = sln.generators_power.ix[tEnd][fleet.names].values
+        else:
+            status = [value(gen.status(tEndstr)) for gen in fleet.generators]
+            power = [value(gen.power(tEndstr)) for gen in fleet.generators]
+        fleet.set_final_conditions(status, power, hours)
         return
 
+    def disaggregate(self, power, status, times):
+        '''
+        the `power` and `status` DataFrames of the generators,
+        with the clusters split into their units
+        '''
+        return clustering.disaggregate(self.clusters, power, status,
+                                       times.intervalhrs)
+
+    def disaggregate_costs(self, status, totalcost, fuelcost, incremental):
+        '''the generators' cost DataFrames, with the clusters split into their units'''
+        return clustering.disaggregate_costs(
+            self.clusters, status, totalcost, fuelcost, incremental)
+
     def set_initialconditions(self, initTime):
-        for gen in self.generators():
-            finalstatus = getattr(gen, 'finalstatus', {})
-            if finalstatus:
-                gen.set_initial_condition(**finalstatus)
-                del gen.finalstatus
+        self.fleet.set_initial_conditions()
         return
 
     def solve_problem(self, times):
@@ -439,6 +984,10 @@ class PowerSystem(OptimizationProblem):
             instance = self.solve()
 
         except OptimizationError:
+            if self.shedding_mode:
+                # an elastic stage already allows shedding
+                scheduled, committed = self.debug_infeasible(times)
+                raise OptimizationError('failed to solve with shedding.')
             # re-do stage, with load shedding allowed
             logging.critical('stage infeasible, re-run with shedding.')
             self.allow_shedding(times)
@@ -498,7 +1047,11 @@ class PowerSystem(OptimizationProblem):
                           not g.is_controllable and g.sheddingallowed, self.generators()):
             gen.shedding_mode = to_mode
 
-    def allow_shedding(self, times, resolve=False):
+    def set_shedding_mode(self):
+        '''
+        allow load (and non-controllable generation) shedding
+        in the model that is created next
+        '''
         self.shedding_mode = True
         self._set_load_shedding(True)
 
@@ -506,12 +1059,41 @@ class PowerSystem(OptimizationProblem):
             logging.debug('allowing non-controllable generation shedding')
             self._set_gen_shedding(True)
 
+    def _shedding_slack_owners(self):
+        return [obj for obj in self.loads() + self.get_generators_noncontrollable()
+                if obj.shedding_slack]
+
+    def set_shedding_slacks(self, times, allowed=True):
+        '''
+        Allow shedding in the model as it is built, by releasing
+        the shedding slacks (or fix them at zero again).
+        For stochastic problems, the slacks of every scenario are set.
+        '''
+        scenarios = self._scenario_instances.keys() \
+            if self.stochastic_formulation else [None]
+        for owner in self._shedding_slack_owners():
+            for scenario in scenarios:
+                owner.set_shedding_slack(times, allowed, scenario=scenario)
+        self._released_slack_times = times if allowed else None
+
+    def allow_shedding(self, times, resolve=False):
+        if self._shedding_slack_owners():
+            # the model already has shedding slacks
+            logging.debug('releasing the shedding slacks')
+            self.set_shedding_slacks(
+                times.non_overlap() if resolve else times)
+            return
+        self.set_shedding_mode()
+        # the model no longer matches the next stage
+        self.stage_template = None
+
         const_times = times.non_overlap() if resolve else times
 
         # make load power into a variable instead of a param
         for load in self.loads():
             try:
-                load.create_variables(times)  # need all for the .set attrib
+                # need all times for the .set attrib
+                load.create_variables_shedding(times)
                 load.create_constraints(const_times)
             except RuntimeError:
                 # load already has a power variable and shedding constraint
@@ -551,6 +1133,11 @@ class PowerSystem(OptimizationProblem):
             stochastic.create_problem_with_scenarios(self, times)
 
     def disallow_shedding(self):
+        if self._released_slack_times is not None:
+            self.set_shedding_slacks(self._released_slack_times, allowed=False)
+        if user_config.elastic_shedding:
+            # every stage is created with shedding allowed
+            return
         # change shedding allowed flags for the next stage
         self.shedding_mode = False
         self._set_load_shedding(False)
@@ -558,30 +1145,15 @@ class PowerSystem(OptimizationProblem):
             self._set_gen_shedding(False)
 
     def _resolve_problem(self, sln):
+        self.stage_template = None
         times = sln.times_non_overlap
-        self._remove_component('times')
-        self.add_set('times', times._set, ordered=True)
-        times.set = self._model.times
-
-        # reset the constraints
-        self._remove_all_constraints()
-        # dont create reserve constraints
-        self.reserve_fixed = 0
-        self.reserve_load_fraction = 0
-
-        # set wind to observed power
-        gen = self.get_generator_with_observed()
-        gen.set_power_to_observed(times)
-
-        # reset objective to only the non-overlap times
-        self.reset_objective()
-        self.create_objective(times)
-
-        # recreate constraints only for the non-overlap times
-        self.create_constraints(times)
-
         # fix statuses for all units
-        self.fix_binary_variables()
+        if user_config.fast_resolve:
+            self._mask_for_resolve(sln.times, times)
+            self.fix_binary_variables_in_place()
+        else:
+            self._rebuild_for_resolve(times)
+            self.fix_binary_variables()
 
         # store original problem solve time
         self.full_sln_time = self.solution_time
@@ -617,6 +1189,55 @@ class PowerSystem(OptimizationProblem):
         logging.info('resolved instance with observed values (in {}s)'.format(
             self.resolve_solution_time))
 
+    def _rebuild_for_resolve(self, times):
+        '''rebuild the model for the non-overlap times, with observed power'''
+        self._remove_component('times')
+        self.add_set('times', times._set, ordered=True)
+        times.set = self._model.times
+
+        # reset the constraints
+        self._remove_all_constraints()
+        # dont create reserve constraints
+        self.reserve_fixed = 0
+        self.reserve_load_fraction = 0
+
+        # set wind to observed power
+        gen = self.get_generator_with_observed()
+        gen.set_power_to_observed(times)
+
+        # reset objective to only the non-overlap times
+        self.reset_objective()
+        self.create_objective(times)
+
+        # recreate constraints only for the non-overlap times
+        self.create_constraints(times)
+
+    def _mask_for_resolve(self, times, non_overlap):
+        '''
+        Keep the solved model for the resolve (see `user_config.fast_resolve`):
+        drop the constraints for the overlap times and the reserve,
+        set the observed power (a mutable parameter) and
+        sum the system costs over the non-overlap times.
+        '''
+        # the non-overlap times lead the stage
+        self._remove_constraints_for_times(list(times)[len(non_overlap):])
+        if self._has_reserve:
+            for time in non_overlap:
+                self._remove_component('reserve', time)
+        # dont re-create reserve constraints (if shedding is allowed)
+        self.reserve_fixed = 0
+        self.reserve_load_fraction = 0
+        self._has_reserve = False
+        self._network_times = non_overlap
+
+        # set wind to observed power
+        gen = self.get_generator_with_observed()
+        gen.set_power_to_observed(non_overlap)
+
+        self._remove_component('system_cost_first_stage')
+        self._remove_component('system_cost_second_stage')
+        self._create_system_cost_constraints(non_overlap)
+
     def _resolve_with_faststarts(self, sln):
         '''allow faststart units to be started up to meet the load'''
         self._unfix_variables()
@@ -671,7 +1292,7 @@ class PowerSystem(OptimizationProblem):
                 scheduled.expected_wind - scheduled.observed_wind
         else:
             scheduled = pd.DataFrame({
-                'load': self.total_scheduled_load().ix[times.strings.values]})
+                'load': self.total_scheduled_load().ix[times.schedule_strings()]})
 
             if self.is_stochastic:
                 gen = self.get_generator_with_scenarios()
@@ -691,7 +1312,7 @@ class PowerSystem(OptimizationProblem):
 
             else:
                 if any([hasattr(gen, 'schedule') for gen in self.generators()]):
-                    scheduled['generation'] = self.total_scheduled_generation().ix[times.strings.values]
+                    scheduled['generation'] = self.total_scheduled_generation().ix[times.schedule_strings()]
                 else:
                     scheduled['generation'] = 0
 
@@ -711,14 +1332,13 @@ class PowerSystem(OptimizationProblem):
             )).T
             print 'generator limits\n', committed
         else:
-            gens = filter(lambda gen:
-                          gen.is_controllable and gen.initial_status == 1,
-                          self.generators())
+            on = self.fleet.committed()
+            total = lambda name: np.nansum(self.fleet.values(name)[on])
             committed = pd.Series(dict(
-                Pmin=sum(gen.pmin for gen in gens),
-                Pmax=sum(gen.pmax for gen in gens),
-                rampratemin=pd.Series(gen.rampratemin for gen in gens).sum(),
-                rampratemax=pd.Series(gen.rampratemax for gen in gens).sum(),
+                Pmin=total('pmin'),
+                Pmax=total('pmax'),
+                rampratemin=total('rampratemin'),
+                rampratemax=total('rampratemax'),
             ))
             print 'total committed\n', committed
 
@@ -737,6 +1357,7 @@ class PowerSystem(OptimizationProblem):
                 print(ep.sum(axis=1))
         else:
             print 'initial_status\n'
-            print pd.Series([gen.initial_status for gen in self.generators()])
+            print pd.Series(self.fleet.values('initial_status'),
+                            index=self.fleet.names)
 
         return scheduled, committed
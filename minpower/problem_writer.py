@@ -0,0 +1,481 @@
+"""
+Write optimization problems to LP or free-MPS files.
+
+Rows are written a block at a time, in the order that the
+power system objects emitted them, so the problem is never held
+in memory as text and no symbol map is built.
+The MPS `COLUMNS` section is column-major, so its entries are spooled
+to temporary files in sorted runs and merged while writing.
+Files ending in `.gz` are compressed.
+
+Both :mod:`sparsemodel` and pyomo models can be written. Names follow
+pyomo's symbolic labels and row names carry pyomo's ``c_e_``, ``c_l_``,
+``c_u_`` and ``r_l_`` prefixes, so solver results (and duals) can be
+read back with pyomo's solver plugins.
+"""
+import gzip
+import heapq
+import tempfile
+from array import array
+
+import numpy as np
+from pyomo import environ as pyomo
+from pyomo.repn import generate_canonical_repn, LinearCanonicalRepn
+
+import sparsemodel
+from sparsemodel import inf, minimize, _as_numpy, _label_characters
+
+problem_formats = ['lp', 'mps']
+
+# rows formatted per write to the file
+block_size = 1000
+
+# MPS entries held in memory before a sorted run is spooled to disk
+spool_size = 2000000
+# MPS entries read at a time from each run while merging
+read_size = 100000
+
+
+def problem_filename(name, file_format='lp', compress=False):
+    '''the filename for a problem file, e.g. ``problem.mps.gz``'''
+    if file_format not in problem_formats:
+        raise ValueError('unknown problem file format "{}"'.format(
+            file_format))
+    return '{}.{}{}'.format(name, file_format, '.gz' if compress else '')
+
+
+def file_format_of(filename):
+    '''guess the problem file format from the filename'''
+    name = filename[:-3] if filename.endswith('.gz') else filename
+    for file_format in problem_formats:
+        if name.endswith('.' + file_format):
+            return file_format
+    return 'lp'
+
+
+def write_problem(model, filename, file_format=None):
+    '''
+    Write a model to an LP or MPS file.
+    The format defaults to the one given by the filename extension.
+    '''
+    if file_format is None:
+        file_format = file_format_of(filename)
+    if isinstance(model, sparsemodel.ConcreteModel):
+        problem = _SparseProblem(model)
+    else:
+        problem = _PyomoProblem(model)
+
+    if filename.endswith('.gz'):
+        f = gzip.open(filename, 'wb', compresslevel=6)
+    else:
+        f = open(filename, 'w')
+    with f:
+        if file_format == 'lp':
+            _write_lp(problem, f)
+        elif file_format == 'mps':
+            _write_mps(problem, f)
+        else:
+            raise ValueError('unknown problem file format "{}"'.format(
+                file_format))
+
+
+def _number(x):
+    return '%.17g' % x
+
+
+def _bound_number(x):
+    if x == inf:
+        return '+inf'
+    elif x == -inf:
+        return '-inf'
+    return _number(x)
+
+
+def _row_kind(lower, upper):
+    '''the pyomo prefix and the MPS row type for the row bounds'''
+    if lower == upper:
+        return 'c_e_', 'E'
+    elif lower == -inf:
+        return 'c_u_', 'L'
+    elif upper == inf:
+        return 'c_l_', 'G'
+    return 'r_l_', 'G'
+
+
+class _Problem(object):
+
+    '''
+    The linear problem, as a stream of rows.
+    Columns are numbered by position. Only the columns used by a row
+    or the objective are written and `used` is filled in as
+    the rows are streamed.
+    '''
+
+    def objective(self):
+        '''the sense, columns, coefficients and constant of the objective'''
+        raise NotImplementedError
+
+    def rows(self):
+        '''generate the (label, lower, upper, columns, coefficients) rows'''
+        raise NotImplementedError
+
+    def column(self, col):
+        '''the label, lower bound, upper bound and integrality of a column'''
+        raise NotImplementedError
+
+    def name(self, col):
+        return self.column(col)[0]
+
+    def used_columns(self):
+        return (col for col, used in enumerate(self.used) if used)
+
+
+class _SparseProblem(_Problem):
+
+    def __init__(self, model):
+        self._model = model
+        n_cols = len(model._col_lb)
+        self.used = bytearray(n_cols)
+
+        lb = _as_numpy(model._col_lb)
+        ub = _as_numpy(model._col_ub)
+        fixed = _as_numpy(model._col_fixed).astype(bool)
+        values = _as_numpy(model._col_value)
+        if np.isnan(values[fixed]).any():
+            raise ValueError('fixed variables must have a value')
+        lb[fixed] = ub[fixed] = values[fixed]
+        self._lb, self._ub = lb.tolist(), ub.tolist()
+        self._integer = (_as_numpy(model._col_integer).astype(bool) &
+                         ~fixed).tolist()
+
+    def objective(self):
+        objective = self._model._objective
+        if objective is None:
+            return minimize, [], [], 0.0
+        for col in objective._cols:
+            self.used[col] = True
+        return (objective.sense, objective._cols, objective._coefs,
+                objective._constant)
+
+    def rows(self):
+        model = self._model
+        indptr, indices, data = model._indptr, model._indices, model._data
+        labels, active = model._row_label, model._row_active
+        lower, upper = model._row_lb, model._row_ub
+        col_active = model._col_active
+        all_columns_active = all(col_active)
+        used = self.used
+        for row in xrange(len(labels)):
+            if not active[row]:
+                continue
+            start, stop = indptr[row], indptr[row + 1]
+            cols, coefs = indices[start:stop], data[start:stop]
+            if not all_columns_active:
+                # drop the coefficients of deleted variables
+                entries = [(col, coef) for col, coef in zip(cols, coefs)
+                           if col_active[col]]
+                cols = [col for col, coef in entries]
+                coefs = [coef for col, coef in entries]
+            for col in cols:
+                used[col] = True
+            yield labels[row], lower[row], upper[row], cols, coefs
+
+    def column(self, col):
+        return (self._model._col_label[col], self._lb[col], self._ub[col],
+                self._integer[col])
+
+    def name(self, col):
+        return self._model._col_label[col]
+
+
+def _pyomo_label(component):
+    name = component.cname(True).replace('[', '(').replace(']', ')')
+    return _label_characters.sub('_', name)
+
+
+class _PyomoProblem(_Problem):
+
+    '''
+    A pyomo model, converted one row at a time to its linear form.
+    Columns are numbered in the order they are first used.
+    '''
+
+    def __init__(self, model):
+        self._model = model
+        self._variables = []
+        self._names = []
+        self._positions = {}
+        self.used = bytearray()
+
+    def _columns(self, variables):
+        positions = self._positions
+        cols = []
+        for var in variables:
+            col = positions.get(id(var))
+            if col is None:
+                col = positions[id(var)] = len(self._variables)
+                self._variables.append(var)
+                self._names.append(_pyomo_label(var))
+                self.used.append(True)
+            cols.append(col)
+        return cols
+
+    def _linear(self, expr, label):
+        repn = generate_canonical_repn(expr)
+        if not isinstance(repn, LinearCanonicalRepn):
+            raise NotImplementedError(
+                '"{}" is not linear and cannot be written'.format(label))
+        constant = pyomo.value(repn.constant) if repn.constant else 0.0
+        variables = repn.variables or ()
+        coefs = [pyomo.value(coef) for coef in (repn.linear or ())]
+        return self._columns(variables), coefs, constant
+
+    def objective(self):
+        for name, index, objective in self._model.all_component_data(
+                pyomo.Objective, active=True, descend_into=True):
+            cols, coefs, constant = self._linear(objective.expr, name)
+            return objective.sense, cols, coefs, constant
+        return minimize, [], [], 0.0
+
+    def rows(self):
+        for name, index, constraint in self._model.all_component_data(
+                pyomo.Constraint, active=True, descend_into=True):
+            label = _pyomo_label(constraint)
+            cols, coefs, constant = self._linear(constraint.body, label)
+            lower, upper = [
+                pyomo.value(bound) - constant if bound is not None
+                else default for bound, default in
+                ((constraint.lower, -inf), (constraint.upper, inf))]
+            if not cols:
+                # a constraint on fixed variables
+                continue
+            yield label, lower, upper, cols, coefs
+
+    def column(self, col):
+        var = self._variables[col]
+        if var.fixed:
+            lb = ub = var.value
+        else:
+            lb = -inf if var.lb is None else pyomo.value(var.lb)
+            ub = inf if var.ub is None else pyomo.value(var.ub)
+        integer = not var.fixed and (var.is_integer() or var.is_binary())
+        return self._names[col], lb, ub, integer
+
+    def name(self, col):
+        return self._names[col]
+
+
+def _blocks(iterable, size=block_size):
+    block = []
+    for item in iterable:
+        block.append(item)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _write_lp(problem, f):
+    '''write the problem in CPLEX LP format'''
+    sense, cols, coefs, constant = problem.objective()
+    name = problem.name
+
+    def terms(cols, coefs):
+        return ''.join('%+.17g %s\n' % (coef, name(col))
+                       for col, coef in zip(cols, coefs))
+
+    f.write('\\* Source: minpower *\\\n\n')
+    f.write('min\n' if sense == minimize else 'max\n')
+    f.write('objective:\n')
+    f.write(terms(cols, coefs))
+    f.write('%+.17g ONE_VAR_CONSTANT\n\n' % constant)
+    f.write('s.t.\n\n')
+
+    for block in _blocks(problem.rows()):
+        lines = []
+        for label, lower, upper, cols, coefs in block:
+            body = terms(cols, coefs) or '+0 ONE_VAR_CONSTANT\n'
+            prefix = _row_kind(lower, upper)[0]
+            if prefix == 'c_e_':
+                bounds = [(prefix, '=', lower)]
+            elif prefix == 'c_u_':
+                bounds = [(prefix, '<=', upper)]
+            elif prefix == 'c_l_':
+                bounds = [(prefix, '>=', lower)]
+            else:
+                bounds = [('r_l_', '>=', lower), ('r_u_', '<=', upper)]
+            for prefix, relation, bound in bounds:
+                lines.append('%s%s_:\n%s%s %s\n\n' % (
+                    prefix, label, body, relation, _number(bound)))
+        f.write(''.join(lines))
+    f.write('c_e_ONE_VAR_CONSTANT:\nONE_VAR_CONSTANT = 1.0\n\n')
+
+    integers = []
+    f.write('bounds\n')
+    for block in _blocks(problem.used_columns()):
+        lines = []
+        for col in block:
+            label, lower, upper, integer = problem.column(col)
+            lines.append(' %s <= %s <= %s\n' % (
+                _bound_number(lower), label, _bound_number(upper)))
+            if integer:
+                integers.append(col)
+        f.write(''.join(lines))
+    if integers:
+        f.write('general\n')
+        for block in _blocks(integers):
+            f.write(''.join(' %s\n' % name(col) for col in block))
+    f.write('end\n')
+
+
+class _ColumnSpool(object):
+
+    '''
+    The (column, row, coefficient) entries of the problem,
+    sorted by column. Entries are spooled to temporary files
+    in sorted runs of `size` entries, which are merged on iteration.
+    '''
+
+    dtype = np.dtype([('col', np.int64), ('row', np.int64),
+                      ('coef', np.float64)])
+
+    def __init__(self, size=spool_size):
+        self._size = size
+        self._runs = []
+        self._new_buffer()
+
+    def _new_buffer(self):
+        self._cols, self._rows = array('l'), array('l')
+        self._coefs = array('d')
+
+    def add(self, row, cols, coefs):
+        self._cols.extend(cols)
+        self._rows.extend([row] * len(cols))
+        self._coefs.extend(coefs)
+        if len(self._cols) >= self._size:
+            run = tempfile.TemporaryFile(prefix='minpower-')
+            self._sorted_buffer().tofile(run)
+            self._runs.append(run)
+            self._new_buffer()
+
+    def _sorted_buffer(self):
+        entries = np.empty(len(self._cols), dtype=self.dtype)
+        entries['col'] = _as_numpy(self._cols)
+        entries['row'] = _as_numpy(self._rows)
+        entries['coef'] = _as_numpy(self._coefs)
+        self._new_buffer()
+        # rows are added in order, so a stable sort keeps them ordered
+        return entries[np.argsort(entries['col'], kind='mergesort')]
+
+    def _read(self, run):
+        run.seek(0)
+        while True:
+            entries = np.fromfile(run, dtype=self.dtype, count=read_size)
+            if not len(entries):
+                break
+            for entry in entries.tolist():
+                yield entry
+
+    def __iter__(self):
+        runs = [self._read(run) for run in self._runs]
+        runs.append(iter(self._sorted_buffer().tolist()))
+        if len(runs) == 1:
+            return runs[0]
+        return heapq.merge(*runs)
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+
+
+def _write_mps(problem, f):
+    '''write the problem in free MPS format'''
+    sense, cols, coefs, constant = problem.objective()
+    spool = _ColumnSpool()
+    objective_row = -1
+    spool.add(objective_row, cols, coefs)
+
+    f.write('NAME minpower\n')
+    if sense != minimize:
+        f.write('OBJSENSE\n    MAX\n')
+    f.write('ROWS\n N objective\n')
+    # the row names, right hand sides and ranges are needed after
+    # the column section
+    row_names = []
+    rhs = array('d')
+    ranges = {}
+    for block in _blocks(problem.rows()):
+        lines = []
+        for label, lower, upper, cols, coefs in block:
+            row = len(row_names)
+            prefix, kind = _row_kind(lower, upper)
+            name = prefix + label + '_'
+            row_names.append(name)
+            rhs.append(upper if kind == 'L' else lower)
+            if prefix == 'r_l_':
+                ranges[row] = upper - lower
+            spool.add(row, cols, coefs)
+            lines.append(' %s %s\n' % (kind, name))
+        f.write(''.join(lines))
+    one = len(row_names)
+    row_names.append('c_e_ONE_VAR_CONSTANT')
+    rhs.append(1.0)
+    f.write(' E c_e_ONE_VAR_CONSTANT\n')
+
+    f.write('COLUMNS\n')
+    is_integer = False
+    lines = []
+    current = None
+    for col, row, coef in spool:
+        if col != current:
+            current = col
+            name, lower, upper, integer = problem.column(col)
+            if integer != is_integer:
+                lines.append("    MARKER 'MARKER' '%s'\n" % (
+                    'INTORG' if integer else 'INTEND'))
+                is_integer = integer
+        lines.append('    %s %s %s\n' % (
+            name, 'objective' if row == objective_row else row_names[row],
+            _number(coef)))
+        if len(lines) >= block_size:
+            f.write(''.join(lines))
+            lines = []
+    if is_integer:
+        lines.append("    MARKER 'MARKER' 'INTEND'\n")
+    lines.append('    ONE_VAR_CONSTANT objective %s\n' % _number(constant))
+    lines.append('    ONE_VAR_CONSTANT %s 1\n' % row_names[one])
+    f.write(''.join(lines))
+    spool.close()
+
+    f.write('RHS\n')
+    for block in _blocks(row for row, value in enumerate(rhs) if value):
+        f.write(''.join('    RHS %s %s\n' % (row_names[row], _number(rhs[row]))
+                        for row in block))
+    if ranges:
+        f.write('RANGES\n')
+        f.write(''.join('    RNG %s %s\n' % (row_names[row], _number(width))
+                        for row, width in sorted(ranges.items())))
+
+    f.write('BOUNDS\n')
+    for block in _blocks(problem.used_columns()):
+        lines = []
+        for col in block:
+            name, lower, upper, integer = problem.column(col)
+            if lower == upper:
+                lines.append(' FX BND %s %s\n' % (name, _number(lower)))
+            elif lower == -inf and upper == inf:
+                lines.append(' FR BND %s\n' % name)
+            else:
+                if lower == -inf:
+                    lines.append(' MI BND %s\n' % name)
+                else:
+                    lines.append(' LO BND %s %s\n' % (name, _number(lower)))
+                if upper == inf:
+                    lines.append(' PL BND %s\n' % name)
+                else:
+                    lines.append(' UP BND %s %s\n' % (name, _number(upper)))
+        f.write(''.join(lines))
+    f.write(' FX BND ONE_VAR_CONSTANT 1\n')
+    f.write('ENDATA\n')
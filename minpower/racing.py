@@ -0,0 +1,260 @@
+"""
+Race several solvers (or settings of one solver) on the same problem.
+
+The problem file is written once and each contender solves it in
+its own process. The first contender to prove optimality (within
+its `mipgap`) wins and the others are stopped. The time and
+termination condition of every contender are recorded.
+"""
+import os
+import shutil
+import signal
+import tempfile
+import time
+import logging
+import multiprocessing
+from Queue import Empty
+
+from pyomo.opt import (SolverResults, SolverStatus, TerminationCondition,
+                       ProblemFormat)
+from pyomo.opt.base import solvers as cooprsolver
+from pyomo.opt.results.solution import Solution
+from pyutilib.services import TempfileManager
+
+import sparsemodel
+
+# seconds between checks that the contenders are still running
+poll_interval = 1.0
+
+
+class Contender(object):
+
+    '''a solver and its options'''
+
+    def __init__(self, name, options=None):
+        self.name = name
+        self.options = options or {}
+
+    def __str__(self):
+        return ' '.join([self.name] + ['{}={}'.format(key, val)
+                        for key, val in sorted(self.options.items())])
+
+
+def parse_contenders(text):
+    '''
+    Parse a comma separated list of contenders, each a solver name
+    followed by any options, e.g. ``glpk, cbc, cbc randomCbcSeed=7``.
+    '''
+    contenders = []
+    for entry in text.split(','):
+        words = entry.split()
+        if not words:
+            continue
+        options = {}
+        for word in words[1:]:
+            key, sep, val = word.partition('=')
+            if not sep:
+                raise ValueError(
+                    'solver option "{}" is not option=value'.format(word))
+            options[key] = _option_value(val)
+        contenders.append(Contender(words[0], options))
+    return contenders
+
+
+def _option_value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def race(instance, contenders, options=None, suffixes=(),
+         problem_format='lp', keepfiles=False, mipgap=None, time_limit=None):
+    '''
+    Solve the instance with all of the contenders in parallel.
+    The `options` are given to every contender, before its own options.
+    So are the `mipgap` (under each solver's name for it)
+    and the `time_limit` in seconds (zero for no limit).
+
+    :returns: the results of the winner and a list of records
+        (dicts of solver, time, termination and winner),
+        one for each contender
+    '''
+    # optimization imports this module
+    from optimization import mipgap_option
+    if options is None:
+        options = {}
+    directory = tempfile.mkdtemp(prefix='minpower-race-')
+    filename = os.path.join(directory, 'problem.' + problem_format)
+    symbol_map = _write(instance, filename, problem_format)
+
+    queue = multiprocessing.Queue()
+    processes = []
+    for number, contender in enumerate(contenders):
+        # each contender gets its own directory, as some solvers
+        # name their solution file after the problem file
+        contender_dir = os.path.join(directory, str(number))
+        os.mkdir(contender_dir)
+        problem = os.path.join(contender_dir, os.path.basename(filename))
+        os.symlink(filename, problem)
+        contender_options = dict(options)
+        if mipgap is not None:
+            contender_options[mipgap_option(contender.name)] = mipgap
+        process = multiprocessing.Process(
+            target=_run_contender,
+            args=(queue, number, contender, contender_options, problem,
+                  suffixes, time_limit))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    records = [dict(solver=str(contender), time=None,
+                    termination='cancelled', winner=False)
+               for contender in contenders]
+    start = time.time()
+    winner, fallback = None, None
+    remaining = len(contenders)
+    while remaining:
+        try:
+            number, summary = queue.get(timeout=poll_interval)
+        except Empty:
+            if not any(process.is_alive() for process in processes):
+                # contenders which crash never report back
+                break
+            continue
+        remaining -= 1
+        records[number].update(time=summary['time'],
+                               termination=summary['termination'])
+        if summary['termination'] == 'optimal':
+            winner = number, summary
+            break
+        elif fallback is None or \
+                (summary['solutions'] and not fallback[1]['solutions']):
+            # keep a solution (e.g. from a time limit) or a failure
+            fallback = number, summary
+
+    stopped = time.time() - start
+    for process, record in zip(processes, records):
+        if process.is_alive():
+            _stop(process)
+            record['time'] = stopped
+        process.join()
+
+    if keepfiles:
+        logging.info('solver problem file: {}'.format(filename))
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if winner is None:
+        winner = fallback
+    if winner is None:
+        raise ValueError('no solver finished the race')
+    number, summary = winner
+    records[number]['winner'] = True
+    logging.info('{} won the solver race in {:0.2f}s'.format(
+        records[number]['solver'], summary['time']))
+    return _results(summary, symbol_map), records
+
+
+def _write(instance, filename, problem_format):
+    '''write the problem file (returning the symbol map of pyomo models)'''
+    if isinstance(instance, sparsemodel.ConcreteModel):
+        instance.write(filename, problem_format)
+        return None
+    file_format = ProblemFormat.mps if problem_format == 'mps' \
+        else ProblemFormat.cpxlp
+    filename, symbol_map = instance.write(filename, format=file_format)
+    return symbol_map
+
+
+def _run_contender(queue, number, contender, options, filename, suffixes,
+                   time_limit=None):
+    '''solve the problem file (in a new process) and report back'''
+    try:
+        # stopping the contender's process group stops the solver
+        # (pyomo's runner also passes the signal on to the solver)
+        os.setpgrp()
+    except (AttributeError, OSError):
+        pass
+    TempfileManager.tempdir = os.path.dirname(filename)
+    start = time.time()
+    try:
+        solver = cooprsolver.SolverFactory(contender.name)
+        if solver is None:
+            raise ValueError(
+                'solver "{}" not found by pyomo'.format(contender.name))
+        for key, val in options.items() + contender.options.items():
+            setattr(solver.options, key, val)
+        summary = _summarize(solver.solve(filename, suffixes=list(suffixes),
+                                          timelimit=time_limit or None))
+    except Exception as error:
+        summary = dict(termination='error', status='error',
+                       message=str(error), solutions=[])
+    summary['time'] = time.time() - start
+    queue.put((number, summary))
+
+
+def _stop(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (AttributeError, OSError):
+        process.terminate()
+
+
+def _summarize(results):
+    '''the results as plain python objects (to pass between processes)'''
+    solutions = []
+    for solution in results.solution:
+        solutions.append(dict(
+            gap=_number(solution.gap),
+            objective=dict((name, _number(_entry_value(entry)))
+                           for name, entry in solution.objective.items()),
+            variable=dict((label, _number(entry['Value']))
+                          for label, entry in solution.variable.items()),
+            constraint=dict((label, _number(entry['Dual']))
+                            for label, entry in solution.constraint.items()
+                            if 'Dual' in entry)))
+    return dict(termination=str(results.solver.termination_condition),
+                status=str(results.solver.status),
+                message=str(results.solver.message), solutions=solutions)
+
+
+def _entry_value(entry):
+    return entry['Value'] if isinstance(entry, dict) else entry.value
+
+
+def _number(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _results(summary, symbol_map):
+    '''rebuild a solver results object from a summary'''
+    results = SolverResults()
+    results.solver.termination_condition = \
+        TerminationCondition(summary['termination'])
+    results.solver.status = SolverStatus(summary['status'])
+    results.solver.message = summary['message']
+    if symbol_map is not None:
+        results._symbol_map = symbol_map
+    for entry in summary['solutions']:
+        solution = Solution()
+        if entry['gap'] is not None:
+            solution.gap = entry['gap']
+        for name, val in entry['objective'].items():
+            solution.objective[name] = val
+        if symbol_map is None and 'objective' not in entry['objective'] \
+                and entry['objective']:
+            # file based solvers don't know the objective name
+            solution.objective['objective'] = \
+                list(entry['objective'].values())[0]
+        for label, val in entry['variable'].items():
+            solution.variable[label] = {'Value': val}
+        for label, dual in entry['constraint'].items():
+            solution.constraint[label] = {'Dual': dual}
+        results.solution.insert(solution)
+    return results
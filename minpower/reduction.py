@@ -0,0 +1,71 @@
+"""
+Kron reduction of the network (see `user_config.network_reduction`).
+
+Buses with no generators or loads (zero injection buses) are eliminated
+from the admittance matrix, so that they have no angle variables or
+power balance constraints. Their angles are weighted sums of the angles
+of the remaining buses, which give the flows on the lines to them.
+"""
+
+# smaller factors are left out of the line flows
+factor_tolerance = 1e-12
+
+
+def zero_injection_buses(buses):
+    '''the indices of the buses with no generators or loads'''
+    return [bus.index for bus in buses
+            if not (bus.generators or bus.loads or bus.isSwing)]
+
+
+def kron_reduce(Bmatrix, eliminate):
+    '''
+    Eliminate buses from the admittance matrix, one at a time
+    (those with the fewest neighbors first, to limit the fill-in).
+
+    :param Bmatrix: the admittance matrix (stored by row, as dicts)
+    :param eliminate: the indices of the buses to eliminate
+    :returns: the reduced matrix (with the rows of the eliminated
+        buses empty) and the angle of each eliminated bus
+        as a dict of {remaining bus index: factor}
+    '''
+    B = [dict(row) for row in Bmatrix]
+    steps = []
+    for z in sorted(eliminate, key=lambda z: len(B[z])):
+        neighbors = B[z]
+        Bzz = neighbors.pop(z, 0)
+        if not neighbors:
+            # an isolated bus is left as it is
+            neighbors[z] = Bzz
+            continue
+        for i, Biz in neighbors.items():
+            del B[i][z]
+            for j, Bzj in neighbors.items():
+                B[i][j] = B[i].get(j, 0) - Biz * Bzj / Bzz
+        # the bus has no injection, so sum_j B_zj*theta_j = 0
+        steps.append((z, dict((j, -Bzj / Bzz)
+                              for j, Bzj in neighbors.items())))
+        B[z] = dict()
+
+    # substitute back (from the last bus eliminated)
+    # so that the angles are in terms of the remaining buses
+    angles = dict()
+    for z, factors in reversed(steps):
+        combined = dict()
+        for j, factor in factors.items():
+            for k, f in angles.get(j, {j: 1.0}).items():
+                combined[k] = combined.get(k, 0) + factor * f
+        angles[z] = combined
+    return B, angles
+
+
+def line_flow_factors(from_angle, to_angle, reactance):
+    '''
+    The flow on a line as a dict of {bus: factor} (times the bus angle),
+    from the angles of its ends (as dicts of {bus: factor}).
+    '''
+    factors = dict()
+    for angle, sign in [(from_angle, 1.0), (to_angle, -1.0)]:
+        for bus, factor in angle.items():
+            factors[bus] = factors.get(bus, 0) + sign * factor / reactance
+    return dict((bus, factor) for bus, factor in factors.items()
+                if abs(factor) > factor_tolerance)
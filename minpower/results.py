@@ -141,14 +141,27 @@ class Solution(object):
             self.mipgap = None
 
     def _get_outputs(self):
-        self.generators_power = self.gen_time_df('power')
-        self.generators_status = correct_status(self.gen_time_df('status'))
+        power, status = self.power_system.disaggregate(
+            self.gen_time_df('power'), self.gen_time_df('status'),
+            self.times)
+        self.generators_power = power
+        self.generators_status = correct_status(status)
+
+    def stage_outputs(self):
+        '''the generators' power and status over all times (with any overlap)'''
+        power, status = self.power_system.disaggregate(
+            self.gen_time_df('power', non_overlap=False),
+            self.gen_time_df('status', non_overlap=False), self.times)
+        return power, correct_status(status)
 
     def _get_costs(self):
-        self.totalcost_generation = self.gen_time_df('cost', evaluate=True)
-        self.fuelcost = self.gen_time_df('operatingcost', evaluate=True)
+        self.totalcost_generation, self.fuelcost, self.incremental_cost = \
+            self.power_system.disaggregate_costs(
+                self.generators_status,
+                self.gen_time_df('cost', evaluate=True),
+                self.gen_time_df('operatingcost', evaluate=True),
+                self.gen_time_df('incrementalcost'))
         self.fuelcost_true = self.gen_time_df('truecost').sum().sum()
-        self.incremental_cost = self.gen_time_df('incrementalcost')
 
         times = self.times_non_overlap
         self.load_shed_timeseries = pd.Series(
@@ -48,6 +48,7 @@ class TimeIndex(object):
         self._int_overlap = 0
         self._int_division = len(self)
         self._str_start = str_start
+        self._schedule_strings = None
 
     def set_initial(self, initialTime=None):
         if initialTime:
@@ -93,11 +94,31 @@ class TimeIndex(object):
 
     def non_overlap(self):
         if self._int_overlap > 0:
-            return TimeIndex(self.strings.index[:-1 - self._int_overlap + 1], self._str_start)
+            times = TimeIndex(self.strings.index[:-1 - self._int_overlap + 1], self._str_start)
+            if self._schedule_strings is not None:
+                times._schedule_strings = self._schedule_strings[:len(times)]
+            return times
         else:
             return self
         return
 
+    def relabel(self, str_start=0):
+        '''
+        a copy of the times, with strings numbered from `str_start`
+        (the schedules are still indexed by the original strings)
+        '''
+        times = TimeIndex(self.times, str_start)
+        times._int_overlap = self._int_overlap
+        times._int_division = self._int_division
+        times._schedule_strings = self.schedule_strings()
+        return times
+
+    def schedule_strings(self):
+        '''the strings which index the schedules at these times'''
+        if getattr(self, '_schedule_strings', None) is not None:
+            return self._schedule_strings
+        return self._set
+
     def post_horizon(self):
         if len(self) > self._int_division + 1:
             str_start = int(self.strings.ix[self._int_division + 1].strip('t'))
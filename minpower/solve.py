@@ -20,6 +20,7 @@ import powersystems
 import get_data
 import stochastic
 import results
+import budget
 from standalone import store_times, init_store, get_storage, repack_storage
 
 
@@ -99,6 +100,13 @@ def standaloneUC():
 
         _setup_logging(args.pid)
 
+        if user_config.solver_time_budget:
+            storage = get_storage()
+            _set_stage_limits(power_system, stg, len(storage['solve_time']),
+                              storage['solve_time'][:stg],
+                              storage['mipgap'][:stg])
+            storage.close()
+
         sln = create_solve_problem(power_system, times, scenario_tree, stage_number=stg)
 
         store = store_state(power_system, times, sln)
@@ -184,17 +192,31 @@ def solve_multistage(power_system, times, scenario_tree=None, data=None):
     stage_times = times.subdivide(
         user_config.hours_commitment, user_config.hours_overlap)
 
+    power_system.reuse_stage_model = _can_reuse_stage_model(
+        power_system, scenario_tree)
+    if power_system.reuse_stage_model:
+        # label every stage's times like the first stage's,
+        # so that later stages can use the same model
+        stage_times = [t_stage.relabel() for t_stage in stage_times]
+
     stage_solutions = []
 
     for stg, t_stage in enumerate(stage_times):
         logging.info('Stage starting at {}'.format(t_stage.Start.date()))
+        if user_config.solver_time_budget:
+            _set_stage_limits(power_system, stg, len(stage_times),
+                              [sln.solve_time for sln in stage_solutions],
+                              [sln.mipgap for sln in stage_solutions])
         # solve
         solution = create_solve_problem(
-            power_system, t_stage, scenario_tree, stg)
+            power_system, t_stage, scenario_tree, stg,
+            previous_solution=stage_solutions[-1] if stg > 0 else None)
         # add to stage solutions
         stage_solutions.append(solution)
-        # reset model
-        power_system.reset_model()
+        # reset model (unless the next stage just updates its parameters)
+        if stg == len(stage_times) - 1 or \
+                not power_system.has_stage_template(stage_times[stg + 1]):
+            power_system.reset_model()
         # set inital state for next stage
         if stg < len(stage_times) - 1:
             power_system.set_initialconditions(stage_times[stg + 1].initialTime)
@@ -202,18 +224,56 @@ def solve_multistage(power_system, times, scenario_tree=None, data=None):
     return stage_solutions, stage_times
 
 
+def _set_stage_limits(power_system, stage, n_stages, solve_times, mipgaps):
+    '''set a stage's MIP gap and time limit from the solver time budget'''
+    mipgap, time_limit = budget.stage_limits(
+        stage, n_stages, solve_times, mipgaps)
+    power_system.set_solver_limits(mipgap, time_limit)
+    logging.info('stage {} solver limits: mipgap={:g}, time limit={:0.1f}s'
+                 .format(stage, mipgap, time_limit))
+
+
+def _can_reuse_stage_model(power_system, scenario_tree=None):
+    '''can the stage models be reused (see `user_config.reuse_stage_model`)'''
+    if not user_config.reuse_stage_model:
+        return False
+    if power_system.is_stochastic or \
+            (scenario_tree is not None and sum(scenario_tree.shape) > 0):
+        logging.warning('stochastic stage models cannot be reused')
+        return False
+    if user_config.deterministic_solve or user_config.perfect_solve:
+        logging.warning(
+            'stage models resolved with observed values cannot be reused')
+        return False
+    return True
+
+
 def create_solve_problem(power_system, times, scenario_tree=None,
-                         stage_number=None, rerun=False):
-    '''create and solve an optimization problem.'''
+                         stage_number=None, rerun=False,
+                         previous_solution=None):
+    '''
+    create and solve an optimization problem.
+    With `user_config.warm_start`, start from the
+    `previous_solution` (of the last stage).
+    '''
 
     create_problem(power_system, times, scenario_tree,
                    stage_number, rerun)
 
+    warm_start = user_config.warm_start and len(times) > 1 and \
+        not power_system.is_stochastic
+    if warm_start and previous_solution is not None:
+        power_system.set_warm_start(times, previous_solution.stage_power,
+                                    previous_solution.stage_status)
+
     instance = power_system.solve_problem(times)
 
     logging.debug('solved... get results')
 
     sln = results.make_solution(power_system, times)
+    if warm_start:
+        # keep the whole stage's commitment to start the next stage from
+        sln.stage_power, sln.stage_status = sln.stage_outputs()
 
     power_system.disallow_shedding()
 
@@ -236,7 +296,15 @@ def create_problem(power_system, times, scenario_tree=None,
                    stage_number=None, rerun=False):
     """Create an optimization problem."""
 
+    if power_system.has_stage_template(times):
+        power_system.update_stage(times)
+        logging.debug('updated the stage model')
+        return
+
     logging.debug('initialized problem')
+    if user_config.elastic_shedding:
+        # shed rather than be infeasible, so the stage is solved once
+        power_system.set_shedding_mode()
     power_system.create_variables(times)
     logging.debug('created variables')
     power_system.create_objective(times)
@@ -249,6 +317,9 @@ def create_problem(power_system, times, scenario_tree=None,
             power_system, times, time_stage=stage_number)
         stochastic.define_stage_variables(power_system, times)
         stochastic.create_problem_with_scenarios(power_system, times)
+
+    power_system.stage_template = \
+        times if power_system.reuse_stage_model else None
     return
 
 
@@ -0,0 +1,1017 @@
+"""
+A sparse-matrix model backend for Minpower.
+
+The default backend builds every row of the problem as a pyomo
+expression object, which makes model construction slow for large
+problems. This module implements the small part of the pyomo modeling
+interface that :mod:`optimization` uses (`ConcreteModel`, `Set`, `Var`,
+`Param`, `Constraint`, `Objective`, `Suffix` and `Piecewise`), but
+flattens each constraint directly into compressed sparse row arrays
+as it is added.
+
+Models are solved by writing an LP or MPS file (see :mod:`problem_writer`)
+for any of pyomo's file based solvers. The solution comes back as a
+:class:`pyomo.opt.SolverResults` labeled by component name, so the rest
+of minpower works unchanged.
+"""
+import os
+import re
+import logging
+import numbers
+import tempfile
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+from pyomo import environ as pyomo
+from pyomo.opt.base import solvers as cooprsolver
+
+inf = float('inf')
+minimize = pyomo.minimize
+maximize = pyomo.maximize
+
+_integer_domains = [pyomo.Boolean, pyomo.Binary, pyomo.Integers,
+                    pyomo.NonNegativeIntegers, pyomo.PositiveIntegers]
+
+
+def _is_integer_domain(domain):
+    return any(domain is d for d in _integer_domains)
+
+
+def _is_binary_domain(domain):
+    return domain is pyomo.Boolean or domain is pyomo.Binary
+
+
+class _Numeric(object):
+
+    '''arithmetic shared by variables, parameters and linear expressions'''
+
+    __slots__ = ()
+    # keep numpy scalars from taking over comparisons and arithmetic
+    __array_priority__ = 100
+    __array_ufunc__ = None
+
+    def __add__(self, other):
+        if _is_zero(other):
+            return self
+        return LinearExpression((self, other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if _is_zero(other):
+            return self
+        return LinearExpression((self, LinearExpression((other,), -1.0)))
+
+    def __rsub__(self, other):
+        return LinearExpression((other, LinearExpression((self,), -1.0)))
+
+    def __neg__(self):
+        return LinearExpression((self,), -1.0)
+
+    def __pos__(self):
+        return self
+
+    def __mul__(self, other):
+        coef = _constant_value(other)
+        if coef is not None:
+            return _scale(self, other, coef)
+        coef = _constant_value(self)
+        if coef is not None:
+            return _scale(other, self, coef)
+        raise TypeError('the sparse backend only supports linear expressions')
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        coef = _constant_value(other)
+        if coef is None:
+            raise TypeError(
+                'the sparse backend only supports linear expressions')
+        return _scale(self, other, 1.0 / coef)
+
+    __truediv__ = __div__
+
+    def __le__(self, other):
+        return Relation(self, other)
+
+    def __ge__(self, other):
+        return Relation(other, self)
+
+    def __eq__(self, other):
+        return Relation(self, other, equality=True)
+
+    __hash__ = object.__hash__
+
+    def __call__(self, exception=True):
+        return _evaluate(self)
+
+
+class LinearExpression(_Numeric):
+
+    '''
+    A lazy sum of terms, each scaled by `coef`.
+    Adding to an expression is O(1); the terms are only
+    flattened when the expression is stored as a row.
+    '''
+
+    __slots__ = ('_args', '_coef')
+
+    def __init__(self, args, coef=1.0):
+        self._args = args
+        self._coef = coef
+
+    @property
+    def value(self):
+        return _evaluate(self)
+
+
+class _ParameterProduct(LinearExpression):
+
+    '''
+    Terms scaled by a parameter. The coefficient is the parameter's
+    value when the product was made, so it can be evaluated
+    but not stored in a model (see :func:`_collect`).
+    '''
+
+    __slots__ = ()
+
+
+def _scale(expr, factor, coef):
+    '''`expr` times the constant `factor` (which has the value `coef`)'''
+    if not isinstance(factor, numbers.Number) and _has_parameter(factor):
+        return _ParameterProduct((expr,), coef)
+    return LinearExpression((expr,), coef)
+
+
+def _has_parameter(expr):
+    stack = [expr]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _ParamData):
+            return True
+        elif isinstance(item, LinearExpression):
+            stack.extend(item._args)
+    return False
+
+
+class Relation(object):
+
+    '''a linear relation ``lhs <= rhs`` (or ``lhs == rhs``)'''
+
+    __slots__ = ('lhs', 'rhs', 'equality')
+
+    def __init__(self, lhs, rhs, equality=False):
+        self.lhs = lhs
+        self.rhs = rhs
+        self.equality = equality
+
+    def __nonzero__(self):
+        lhs, rhs = _evaluate(self.lhs), _evaluate(self.rhs)
+        return lhs == rhs if self.equality else lhs <= rhs
+
+    __bool__ = __nonzero__
+
+
+def _is_zero(x):
+    return isinstance(x, numbers.Number) and x == 0
+
+
+def _collect(expr, params=None):
+    '''
+    Flatten an expression into (columns, coefficients, constant).
+    The (parameter, coefficient) terms of the constant
+    are appended to `params`, if given - then the expression is
+    being stored and cannot contain a product with a parameter,
+    whose coefficient would not follow the parameter's updates.
+    '''
+    cols, coefs = [], []
+    constant = 0.0
+    stack = [(expr, 1.0)]
+    while stack:
+        item, mult = stack.pop()
+        if isinstance(item, LinearExpression):
+            if params is not None and isinstance(item, _ParameterProduct):
+                raise TypeError('the sparse backend cannot multiply ' +
+                                'by a parameter in a constraint or objective')
+            mult *= item._coef
+            stack.extend((arg, mult) for arg in reversed(item._args))
+        elif isinstance(item, _VarData):
+            cols.append(item._col)
+            coefs.append(mult)
+        elif isinstance(item, _ParamData):
+            constant += mult * item.value
+            if params is not None:
+                params.append((item, mult))
+        else:
+            constant += mult * float(item)
+    return cols, coefs, constant
+
+
+def _constant_value(x):
+    '''the value of a constant expression, or None if it has variables'''
+    if isinstance(x, numbers.Number):
+        return float(x)
+    elif isinstance(x, _ParamData):
+        return x.value
+    cols, coefs, constant = _collect(x)
+    return None if cols else constant
+
+
+def _evaluate(expr):
+    cols, coefs, constant = _collect(expr)
+    if not cols:
+        return constant
+    model = _model_of(expr)
+    total = constant
+    for col, coef in zip(cols, coefs):
+        val = model._col_value[col]
+        if val != val:
+            raise ValueError('no value for uninitialized variable')
+        total += coef * val
+    return total
+
+
+def _model_of(expr):
+    stack = [expr]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _VarData):
+            return item._model
+        elif isinstance(item, LinearExpression):
+            stack.extend(item._args)
+
+
+def _as_numpy(arr):
+    if len(arr) == 0:
+        return np.zeros(0, dtype=arr.typecode)
+    return np.frombuffer(arr, dtype=arr.typecode).copy()
+
+
+_label_characters = re.compile(r'[^\w(),.]')
+
+
+def _index_label(index):
+    if isinstance(index, tuple):
+        return ','.join(str(i) for i in index)
+    return str(index)
+
+
+def _label(name, index=None):
+    '''a solver-safe label, formatted like pyomo's symbolic labels'''
+    if index is not None:
+        name = '{}({})'.format(name, _index_label(index))
+    return _label_characters.sub('_', name)
+
+_row_prefixes = ('c_e_', 'c_l_', 'c_u_', 'r_l_', 'r_u_')
+
+
+class _Component(object):
+
+    '''base class for model components'''
+
+    def _construct(self, model):
+        self._model = model
+
+    def _destroy(self):
+        pass
+
+    def set_value(self, value):
+        raise ValueError(
+            'cannot assign a value to component "{}"'.format(self.name))
+
+    def __str__(self):
+        return str(self.name)
+
+
+class Set(_Component):
+
+    '''an (ordered) set of index values'''
+
+    def __init__(self, *args, **kwds):
+        self.name = kwds.pop('name', None)
+        self._values = list(kwds.pop('initialize', None) or [])
+        self._position = dict((v, i) for i, v in enumerate(self._values))
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, value):
+        return value in self._position
+
+    def first(self):
+        return self._values[0]
+
+    def last(self):
+        return self._values[-1]
+
+    def ord(self, value):
+        return self._position[value] + 1
+
+    def prev(self, value):
+        position = self._position[value]
+        if position == 0:
+            raise IndexError(
+                'cannot get the previous element of the first element')
+        return self._values[position - 1]
+
+    def next(self, value):
+        return self._values[self._position[value] + 1]
+
+
+class _VarData(_Numeric):
+
+    '''a single variable (a column of the model)'''
+
+    __slots__ = ('_model', '_col')
+
+    def __init__(self, model, col):
+        self._model = model
+        self._col = col
+
+    def _get_value(self):
+        val = self._model._col_value[self._col]
+        return None if val != val else val
+
+    def _set_value(self, val):
+        self._model._col_value[self._col] = \
+            float('nan') if val is None else float(val)
+
+    value = property(_get_value, _set_value)
+
+    def _get_fixed(self):
+        return bool(self._model._col_fixed[self._col])
+
+    def _set_fixed(self, fixed):
+        self._model._col_fixed[self._col] = bool(fixed)
+
+    fixed = property(_get_fixed, _set_fixed)
+
+    @property
+    def lb(self):
+        lb = self._model._col_lb[self._col]
+        return None if lb == -inf else lb
+
+    @property
+    def ub(self):
+        ub = self._model._col_ub[self._col]
+        return None if ub == inf else ub
+
+    def setlb(self, lb):
+        self._model._col_lb[self._col] = -inf if lb is None else float(lb)
+
+    def setub(self, ub):
+        self._model._col_ub[self._col] = inf if ub is None else float(ub)
+
+    def fix(self, value=None):
+        if value is not None:
+            self.value = value
+        self.fixed = True
+
+    def unfix(self):
+        self.fixed = False
+
+    def set_value(self, val):
+        self.value = val
+
+
+class Var(_VarData, _Component):
+
+    '''a scalar or indexed variable'''
+
+    def __init__(self, *args, **kwds):
+        self._index = args[0] if args else None
+        self.name = kwds.pop('name', None)
+        self._bounds = kwds.pop('bounds', (None, None))
+        self.domain = kwds.pop('domain', pyomo.Reals)
+        self._col = None
+
+    def _construct(self, model):
+        self._model = model
+        lb, ub = [float(b) if b is not None else default
+                  for b, default in zip(self._bounds, (-inf, inf))]
+        if _is_binary_domain(self.domain):
+            lb, ub = max(lb, 0.0), min(ub, 1.0)
+        integer = _is_integer_domain(self.domain)
+        if self._index is None:
+            self._col = model._add_columns(
+                1, lb, ub, integer, [_label(self.name)])
+        else:
+            keys = list(self._index)
+            first = model._add_columns(
+                len(keys), lb, ub, integer,
+                [_label(self.name, key) for key in keys])
+            self._cols = OrderedDict(
+                (key, first + i) for i, key in enumerate(keys))
+
+    def _destroy(self):
+        for col in self._columns():
+            self._model._col_active[col] = False
+
+    def _columns(self):
+        if self._index is None:
+            return [self._col]
+        return self._cols.values()
+
+    def is_indexed(self):
+        return self._index is not None
+
+    def __getitem__(self, index):
+        if index is None and self._index is None:
+            return self
+        return _VarData(self._model, self._cols[index])
+
+    def __iter__(self):
+        return iter(self._cols)
+
+    def __len__(self):
+        return len(self._cols) if self._index is not None else 1
+
+    def keys(self):
+        return list(self._cols.keys())
+
+    def iteritems(self):
+        for key, col in self._cols.items():
+            yield key, _VarData(self._model, col)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return [var for key, var in self.iteritems()]
+
+    def _get_value(self):
+        if self._index is not None:
+            raise AttributeError('indexed variables do not have a value')
+        return _VarData._get_value(self)
+
+    value = property(_get_value, _VarData._set_value)
+
+
+class _ParamData(_Numeric):
+
+    '''
+    A single parameter value (a constant in expressions).
+    Rows (and objectives) remember the parameters in their constant terms
+    and are updated when a value changes. A product with a parameter
+    can be evaluated, but building a row from one is an error.
+    '''
+
+    __slots__ = ('_param', '_key')
+
+    def __init__(self, param, key):
+        self._param = param
+        self._key = key
+
+    def _get_value(self):
+        return self._param._data.get(self._key, self._param._default)
+
+    def _set_value(self, val):
+        param = self._param
+        previous = self._get_value()
+        param._data[self._key] = val
+        if previous is None:
+            return
+        for model, target, coef in param._dependents.get(self._key, []):
+            model._shift_constant(target, coef * (val - previous))
+
+    def _add_dependent(self, model, target, coef):
+        '''
+        record that a row (or objective) of a model depends on
+        the parameter, with d bound / d parameter = `coef`
+        '''
+        self._param._dependents.setdefault(self._key, []).append(
+            (model, target, coef))
+
+    value = property(_get_value, _set_value)
+
+    def set_value(self, val):
+        self.value = val
+
+    def __float__(self):
+        return float(self.value)
+
+
+class Param(_ParamData, _Component):
+
+    '''a scalar or indexed (mutable) parameter'''
+
+    def __init__(self, *args, **kwds):
+        self._index = args[0] if args else None
+        self.name = kwds.pop('name', None)
+        self._default = kwds.pop('default', None)
+        initialize = kwds.pop('initialize', None)
+        self._data = dict(initialize) if isinstance(initialize, dict) else {}
+        if self._index is None and initialize is not None \
+                and not isinstance(initialize, dict):
+            self._data[None] = initialize
+        self._dependents = {}
+        self._param = self
+        self._key = None
+
+    def is_indexed(self):
+        return self._index is not None
+
+    def __getitem__(self, index):
+        if index is None and self._index is None:
+            return self
+        if index not in self._data and index not in self._index:
+            raise KeyError(
+                'index "{}" is not valid for "{}"'.format(index, self.name))
+        return _ParamData(self, index)
+
+    def __setitem__(self, index, val):
+        if index is None and self._index is None:
+            self.value = val
+        else:
+            _ParamData(self, index).value = val
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index) if self._index is not None else 1
+
+    def keys(self):
+        return list(self._index)
+
+    def iteritems(self):
+        for key in self._index:
+            yield key, _ParamData(self, key)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return [param for key, param in self.iteritems()]
+
+
+class Constraint(_Component):
+
+    '''a scalar or indexed linear constraint'''
+
+    Skip = pyomo.Constraint.Skip
+
+    def __init__(self, *args, **kwds):
+        self._index = args[0] if args else None
+        self.name = kwds.pop('name', None)
+        self._expr = kwds.pop('expr', None)
+        self._rule = kwds.pop('rule', None)
+        self._rows = OrderedDict()
+
+    def _construct(self, model):
+        self._model = model
+        if self._index is None:
+            self._rows[None] = model._add_row(self._expr, _label(self.name))
+        elif self._rule is not None:
+            for index in self._index:
+                self.add(index, self._rule(model, index))
+        self._expr = self._rule = None
+
+    def _destroy(self):
+        for row in self._rows.values():
+            if row is not None:
+                self._model._row_active[row] = False
+
+    def add(self, index, expr):
+        '''add a row to an indexed constraint'''
+        if isinstance(expr, tuple) and expr == self.Skip:
+            return None
+        if index in self._rows:
+            del self[index]
+        self._rows[index] = self._model._add_row(
+            expr, _label(self.name, index))
+        return self[index]
+
+    def __delitem__(self, index):
+        row = self._rows.pop(index)
+        if row is not None:
+            self._model._row_active[row] = False
+
+    def is_indexed(self):
+        return self._index is not None
+
+    def __getitem__(self, index):
+        return _ConstraintData(self, index)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def keys(self):
+        return list(self._rows.keys())
+
+    def iteritems(self):
+        for key in self._rows:
+            yield key, _ConstraintData(self, key)
+
+    def items(self):
+        return list(self.iteritems())
+
+    @property
+    def _row(self):
+        return self._rows[None]
+
+
+class _ConstraintData(object):
+
+    __slots__ = ('_constraint', '_index')
+
+    def __init__(self, constraint, index):
+        self._constraint = constraint
+        self._index = index
+
+    @property
+    def _row(self):
+        return self._constraint._rows[self._index]
+
+
+class Objective(_Component):
+
+    '''the linear objective of the model'''
+
+    def __init__(self, *args, **kwds):
+        self.name = kwds.pop('name', None)
+        self._expr = kwds.pop('expr', None)
+        self.sense = kwds.pop('sense', minimize)
+
+    def _construct(self, model):
+        self._model = model
+        params = []
+        self._cols, self._coefs, self._constant = _collect(self._expr, params)
+        for param, coef in params:
+            param._add_dependent(model, self, coef)
+        self._expr = None
+        model._objective = self
+
+    def _destroy(self):
+        if self._model._objective is self:
+            self._model._objective = None
+
+    @property
+    def value(self):
+        total = self._constant
+        for col, coef in zip(self._cols, self._coefs):
+            total += coef * self._model._col_value[col]
+        return total
+
+    def __call__(self, exception=True):
+        return self.value
+
+
+class Suffix(_Component):
+
+    '''a suffix for importing constraint duals'''
+
+    IMPORT = pyomo.Suffix.IMPORT
+
+    def __init__(self, *args, **kwds):
+        self.name = kwds.pop('name', None)
+        self.direction = kwds.pop('direction', self.IMPORT)
+
+    def getValue(self, component):
+        row = component._row
+        if row is None:
+            # a constraint which was trivially satisfied
+            return 0.0
+        dual = self._model._row_dual[row]
+        return None if dual != dual else dual
+
+
+class Piecewise(_Component):
+
+    '''
+    A piecewise linear lower bound ``y[t] >= f(x[t])``.
+    Only convex functions are supported. These are represented
+    by one inequality per segment and, as in pyomo's simplified
+    piecewise representation, `x` is limited to the domain of the points.
+    '''
+
+    def __init__(self, index, yvar, xvar, **kwds):
+        self._index = index
+        self._yvar = yvar
+        self._xvar = xvar
+        self._f_rule = kwds.pop('f_rule')
+        self._pw_pts = kwds.pop('pw_pts')
+        self._constr_type = kwds.pop('pw_constr_type', 'EQ')
+        self.name = kwds.pop('name', None)
+        self._rows = []
+
+    def _construct(self, model):
+        self._model = model
+        if self._constr_type != 'LB':
+            raise NotImplementedError(
+                'the sparse backend only supports LB piecewise functions')
+        for t in self._index:
+            segments = self._segments(t)
+            y, x = self._yvar[t], self._xvar[t]
+            for k, (slope, intercept) in enumerate(segments):
+                row = model._add_row(Relation(intercept, y - slope * x),
+                                     _label(self.name, (t, k)))
+                self._rows.append(((t, k), row))
+
+            x_min, x_max = min(self._pw_pts[t]), max(self._pw_pts[t])
+            if x.lb is None or x.lb < x_min:
+                key = (t, 'domain_lower')
+                self._rows.append((key, model._add_row(
+                    Relation(x_min, x), _label(self.name, key))))
+            if x.ub is None or x.ub > x_max:
+                key = (t, 'domain_upper')
+                self._rows.append((key, model._add_row(
+                    Relation(x, x_max), _label(self.name, key))))
+
+    def _segments(self, t):
+        points = sorted(set(self._pw_pts[t]))
+        values = [self._f_rule(self._model, t, x) for x in points]
+        if len(points) == 1:
+            return [(0.0, values[0])]
+        segments = []
+        for x0, x1, y0, y1 in zip(points[:-1], points[1:],
+                                  values[:-1], values[1:]):
+            slope = (y1 - y0) / float(x1 - x0)
+            if segments and slope < segments[-1][0] - 1e-9 * abs(slope):
+                raise NotImplementedError(
+                    'the sparse backend only supports convex piecewise ' +
+                    'functions ("{}" is not convex)'.format(self.name))
+            segments.append((slope, y0 - slope * x0))
+        return segments
+
+    def _destroy(self):
+        for key, row in self._rows:
+            if row is not None:
+                self._model._row_active[row] = False
+
+
+class ConcreteModel(object):
+
+    '''
+    A model whose rows are stored as sparse arrays.
+    Components are added and accessed as attributes, like pyomo.
+    '''
+
+    def __init__(self, name='unknown'):
+        d = self.__dict__
+        d['name'] = name
+        d['_components'] = OrderedDict()
+        d['_objective'] = None
+        # columns
+        d['_col_lb'] = array('d')
+        d['_col_ub'] = array('d')
+        d['_col_value'] = array('d')
+        d['_col_integer'] = array('b')
+        d['_col_fixed'] = array('b')
+        d['_col_active'] = array('b')
+        d['_col_label'] = []
+        # rows, stored in compressed sparse row form
+        d['_indptr'] = array('l', [0])
+        d['_indices'] = array('l')
+        d['_data'] = array('d')
+        d['_row_lb'] = array('d')
+        d['_row_ub'] = array('d')
+        d['_row_active'] = array('b')
+        d['_row_dual'] = array('d')
+        d['_row_label'] = []
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['_components'][name]
+        except KeyError:
+            raise AttributeError(
+                'model has no component "{}"'.format(name))
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        elif isinstance(value, _Component):
+            if self._components.get(name) is not value:
+                self.add_component(name, value)
+        elif name in self._components:
+            self._components[name].set_value(value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if name in self._components:
+            self.del_component(name)
+        else:
+            object.__delattr__(self, name)
+
+    def add_component(self, name, component):
+        if name in self._components:
+            logging.debug('replacing model component "{}"'.format(name))
+            self.del_component(name)
+        if component.name is None:
+            component.name = name
+        component._construct(self)
+        self._components[name] = component
+
+    def del_component(self, name):
+        self._components.pop(name)._destroy()
+
+    def active_components(self, kind):
+        '''the components of a kind (e.g. `pyomo.Var`), by name'''
+        kind_name = kind.__name__
+        return OrderedDict(
+            (name, component) for name, component in self._components.items()
+            if type(component).__name__ == kind_name)
+
+    def create(self):
+        return self
+
+    def preprocess(self):
+        '''fixing variables only changes bounds, so there is nothing to do'''
+        pass
+
+    def clone(self):
+        raise NotImplementedError(
+            'stochastic problems are not supported by the sparse backend')
+
+    def _add_columns(self, n, lb, ub, integer, labels):
+        first = len(self._col_lb)
+        self._col_lb.extend([lb] * n)
+        self._col_ub.extend([ub] * n)
+        self._col_value.extend([float('nan')] * n)
+        self._col_integer.extend([integer] * n)
+        self._col_fixed.extend([False] * n)
+        self._col_active.extend([True] * n)
+        self._col_label.extend(labels)
+        return first
+
+    def _add_row(self, relation, name=None):
+        '''
+        Add a row to the model from a relation.
+        As in pyomo, constant terms are moved to the bounds and
+        the body is the side with variables (or ``lhs - rhs``).
+        Returns the row number (None for trivially satisfied rows).
+        '''
+        if isinstance(relation, bool) or relation is None:
+            if relation is False:
+                raise ValueError(
+                    'constraint "{}" is infeasible'.format(name))
+            return None
+        lparams, rparams = [], []
+        lcols, lcoefs, lconst = _collect(relation.lhs, lparams)
+        rcols, rcoefs, rconst = _collect(relation.rhs, rparams)
+        # the bound is (rhs - lhs) constant, unless the variables are on the rhs
+        sign = 1.0
+        if not rcols:
+            cols, coefs = lcols, lcoefs
+            bound = rconst - lconst
+            lower, upper = (bound if relation.equality else -inf), bound
+        elif not lcols:
+            cols, coefs = rcols, rcoefs
+            bound = lconst - rconst
+            lower, upper = bound, (bound if relation.equality else inf)
+            sign = -1.0
+        else:
+            cols = lcols + rcols
+            coefs = lcoefs + [-c for c in rcoefs]
+            bound = rconst - lconst
+            lower, upper = (bound if relation.equality else -inf), bound
+
+        if not cols:
+            if not (lower - 1e-9 <= 0 <= upper + 1e-9):
+                raise ValueError('constraint "{}" is infeasible'.format(name))
+            return None
+
+        if len(set(cols)) != len(cols):
+            merged = OrderedDict()
+            for col, coef in zip(cols, coefs):
+                merged[col] = merged.get(col, 0.0) + coef
+            cols, coefs = list(merged.keys()), list(merged.values())
+
+        row = len(self._row_lb)
+        self._indices.extend(cols)
+        self._data.extend(coefs)
+        self._indptr.append(len(self._indices))
+        self._row_lb.append(lower)
+        self._row_ub.append(upper)
+        self._row_active.append(True)
+        self._row_dual.append(float('nan'))
+        self._row_label.append(name or 'r{}'.format(row))
+        for param, coef in rparams:
+            param._add_dependent(self, row, sign * coef)
+        for param, coef in lparams:
+            param._add_dependent(self, row, -sign * coef)
+        return row
+
+    def _shift_constant(self, target, change):
+        '''move the bounds of a row (or an objective's constant)'''
+        if isinstance(target, Objective):
+            target._constant += change
+        else:
+            self._row_lb[target] += change
+            self._row_ub[target] += change
+
+    def _labeled_columns(self):
+        for col, label in enumerate(self._col_label):
+            if self._col_active[col]:
+                yield label, col
+
+    def _labeled_rows(self):
+        for row, label in enumerate(self._row_label):
+            if self._row_active[row]:
+                yield label, row
+
+    def load(self, results, **kwds):
+        '''load the values (and duals) from a results object'''
+        solution = results.solution(0)
+        columns = dict(self._labeled_columns())
+        for label, var in solution.variable.items():
+            col = columns.get(label)
+            if col is not None:
+                self._col_value[col] = var['Value']
+        if len(solution.constraint):
+            rows = dict(self._labeled_rows())
+            for label, con in solution.constraint.items():
+                if label[:4] in _row_prefixes and label.endswith('_'):
+                    label = label[4:-1]
+                row = rows.get(label)
+                if row is not None and 'Dual' in con:
+                    self._row_dual[row] = con['Dual']
+        return True
+
+    def write(self, filename, file_format=None, **kwds):
+        '''write the model to an LP or MPS file'''
+        # problem_writer imports this module
+        import problem_writer
+        problem_writer.write_problem(self, filename, file_format)
+
+    def pprint(self, filename=None):
+        '''write a summary of the model components'''
+        lines = ['{}: {} components, {} rows, {} columns'.format(
+            self.name, len(self._components),
+            sum(self._row_active), sum(self._col_active))]
+        for name, component in self._components.items():
+            lines.append('  {} : {}'.format(name, type(component).__name__))
+        text = '\n'.join(lines) + '\n'
+        if filename is None:
+            print(text)
+        else:
+            with open(filename, 'w') as f:
+                f.write(text)
+
+
+class _Options(dict):
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+def SolverFactory(name, problem_format='lp', **kwds):
+    return SparseSolver(name, problem_format)
+
+
+class SparseSolver(object):
+
+    '''
+    Solve a sparse model by giving an LP (or MPS) file
+    to one of pyomo's solvers.
+    '''
+
+    def __init__(self, name, problem_format='lp'):
+        self.name = name
+        self.problem_format = problem_format
+        self.options = _Options()
+
+    def solve(self, instance, suffixes=(), keepfiles=False, tee=False,
+              timelimit=None, **kwds):
+        solver = cooprsolver.SolverFactory(self.name)
+        if solver is None:
+            raise ValueError('solver "{}" not found by pyomo'.format(self.name))
+        for key, val in self.options.items():
+            setattr(solver.options, key, val)
+
+        handle, filename = tempfile.mkstemp(
+            suffix='.' + self.problem_format, prefix='minpower-')
+        os.close(handle)
+        instance.write(filename, self.problem_format)
+        try:
+            results = solver.solve(filename, suffixes=list(suffixes),
+                                   keepfiles=keepfiles, tee=tee,
+                                   timelimit=timelimit)
+        finally:
+            if keepfiles:
+                logging.info('solver problem file: {}'.format(filename))
+            else:
+                os.remove(filename)
+
+        if len(results.solution):
+            # file based solvers don't know the objective name
+            objective = results.solution(0).objective
+            if 'objective' not in objective and len(objective):
+                entry = list(objective.values())[0]
+                objective['objective'] = entry['Value'] \
+                    if isinstance(entry, dict) else entry.value
+        return results
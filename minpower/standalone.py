@@ -46,7 +46,7 @@ def init_store(power_system, times, data):
     '''create the store before the first stage'''
     wipe_storage()
     storage = get_storage()
-    generators = power_system.generators()
+    generators = power_system.units()
 
     # store the problem info read from the spreadsheets
     for key, df in data.iteritems():
@@ -114,7 +114,7 @@ def _get_problem_version():
 
 def store_state(power_system, times, sln=None):
     storage = get_storage()
-    generators = power_system.generators()
+    generators = power_system.units()
 
     stg = sln.stage_number
     table_append(storage, 'power', sln.generators_power)
@@ -123,9 +123,10 @@ def store_state(power_system, times, sln=None):
     table_append(storage, 'gen_shed', sln.gen_shed_timeseries)
 
     tEnd = times.last_non_overlap()
+    hours = power_system.fleet.final_conditions.hoursinstatus
     storage['hrsinstatus'] = gen_time_dataframe(generators, [tEnd],
                                                 values=[
-                                                [gen.finalstatus['hoursinstatus'] for gen in generators]
+                                                [hours.get(str(gen), 0) for gen in generators]
                                                 ])
 
     _add_tbl_val(storage, 'solve_time', stg, sln.solve_time)
@@ -185,7 +186,7 @@ def load_state():
 
     # create power_system
     power_system, times, scenario_tree = parse_standalone(storage, times)
-    generators = power_system.generators()
+    generators = power_system.units()
 
     # set up initial state
     t = times.initialTime
@@ -65,6 +65,10 @@ def define_stage_variables(power_system, times):
         if gen.is_controllable:
             variables_first_stage.add(
                 str(gen.get_variable('status', indexed=True, time=None)) + '[*]')
+            if gen.startup_indicators:
+                for name in ['startup', 'shutdown']:
+                    variables_first_stage.add(
+                        str(gen.get_variable(name, indexed=True, time=None)) + '[*]')
             variables_second_stage.add(
                 str(gen.get_variable('power', indexed=True, time=None)) + '[*]')
         # note - appending '[*]' to the indicies is required to get
@@ -79,6 +83,16 @@ def define_stage_variables(power_system, times):
             variables_second_stage.add(
                 str(load.get_variable('power', time=None, indexed=True)) + '[*]')
 
+    # the shedding slacks, which are released to allow shedding
+    for load in filter(lambda load: load.shedding_slack,
+                       power_system.loads()):
+        variables_second_stage.add(
+            str(load.get_variable('shed', time=None, indexed=True)) + '[*]')
+    for gen in filter(lambda gen: gen.shedding_slack,
+                      power_system.get_generators_noncontrollable()):
+        variables_second_stage.add(
+            str(gen.get_variable('power_shed', time=None, indexed=True)) + '[*]')
+
     # variables_first_stage.pprint()
     scenario_tree = power_system._scenario_tree_instance
     scenario_tree.StageDerivedVariables = []
@@ -157,6 +171,8 @@ def create_problem_with_scenarios(power_system, times):
     power_system._stochastic_instance = full_problem_instance
     power_system._scenario_tree = scenario_tree
     power_system._scenario_instances = scenario_instances
+    # cached scenario components belong to the old instances
+    power_system._clear_handles()
     return
 
 
@@ -7,10 +7,12 @@ import pandas as pd
 import numpy as np
 
 from pandas.util.testing import assert_series_equal
-from minpower.generators import Generator_nonControllable, Generator_Stochastic
+from minpower.generators import (Generator_nonControllable, Generator_Stochastic,
+                                  updown_formulations, ramp_formulations)
 from minpower.optimization import value
 from minpower.schedule import TimeIndex
 from test_utils import *
+from minpower.results import make_solution
 
 
 @istest
@@ -172,6 +174,128 @@ def hot_shut_down():
     assert value(generators[1].status(times[1])) == 0
 
 
+@istest
+@with_setup(reset_config, reset_config)
+def ramp_formulations_match():
+    '''
+    Create three generators, one with startup, shutdown and ramp rate limits
+    which must start up, ramp up and down and then shut down.
+    Solve with each ramp formulation.
+    Ensure that the costs match and that the generator is within its limits.
+    '''
+    ramp_limit_SU, ramp_limit_SD = 20, -30
+    ramp_limit_up, ramp_limit_down = 30, -20
+    costs = []
+    for formulation in ramp_formulations:
+        user_config.ramp_formulation = formulation
+        generators = [
+            make_cheap_gen(pmax=200),
+            make_mid_gen(pmin=10, minuptime=2,
+                         rampratemax=ramp_limit_up,
+                         rampratemin=ramp_limit_down,
+                         startupramplimit=ramp_limit_SU,
+                         shutdownramplimit=ramp_limit_SD),
+            make_expensive_gen(pmin=1)]
+        initial = [{'power': 200}, {'status': 0}, {'status': 0}]
+        power_system, times = solve_problem(
+            generators, gen_init=initial, do_reset_config=False,
+            **make_loads_times(Pdt=[200, 230, 280, 260, 220, 200]))
+        costs.append(power_system.objective)
+
+        # starting from off
+        power = [0] + [value(generators[1].power(t)) for t in times]
+        status = [0] + [value(generators[1].status(t)) for t in times]
+        assert status[-1] == 0 and 1 in status
+        for t in range(1, len(power)):
+            ramp = power[t] - power[t - 1]
+            if status[t] and not status[t - 1]:
+                assert power[t] <= ramp_limit_SU
+            elif status[t - 1] and not status[t]:
+                assert ramp >= ramp_limit_SD
+            elif status[t]:
+                assert ramp_limit_down <= ramp <= ramp_limit_up
+    assertAlmostEqual(*costs)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def presolve_matches():
+    '''
+    Create generators with ramp limits wider than their range,
+    one interval min up/down times, a must run unit (with a startup cost)
+    and units forced on and off by their initial min up/down times.
+    Solve with and without the presolve.
+    Ensure that the costs match, that the presolve removed rows and
+    columns and that the forced statuses hold.
+    '''
+    Pdt = [150, 280, 330, 250, 120, 150]
+    costs = []
+    for presolve in [False, True]:
+        user_config.update(dict(presolve=presolve, mipgap=0))
+        generators = [
+            make_cheap_gen(pmax=100, mustrun=True, startupcost=50),
+            make_mid_gen(pmin=10, pmax=100, rampratemax=200,
+                         rampratemin=-200, minuptime=1, mindowntime=1),
+            make_expensive_gen(pmin=20, pmax=100, minuptime=3),
+            make_expensive_gen(pmin=20, pmax=100, mindowntime=3,
+                               costcurveequation='25P')]
+        initial = [{}, {}, dict(status=1, hoursinstatus=1, power=50),
+                   dict(status=0, hoursinstatus=1)]
+        power_system, times = solve_problem(
+            generators, gen_init=initial, do_reset_config=False,
+            **make_loads_times(Pdt=Pdt))
+        costs.append(power_system.objective)
+    assertAlmostEqual(*costs)
+
+    assert power_system.presolved['rows'] > 0
+    assert power_system.presolved['columns'] > 0
+    assert [value(generators[2].status(t)) for t in times[:2]] == [1, 1]
+    assert [value(generators[3].status(t)) for t in times[:2]] == [0, 0]
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def clustered_units_match():
+    '''
+    Create a cheap generator and four identical generators with
+    min up/down times and startup costs (two of them initially on).
+    Solve with and without clustering the identical units.
+    Ensure that the costs match and that the units of the cluster
+    keep to their limits.
+    '''
+    Pdt = [150, 250, 380, 300, 150, 120]
+    costs = []
+    for cluster_units in [False, True]:
+        user_config.update(dict(cluster_units=cluster_units, mipgap=0))
+        generators = [make_cheap_gen(pmax=100)] + [
+            make_mid_gen(pmin=40, pmax=100, minuptime=2, mindowntime=2,
+                         startupcost=100) for g in range(4)]
+        initial = [{}] + [dict(status=on, hoursinstatus=1, power=50 * on)
+                          for on in [1, 1, 0, 0]]
+        power_system, times = solve_problem(
+            generators, gen_init=initial, do_reset_config=False,
+            **make_loads_times(Pdt=Pdt))
+        costs.append(power_system.objective)
+    assertAlmostEqual(*costs)
+
+    cluster, = power_system.clusters
+    assert cluster.members == generators[1:]
+    sln = make_solution(power_system, times)
+    names = [str(gen) for gen in generators]
+    assert sln.generators_status.columns.tolist() == names
+    assert sln.totalcost_generation.columns.tolist() == names
+    assertAlmostEqual(sln.totalcost_generation.sum().sum(), costs[-1])
+    status = sln.generators_status[names[1:]]
+    power = sln.generators_power[names[1:]]
+    assert status.sum(axis=1).tolist() == \
+        [value(cluster.status(t)) for t in times]
+    assert (power <= 100 * status + 1e-5).all().all()
+    assert (power >= 40 * status - 1e-5).all().all()
+    # the initially on units stay on (and off units stay off) for an hour
+    assert status.iloc[0].tolist()[:2] == [1, 1]
+    assert status.iloc[0].tolist()[2:] == [0, 0]
+
+
 @istest
 def min_up_time():
     '''
@@ -279,6 +403,35 @@ def min_up_time_longer():
     assert limgen_status == [0, 1, 1, 1, 1, 1, 1, 1, 1, 0] or limgen_status == [1, 1, 1, 1, 1, 1, 1, 1, 0, 0]
 
 
+@istest
+@with_setup(reset_config, reset_config)
+def min_up_time_formulations():
+    '''
+    Solve the longer min up time problem (with a startup cost)
+    with each min up/down time formulation.
+    Ensure that the expensive generator is on for its min up time
+    and that its startup indicators match its status.
+    '''
+    for formulation in updown_formulations:
+        user_config.updown_formulation = formulation
+        generators = [
+            make_cheap_gen(pmax=100),
+            make_expensive_gen(minuptime=8, pmin=5, startupcost=10)]
+        initial = [
+            dict(power=80, status=True, hoursinstatus=1),
+            dict(status=False, hoursinstatus=0)]
+        _, times = solve_problem(
+            generators, gen_init=initial, do_reset_config=False,
+            **make_loads_times(Pdt=[85, 120, 80, 80, 70, 70, 70, 70, 80, 80]))
+        limgen_status = [value(generators[1].status(t)) for t in times]
+        assert limgen_status == [0, 1, 1, 1, 1, 1, 1, 1, 1, 0] or limgen_status == [1, 1, 1, 1, 1, 1, 1, 1, 0, 0]
+        if generators[1].startup_indicators:
+            previous_status = [0] + limgen_status[:-1]
+            assert [value(generators[1].startup(t)) for t in times] == \
+                [int(now > before) for now, before
+                 in zip(limgen_status, previous_status)]
+
+
 @istest
 def wind_shedding():
     '''
@@ -310,6 +463,48 @@ def wind_shedding():
     assert sum(generators[1].power(t).value for t in times) == 25 + 10 + 20
 
 
+@istest
+@with_setup(reset_config, reset_config)
+def noncontrollable_aggregation():
+    '''
+    Create a wind and a solar generator (with no cost) and a sheddable
+    wind generator, with reserve. Solve with and without aggregating
+    the non-controllable generators, for each model backend.
+    Ensure that only the generators with no cost which are never shed
+    are aggregated (with no model components) and that the costs,
+    prices and generator powers (in the results) match.
+    '''
+    lts = make_loads_times(Pdt=[85, 110, 80, 80])
+    strings = lts['times'].strings.values
+    for backend in ['pyomo', 'sparse']:
+        solutions = {}
+        for aggregate in [False, True]:
+            user_config.update(model_backend=backend, duals=True,
+                               reserve_fixed=10,
+                               aggregate_noncontrollable=aggregate)
+            generators = [
+                Generator_nonControllable(
+                    schedule=pd.Series([20, 30, 10, 0], index=strings)),
+                Generator_nonControllable(
+                    schedule=pd.Series([0, 10, 20, 10], index=strings),
+                    kind='solar'),
+                Generator_nonControllable(
+                    schedule=pd.Series([20, 30, 20, 30], index=strings),
+                    sheddingallowed=True),
+                make_cheap_gen(pmax=40), make_expensive_gen()]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False, **lts)
+            sln = make_solution(power_system, times)
+            solutions[aggregate] = dict(
+                objective=power_system.objective,
+                prices=[power_system.buses[0].price(t) for t in times],
+                power=sln.generators_power.values.tolist())
+        assert [gen.aggregated for gen in generators] == \
+            [True, True, False, False, False]
+        assert not hasattr(power_system._model, generators[0]._id('power'))
+        assert solutions[True] == solutions[False]
+
+
 @istest
 def pmin_startup_limit():
     '''
@@ -423,6 +618,44 @@ def final_conditions():
     assert(gen.gethrsinstatus(times, status) == 6)
 
 
+@istest
+def fleet_final_conditions():
+    '''
+    Create generators in a power system (which makes their fleet).
+    Ensure that their attributes are views of the fleet arrays,
+    that the fleet's hours in status match each generator's
+    and that the final conditions become the initial conditions.
+    '''
+    generators = [make_cheap_gen(), make_mid_gen(rampratemax=50),
+                  make_expensive_gen()]
+    for g, (status, hours) in enumerate([(1, 10), (0, 2), (0, 5)]):
+        generators[g].index = g
+        generators[g].set_initial_condition(status=status, hoursinstatus=hours)
+    power_system = powersystems.PowerSystem(
+        generators, make_loads_times(Pd=100)['loads'])
+    fleet = power_system.fleet
+    assert fleet.values('pmax').tolist() == [gen.pmax for gen in generators]
+    assert generators[0].rampratemax is None and \
+        generators[1].rampratemax == 50
+    generators[2].pmax = 90
+    assert fleet.values('pmax')[2] == 90
+
+    times = TimeIndex(pd.date_range(
+        '2010-01-01 00:00:00', '2010-01-01 5:00:00', freq='H'))
+    status = pd.DataFrame({'g0': [1, 1, 1, 1, 1, 1],
+                           'g1': [0, 0, 0, 1, 1, 1],
+                           'g2': [0, 0, 0, 0, 0, 0]}, index=times)
+    hours = fleet.hours_in_status(status, times.intervalhrs)
+    assert hours.tolist() == [gen.gethrsinstatus(times, status[str(gen)])
+                              for gen in generators]
+
+    fleet.set_final_conditions(status.ix[-1], [80, 60, 20], hours)
+    fleet.set_initial_conditions()
+    assert [gen.initial_status for gen in generators] == [1, 1, 0]
+    assert [gen.initial_power for gen in generators] == [80, 60, 0]
+    assert [gen.initial_status_hours for gen in generators] == [16, 3, 11]
+
+
 @istest
 def initial_min_up_time():
     '''ensure the generator meets its minuptime limit at t0'''
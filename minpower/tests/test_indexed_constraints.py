@@ -0,0 +1,106 @@
+'''Test the indexed constraint formulation'''
+from minpower import powersystems, solve
+from minpower.config import user_config
+from minpower.optimization import value
+from pyomo import environ as pyomo
+
+from test_utils import (istest, with_setup, reset_config,
+                        make_cheap_gen, make_mid_gen, make_expensive_gen,
+                        make_loads_times, solve_problem, assertAlmostEqual)
+
+
+def solve_both_formulations(make_generators, make_lines=lambda: [],
+                            **kwargs):
+    '''solve the same problem with and without indexed constraints'''
+    solutions = {}
+    for indexed in [False, True]:
+        user_config.indexed_constraints = indexed
+        user_config.duals = True
+        generators = make_generators()
+        lines = make_lines()
+        power_system, times = solve_problem(
+            generators, do_reset_config=False, lines=lines,
+            **make_loads_times(**kwargs))
+        solutions[indexed] = (power_system, generators, lines, times)
+    return solutions
+
+
+def n_constraints(power_system):
+    return len(power_system._model.active_components(pyomo.Constraint))
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def indexed_uc_matches():
+    '''
+    Solve a two bus UC with min up times with each formulation.
+    Ensure that the objective, the prices and the line prices match
+    and that the indexed formulation has fewer constraint components.
+    '''
+    def make_generators():
+        return [make_cheap_gen(bus='A', pmax=100, minuptime=2),
+                make_mid_gen(bus='B', pmax=80, mindowntime=2),
+                make_expensive_gen(bus='B')]
+
+    def make_lines():
+        return [powersystems.Line(pmax=60, frombus='A', tobus='B')]
+
+    solutions = solve_both_formulations(make_generators, make_lines,
+                                        Pdt=[80, 110, 130, 60], bus='B')
+    scalar_system, scalar_gens, scalar_lines, times = solutions[False]
+    indexed_system, indexed_gens, indexed_lines, times = solutions[True]
+
+    assertAlmostEqual(scalar_system.objective, indexed_system.objective)
+    for t in times:
+        for scalar_bus, indexed_bus in zip(scalar_system.buses,
+                                           indexed_system.buses):
+            assert scalar_bus.price(t) == indexed_bus.price(t)
+        assert scalar_lines[0].price(t) == indexed_lines[0].price(t)
+    assert n_constraints(indexed_system) < n_constraints(scalar_system)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def indexed_load_shedding():
+    '''
+    Solve an infeasible ED with each formulation.
+    The power balance rows are replaced when shedding is allowed.
+    Ensure that the same amount of load is shed.
+    '''
+    def make_generators():
+        return [make_cheap_gen(pmax=100), make_expensive_gen(pmax=20)]
+
+    solutions = solve_both_formulations(make_generators, Pdt=[110, 150])
+    for indexed, (power_system, generators, lines, times) in \
+            solutions.items():
+        load = power_system.loads()[0]
+        assert [value(load.shed(t)) for t in times] == [0, 30]
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def removed_row_is_deactivated():
+    '''
+    Build an ED with indexed constraints, remove a power balance row
+    and add it again. Ensure that the removed row is left out of the
+    problem and that the new row replaces it.
+    '''
+    user_config.indexed_constraints = True
+    generator = make_cheap_gen()
+    generator.set_initial_condition()
+    loads_times = make_loads_times(Pdt=[80, 90])
+    times = loads_times['times']
+    power_system = powersystems.PowerSystem(
+        [generator], loads_times['loads'], [])
+    solve.create_problem(power_system, times)
+    bus = power_system.buses[0]
+    family = power_system.get_component(bus._id('power balance'))
+
+    def active_rows():
+        return [key for key, row in family.iteritems() if row.active]
+
+    bus._remove_component('power balance', times[1])
+    assert active_rows() == [str(times[0])]
+    bus.add_constraint('power balance', times[1],
+                       generator.power(times[1]) == 90)
+    assert sorted(active_rows()) == sorted(str(t) for t in times)
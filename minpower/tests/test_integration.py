@@ -88,6 +88,18 @@ def run_uc_rolling():
     run_case('uc-rolling')
 
 
+@istest
+def run_uc_rolling_reuse_stage_model():
+    '''
+    Solve a rolling UC, reusing the first stage's model.
+    Ensure that the solution matches the rebuilt one.
+    '''
+    rebuilt = run_case('uc-rolling')
+    reused = run_case('uc-rolling', reuse_stage_model=True)
+    assert_frame_equal(rebuilt.generators_power, reused.generators_power)
+    assert_frame_equal(rebuilt.generators_status, reused.generators_status)
+
+
 @istest
 def run_ed():
     run_case('ed')
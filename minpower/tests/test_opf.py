@@ -1,5 +1,7 @@
 '''Test the constraint behavior of an OPF'''
-from minpower import powersystems
+import numpy as np
+from minpower import powersystems, network, contingency
+from minpower.generators import Generator_nonControllable
 from minpower.optimization import value
 from minpower.commonscripts import Series
 from minpower.config import user_config
@@ -7,7 +9,7 @@ from minpower.config import user_config
 from test_utils import (istest, get_duals, with_setup, reset_config,
                         make_cheap_gen, make_mid_gen, make_expensive_gen,
                         singletime, make_loads_times,
-                        solve_problem)
+                        solve_problem, assertAlmostEqual)
 
 
 def test_config():
@@ -105,5 +107,223 @@ def three_buses():
     assert total_load == sum(Pd) and num_lmps > 1
 
 
+@istest
+@with_setup(get_duals, reset_config)
+def ptdf_matches_angles():
+    '''
+    Create the congested three bus system (as above) and solve it
+    with the angle and the PTDF network formulations,
+    for each model backend.
+    Ensure that the PTDF formulation only adds the binding line limits
+    and that the costs, LMPs, line flows and congestion prices match.
+    '''
+    for backend in ['pyomo', 'sparse']:
+        solutions = {}
+        for formulation in ['angle', 'ptdf']:
+            user_config.update(model_backend=backend,
+                               network_formulation=formulation)
+            generators = [make_cheap_gen(bus='A'), make_mid_gen(bus='B'),
+                          make_expensive_gen(bus='C')]
+            loads = [powersystems.Load(schedule=Series(Pd, singletime),
+                                       bus=bus)
+                     for Pd, bus in zip([105, 225, 302], 'ABC')]
+            lines = [
+                powersystems.Line(frombus='A', tobus='B'),
+                powersystems.Line(frombus='A', tobus='C', pmax=50),
+                powersystems.Line(frombus='B', tobus='C', pmax=50),
+            ]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False,
+                times=singletime, loads=loads, lines=lines)
+            t = times[0]
+            solutions[formulation] = dict(
+                objective=power_system.objective,
+                lmps=[b.price(t) for b in power_system.buses],
+                flows=[value(line.power(t)) for line in lines],
+                prices=[line.price(t) for line in lines])
+        assert len(power_system._line_limits) == 2
+        angle, ptdf = solutions['angle'], solutions['ptdf']
+        for flow, ptdf_flow in zip(angle.pop('flows'), ptdf.pop('flows')):
+            assertAlmostEqual(flow, ptdf_flow)
+        assert angle == ptdf
+
+
+@istest
+@with_setup(get_duals, reset_config)
+def reduced_network_matches():
+    '''
+    Create the congested three bus system (as above), with its lines
+    split by buses with no generators or loads (one with a dead end).
+    Solve it with and without the network reduction,
+    for each model backend.
+    Ensure that the zero injection buses are eliminated and that the
+    costs, LMPs, line flows and congestion prices match.
+    '''
+    for backend in ['pyomo', 'sparse']:
+        solutions = {}
+        for reduced in [False, True]:
+            user_config.update(model_backend=backend,
+                               network_reduction=reduced)
+            generators = [make_cheap_gen(bus='A'), make_mid_gen(bus='B'),
+                          make_expensive_gen(bus='C')]
+            loads = [powersystems.Load(schedule=Series(Pd, singletime),
+                                       bus=bus)
+                     for Pd, bus in zip([105, 225, 302], 'ABC')]
+            lines = [
+                powersystems.Line(frombus='A', tobus='T1', reactance=0.02),
+                powersystems.Line(frombus='T1', tobus='B', reactance=0.02),
+                powersystems.Line(frombus='A', tobus='C', pmax=50),
+                powersystems.Line(frombus='B', tobus='T2', reactance=0.03,
+                                  pmax=50),
+                powersystems.Line(frombus='T2', tobus='C', reactance=0.03),
+                powersystems.Line(frombus='T2', tobus='T3'),
+            ]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False,
+                times=singletime, loads=loads, lines=lines)
+            t = times[0]
+            solutions[reduced] = dict(
+                objective=power_system.objective,
+                lmps=[b.price(t) for b in power_system.buses
+                      if b.name in 'ABC'],
+                flows=[value(line.power(t)) for line in lines],
+                prices=[line.price(t) for line in lines])
+        assert [b.name for b in power_system.buses] == list('ABC')
+        full, reduced = solutions[False], solutions[True]
+        for key in ['flows', 'prices']:
+            for x, y in zip(full.pop(key), reduced.pop(key)):
+                assertAlmostEqual(x, y)
+        assert full == reduced
+
+
+@istest
+def admittance_matrix_is_sparse():
+    '''
+    Create a four bus chain (A-B-C-D), with two parallel lines
+    from C to D.
+    Ensure that each row of the admittance matrix has only
+    the bus and its neighbors, with the right admittances.
+    '''
+    generators = [make_cheap_gen(bus='A'), make_expensive_gen(bus='D')]
+    loads = [powersystems.Load(schedule=Series(100, singletime), bus=bus)
+             for bus in ['B', 'C']]
+    lines = [
+        powersystems.Line(frombus='A', tobus='B', reactance=0.5),
+        powersystems.Line(frombus='B', tobus='C', reactance=0.25),
+        powersystems.Line(frombus='C', tobus='D', reactance=0.5),
+        powersystems.Line(frombus='D', tobus='C', reactance=0.5),
+    ]
+    power_system = powersystems.PowerSystem(generators, loads, lines)
+    names = [bus.name for bus in power_system.buses]
+    B = dict((names[i], dict((names[j], Bij) for j, Bij in row.items()))
+             for i, row in enumerate(power_system.Bmatrix))
+    assert B == dict(
+        A=dict(A=2, B=-2),
+        B=dict(A=-2, B=6, C=-4),
+        C=dict(B=-4, C=8, D=-4),
+        D=dict(C=-4, D=4))
+
+
+@istest
+def component_views_follow_changes():
+    '''
+    Create a two bus system, then add a non-controllable generator
+    and a load to its buses (by name).
+    Ensure that the lists of components are kept between lookups,
+    are updated after the additions and have the right generators.
+    '''
+    cheap = make_cheap_gen(bus='A')
+    loads = [powersystems.Load(schedule=Series(100, singletime), bus='B')]
+    lines = [powersystems.Line(frombus='A', tobus='B')]
+    power_system = powersystems.PowerSystem([cheap], loads, lines)
+    assert power_system.generators() is power_system.generators()
+    assert power_system.get_generators_noncontrollable() == []
+
+    wind = Generator_nonControllable(
+        schedule=Series(20, singletime), bus='B')
+    power_system.add_generator(wind)
+    power_system.add_load(
+        powersystems.Load(schedule=Series(30, singletime), bus='A'))
+    assert power_system.get_bus('B').generators == [wind]
+    assert power_system.generators() == [cheap, wind]
+    assert len(power_system.loads()) == 2
+    assert power_system.get_generators_controllable() == [cheap]
+    assert power_system.get_generators_noncontrollable() == [wind]
+    try:
+        power_system.add_load(powersystems.Load(bus='C'))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('added a load to a missing bus')
+
+
+@istest
+def lodf_matches_outages():
+    '''
+    Create a meshed six bus network and a radial line to a seventh bus.
+    Ensure that the flows after each outage, from the line outage
+    distribution factors, match the flows of the network without the
+    line - and that the radial line's outage is not screened.
+    '''
+    ends = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 3), (1, 4),
+            (2, 5), (5, 6)]
+    reactances = np.linspace(0.1, 1.0, len(ends))
+    injections = np.array([-300, 50, 60, -20, 80, 100, 30])
+
+    def flows(ends, reactances):
+        Bmatrix = [dict() for i in range(7)]
+        for (i, j), x in zip(ends, reactances):
+            for row, col in [(i, j), (j, i)]:
+                Bmatrix[row][col] = Bmatrix[row].get(col, 0) - 1 / x
+                Bmatrix[row][row] = Bmatrix[row].get(row, 0) + 1 / x
+        X = network.reactance_matrix(Bmatrix)
+        ptdf = network.ptdf_matrix(X, ends, reactances)
+        return ptdf, ptdf.dot(injections)
+
+    ptdf, pre_outage = flows(ends, reactances)
+    lodf, outages = contingency.lodf_matrix(ptdf, ends)
+    assert list(outages) == range(len(ends) - 1)
+    for k in outages:
+        others = [line for line in range(len(ends)) if line != k]
+        ptdf_k, post_outage = flows([ends[line] for line in others],
+                                    reactances[others])
+        expected = pre_outage + lodf[:, k] * pre_outage[k]
+        assert np.allclose(post_outage, expected[others])
+
+
+@istest
+@with_setup(get_duals, reset_config)
+def contingencies_are_secure():
+    '''
+    Create the three bus system (as above) with line limits which
+    allow a cheaper dispatch than is secure against line outages.
+    Solve with contingencies, for each network formulation.
+    Ensure that the flows after each outage are within the limits,
+    that security costs more, and that the formulations match.
+    '''
+    objectives = {}
+    for formulation in ['angle', 'ptdf']:
+        for contingencies in [False, True]:
+            user_config.update(network_formulation=formulation,
+                               contingencies=contingencies)
+            generators = [make_cheap_gen(bus='A'), make_mid_gen(bus='B'),
+                          make_expensive_gen(bus='C')]
+            loads = [powersystems.Load(schedule=Series(Pd, singletime),
+                                       bus=bus)
+                     for Pd, bus in zip([105, 225, 302], 'ABC')]
+            lines = [powersystems.Line(frombus=frm, tobus=to, pmax=150)
+                     for frm, to in ['AB', 'AC', 'BC']]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False,
+                times=singletime, loads=loads, lines=lines)
+            objectives[formulation, contingencies] = power_system.objective
+        flows = np.array([value(line.power(times[0])) for line in lines])
+        for k in power_system._outages:
+            post_outage = flows + power_system.lodf[:, k] * flows[k]
+            assert (np.abs(post_outage) <= 150 + 1e-5).all()
+    assert objectives['angle', True] > objectives['angle', False]
+    assert objectives['angle', True] == objectives['ptdf', True]
+
+
 def test_config_cleared():
     assert(user_config.duals == False)
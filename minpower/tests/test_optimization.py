@@ -0,0 +1,242 @@
+'''Test the optimization component handling'''
+import os
+from minpower import solve, optimization, racing, sparsemodel
+from minpower.config import user_config
+from minpower.optimization import OptimizationError
+from pyomo import environ as pyomo
+from pyomo.opt.solver.shellcmd import SystemCallSolver
+
+from test_utils import (istest, nose, with_setup, reset_config, gen_costs,
+                        make_cheap_gen, make_mid_gen, make_expensive_gen,
+                        make_loads_times, solve_problem, assertAlmostEqual)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def handles_follow_model_reset():
+    '''
+    Look up a generator's power, then reset and re-create the model
+    (as between the stages of a rolling UC).
+    Ensure that the lookup returns the new variable.
+    '''
+    generator = make_cheap_gen()
+    power_system, times = solve_problem([generator],
+                                        **make_loads_times(Pdt=[80, 110]))
+    old = generator.get_variable('power', indexed=True)
+    power_system.reset_model()
+    solve.create_problem(power_system, times)
+    new = generator.get_variable('power', indexed=True)
+    assert new is not old
+    assert new is power_system.get_component(generator._id('power'))
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def solver_io_falls_back_to_files():
+    '''
+    Get a solver which has no python interface, for each model backend.
+    Ensure that the automatic solver io falls back to problem files
+    and that requiring the python interface fails.
+    '''
+    for backend in ['pyomo', 'sparse']:
+        user_config.model_backend = backend
+        opt_solver = optimization.get_solver(
+            'cbc', optimization.get_backend(), solver_io='auto')
+        assert isinstance(opt_solver,
+                          (SystemCallSolver, sparsemodel.SparseSolver))
+        try:
+            optimization.get_solver(
+                'cbc', optimization.get_backend(), solver_io='python')
+        except OptimizationError:
+            pass
+        else:
+            raise AssertionError('got cbc without a python interface')
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def in_process_solve_matches_files():
+    '''
+    Solve a UC with duals in-process (through pyomo's python interface
+    to gurobi or cplex) and with a file based solver.
+    Ensure that the objectives and the prices match.
+    '''
+    in_process = [name for name in optimization.pyomo_python_solvers
+                  if optimization._python_solver(name, pyomo) is not None]
+    if not in_process:
+        raise nose.SkipTest(
+            'in-process solves require the gurobi or cplex python interface')
+    solutions = {}
+    for solver, solver_io in [(in_process[0], 'python'),
+                              (user_config.solver, 'file')]:
+        user_config.update(solver=solver, solver_io=solver_io, duals=True)
+        generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                      make_expensive_gen(minuptime=2)]
+        solutions[solver_io] = solve_problem(
+            generators, do_reset_config=False,
+            **make_loads_times(Pdt=[80, 110, 130, 60]))
+    in_process, times = solutions['python']
+    with_files, times = solutions['file']
+    assertAlmostEqual(in_process.objective, with_files.objective)
+    for t in times:
+        assertAlmostEqual(in_process.buses[0].price(t),
+                          with_files.buses[0].price(t))
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def duals_resolve_in_place():
+    '''
+    Solve a UC with duals, for each model backend.
+    The binaries are fixed in place for the LP resolve.
+    Ensure that the prices are correct and that the status
+    variables are still binary and fixed at their solved values.
+    '''
+    for backend in ['pyomo', 'sparse']:
+        user_config.update(model_backend=backend, duals=True)
+        generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                      make_expensive_gen()]
+        power_system, times = solve_problem(
+            generators, do_reset_config=False,
+            **make_loads_times(Pdt=[80, 110, 130]))
+        assert [power_system.buses[0].price(t) for t in times] == \
+            [gen_costs['cheap'], gen_costs['mid'], gen_costs['expensive']]
+        status = generators[2].get_variable('status', indexed=True)
+        assert status.domain is pyomo.Boolean
+        assert [status[t].fixed for t in times] == [True] * len(times)
+        assert all(status[t].value in (0, 1) for t in times)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def duals_resolve_keeps_values():
+    '''
+    Solve a UC with a file based solver, for each model backend,
+    then resolve the fixed-integer LP for the duals.
+    Ensure that the variable values are unchanged by the resolve
+    and that the duals are loaded.
+    '''
+    for backend in ['pyomo', 'sparse']:
+        user_config.update(model_backend=backend, solver_io='file',
+                           duals=False)
+        generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                      make_expensive_gen(minuptime=2)]
+        power_system, times = solve_problem(
+            generators, do_reset_config=False,
+            **make_loads_times(Pdt=[80, 110, 130, 60]))
+        variables = [gen.get_variable(name, indexed=True)
+                     for gen in generators for name in ['power', 'status']]
+        solved = [[var[t].value for t in times] for var in variables]
+
+        user_config.duals = True
+        power_system.add_suffix('dual')
+        power_system._solve_duals(power_system._model)
+        assert [[var[t].value for t in times] for var in variables] == solved
+        assert power_system.buses[0].price(times[0]) == gen_costs['cheap']
+
+
+@istest
+def linear_sum_is_flat():
+    '''
+    Build a sum of variables, a nested sum and a number
+    with the linear sum builder, for each model backend.
+    Ensure that the value is right and that the nested sum's
+    terms are taken into the single (flat) expression.
+    '''
+    for backend in [pyomo, sparsemodel]:
+        model = backend.ConcreteModel()
+        model.x = backend.Var(range(4))
+        for i in range(4):
+            model.x[i].value = i + 1
+        nested = model.x[0] + 2 * model.x[1]
+        total = optimization.LinearSum([nested, model.x[2], 5], coef=2)
+        expression = total.add(model.x[3], -1).expression()
+        assert pyomo.value(expression) == 2 * (1 + 4 + 3 + 5) - 4
+        assert all(arg is not nested for arg in expression._args)
+
+
+@istest
+def solver_race_contenders():
+    '''
+    Parse a list of solver race contenders.
+    Ensure that the names and the (typed) options are read.
+    '''
+    contenders = racing.parse_contenders('glpk, cbc cuts=off seed=7 ratio=.1,')
+    assert [c.name for c in contenders] == ['glpk', 'cbc']
+    assert contenders[0].options == {}
+    assert contenders[1].options == dict(cuts='off', seed=7, ratio=0.1)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def solver_race_matches():
+    '''
+    Race two copies of the file based solver, for each model backend.
+    Ensure that the objective and prices match a single solver
+    and that both contenders are recorded, with one winner.
+    '''
+    file_solver = user_config.solver
+    for backend in ['pyomo', 'sparse']:
+        objectives, prices = [], []
+        for race in ['', '{0}, {0}'.format(file_solver)]:
+            user_config.update(model_backend=backend, duals=True,
+                               solver_race=race)
+            generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                          make_expensive_gen(minuptime=2)]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False,
+                **make_loads_times(Pdt=[80, 110, 130, 60]))
+            objectives.append(power_system.objective)
+            prices.append([power_system.buses[0].price(t) for t in times])
+        assertAlmostEqual(*objectives)
+        assert prices[0] == prices[1]
+
+        log = power_system.solver_race_log[0]
+        assert len(log) == 2 and log.winner.sum() == 1
+        os.remove(optimization.full_filename('solver-race.csv'))
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def solver_limits_reach_solver():
+    '''
+    Solve with a MIP gap and a time limit, then resolve without
+    a time limit, for each model backend.
+    Ensure that the solver's command line has the gap and the limit
+    under the solver's own names, and then no limit.
+    '''
+    flags = dict(cbc=('-ratio', '-sec'), glpk=('--mipgap', '--tmlim'))
+    if user_config.solver not in flags:
+        raise nose.SkipTest
+    gap_flag, limit_flag = flags[user_config.solver]
+
+    commands = []
+    execute = SystemCallSolver._execute_command
+
+    def recorded_execute(opt_solver, command):
+        commands.append(command.cmd)
+        return execute(opt_solver, command)
+
+    def flag_value(flag):
+        cmd = commands[-1]
+        return float(cmd[cmd.index(flag) + 1]) if flag in cmd else None
+
+    SystemCallSolver._execute_command = recorded_execute
+    try:
+        for backend in ['pyomo', 'sparse']:
+            user_config.update(model_backend=backend, duals=False,
+                               mipgap=0.01, solver_time_limit=60)
+            generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                          make_expensive_gen(minuptime=2)]
+            power_system, times = solve_problem(
+                generators, do_reset_config=False,
+                **make_loads_times(Pdt=[80, 110, 130, 60]))
+            assert flag_value(gap_flag) == 0.01
+            assert flag_value(limit_flag) == 60
+
+            power_system.set_solver_limits(0.001, 0)
+            power_system.solve()
+            assert flag_value(gap_flag) == 0.001
+            assert flag_value(limit_flag) is None
+    finally:
+        SystemCallSolver._execute_command = execute
@@ -0,0 +1,106 @@
+'''Test the LP and MPS problem file writer'''
+import os
+import shutil
+import tempfile
+from pyomo.opt.base import solvers as cooprsolver
+from minpower import problem_writer
+from minpower.generators import Generator
+from minpower.config import user_config
+
+from test_utils import (istest, with_setup, reset_config,
+                        make_cheap_gen, make_mid_gen, make_expensive_gen,
+                        make_loads_times, solve_problem, assertAlmostEqual)
+
+
+def solve_file(filename):
+    '''solve a problem file and return the objective'''
+    results = cooprsolver.SolverFactory(user_config.solver).solve(filename)
+    objective = results.solution(0).objective
+    return objective.values()[0].value
+
+
+def check_written_problems(backend):
+    '''
+    Solve a UC using a backend and write the problem in each format.
+    Ensure that solving each file gives the same objective.
+    '''
+    user_config.model_backend = backend
+    generators = [
+        make_cheap_gen(pmax=100, pmin=10, startupcost=100),
+        make_mid_gen(pmax=40, minuptime=2),
+        make_expensive_gen(rampratemax=50),
+        Generator(costcurveequation='10P+.01P^2', pmax=500)]
+    power_system, times = solve_problem(generators, do_reset_config=False,
+                                        **make_loads_times(Pdt=[80, 110, 130, 60]))
+    directory = tempfile.mkdtemp()
+    try:
+        for file_format in problem_writer.problem_formats:
+            filename = os.path.join(directory, problem_writer.problem_filename(
+                'problem', file_format))
+            power_system.write_model(filename)
+            assertAlmostEqual(solve_file(filename), power_system.objective)
+
+            # compressed files must match
+            power_system.write_model(filename + '.gz')
+            with open(filename) as f:
+                text = f.read()
+            with problem_writer.gzip.open(filename + '.gz') as f:
+                assert f.read() == text
+    finally:
+        shutil.rmtree(directory)
+
+
+@istest
+@with_setup(teardown=reset_config)
+def write_pyomo_problems():
+    check_written_problems('pyomo')
+
+
+@istest
+@with_setup(teardown=reset_config)
+def write_sparse_problems():
+    check_written_problems('sparse')
+
+
+@istest
+@with_setup(teardown=reset_config)
+def mps_spooled_columns():
+    '''
+    Write an MPS file whose columns are spooled to disk in many runs.
+    Ensure that the file is the same as one sorted in memory.
+    '''
+    user_config.model_backend = 'sparse'
+    power_system, times = solve_problem(
+        [make_cheap_gen(pmax=100), make_expensive_gen()],
+        do_reset_config=False, **make_loads_times(Pdt=[80, 150, 120]))
+    directory = tempfile.mkdtemp()
+    spool_size, read_size = problem_writer.spool_size, problem_writer.read_size
+    try:
+        in_memory = os.path.join(directory, 'in-memory.mps')
+        power_system.write_model(in_memory)
+        problem_writer.spool_size, problem_writer.read_size = 5, 2
+        spooled = os.path.join(directory, 'spooled.mps')
+        power_system.write_model(spooled)
+        with open(in_memory) as f, open(spooled) as g:
+            assert f.read() == g.read()
+    finally:
+        problem_writer.spool_size = spool_size
+        problem_writer.read_size = read_size
+        shutil.rmtree(directory)
+
+
+@istest
+@with_setup(teardown=reset_config)
+def sparse_solve_with_mps():
+    '''
+    Solve a UC with duals using the sparse backend and MPS solver files.
+    Ensure that the LMPs equal the marginal costs.
+    '''
+    user_config.model_backend = 'sparse'
+    user_config.problem_file_format = 'mps'
+    user_config.duals = True
+    generators = [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                  make_expensive_gen()]
+    power_system, times = solve_problem(generators, do_reset_config=False,
+                                        **make_loads_times(Pdt=[80, 110, 130]))
+    assert [power_system.buses[0].price(t) for t in times] == [10, 20, 30]
@@ -0,0 +1,118 @@
+'''Test the sparse-matrix model backend against the pyomo backend'''
+from minpower import powersystems, sparsemodel
+from minpower.generators import Generator
+from minpower.optimization import value
+from minpower.config import user_config
+
+from test_utils import (istest, with_setup, raises, reset_config,
+                        make_cheap_gen, make_mid_gen, make_expensive_gen,
+                        make_loads_times, solve_problem, assertAlmostEqual)
+
+
+def sparse_backend():
+    reset_config()
+    user_config.model_backend = 'sparse'
+
+
+def solve_with_backends(make_generators, duals=False, **kwargs):
+    '''solve the same problem with both backends'''
+    solutions = {}
+    for backend in ['pyomo', 'sparse']:
+        user_config.model_backend = backend
+        user_config.duals = duals
+        generators = make_generators()
+        power_system, times = solve_problem(generators, do_reset_config=False,
+                                            **make_loads_times(**kwargs))
+        solutions[backend] = (power_system, generators, times)
+    return solutions
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def uc_matches_pyomo():
+    '''
+    Solve a three generator UC with each backend.
+    Ensure that the objective and the dispatch are the same.
+    '''
+    def make_generators():
+        return [make_cheap_gen(pmax=100, pmin=10, startupcost=100),
+                make_mid_gen(pmax=40, minuptime=2),
+                make_expensive_gen(rampratemax=50)]
+
+    solutions = solve_with_backends(make_generators, Pdt=[80, 110, 130, 60])
+    pyomo_system, pyomo_gens, times = solutions['pyomo']
+    sparse_system, sparse_gens, times = solutions['sparse']
+
+    assertAlmostEqual(pyomo_system.objective, sparse_system.objective)
+    for pyomo_gen, sparse_gen in zip(pyomo_gens, sparse_gens):
+        for t in times:
+            assertAlmostEqual(value(pyomo_gen.power(t)),
+                              value(sparse_gen.power(t)))
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def polynomial_cost_matches_pyomo():
+    '''
+    Solve an ED with a quadratic cost curve (a piecewise linear bid)
+    with each backend. Ensure that the objective is the same.
+    '''
+    def make_generators():
+        return [Generator(costcurveequation='10P+.01P^2', pmax=500),
+                make_expensive_gen()]
+
+    solutions = solve_with_backends(make_generators, Pd=320)
+    assertAlmostEqual(solutions['pyomo'][0].objective,
+                      solutions['sparse'][0].objective)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def prices_match_pyomo():
+    '''
+    Solve a UC with duals using each backend.
+    Ensure that the LMPs are the same and equal the marginal costs.
+    '''
+    def make_generators():
+        return [make_cheap_gen(pmax=100), make_mid_gen(pmax=20),
+                make_expensive_gen()]
+
+    solutions = solve_with_backends(make_generators, duals=True,
+                                    Pdt=[80, 110, 130])
+    lmps = {}
+    for backend, (power_system, generators, times) in solutions.items():
+        lmps[backend] = [power_system.buses[0].price(t) for t in times]
+    assert lmps['sparse'] == lmps['pyomo'] == [10, 20, 30]
+
+
+@istest
+@with_setup(sparse_backend, reset_config)
+def line_limit():
+    '''
+    Solve a two bus OPF with a binding line limit using the sparse backend.
+    Ensure that the line is at its limit.
+    '''
+    pmax = 100
+    generators = [make_cheap_gen(bus='A'), make_expensive_gen(bus='B')]
+    lines = [powersystems.Line(pmax=pmax, frombus='A', tobus='B')]
+    power_system, times = solve_problem(generators, do_reset_config=False,
+                                        lines=lines,
+                                        **make_loads_times(Pd=225, bus='B'))
+    assert value(lines[0].power(times[0])) == pmax
+
+
+@istest
+@raises(TypeError)
+def parameter_coefficient_rejected():
+    '''
+    Build a constraint with a parameter multiplying a variable.
+    Ensure that it is rejected, rather than keeping the
+    parameter's current value after the parameter is updated.
+    '''
+    model = sparsemodel.ConcreteModel()
+    model.add_component('x', sparsemodel.Var(name='x', bounds=(0, None)))
+    model.add_component('p', sparsemodel.Param(name='p', default=2.0))
+    model.x.value = 3
+    assert value(model.p * model.x) == 6
+    model.add_component('c', sparsemodel.Constraint(
+        name='c', expr=model.p * model.x <= 1))
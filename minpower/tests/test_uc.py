@@ -1,7 +1,8 @@
 '''Test the higher level behavior of the unit commitment'''
 import random
-from minpower.generators import Generator
+from minpower.generators import Generator, Generator_nonControllable
 import pandas as pd
+from minpower import budget, optimization
 from pandas.util.testing import assert_frame_equal, assert_series_equal
 from test_utils import *
 
@@ -68,6 +69,140 @@ def load_shedding():
     assert price_t1 == user_config.cost_load_shedding
 
 
+@istest
+@with_setup(reset_config, reset_config)
+def elastic_load_shedding():
+    '''
+    Create a single generator and a load that exceeds its limit at t1.
+    Build the model with shedding allowed, for each model backend.
+    Ensure that a single solve is feasible
+    and that the minimum load is shed, at the shedding price.
+    '''
+    pmax = 100
+    Pdt = [110, 211, 110]
+    for model_backend in ['pyomo', 'sparse']:
+        user_config.update(duals=True, elastic_shedding=True,
+                           model_backend=model_backend)
+        generator = make_cheap_gen(pmax=pmax)
+        generator.set_initial_condition()
+        loads_times = make_loads_times(Pdt=Pdt)
+        times = loads_times['times']
+        power_system = powersystems.PowerSystem(
+            [generator], loads_times['loads'], [])
+        solve.create_problem(power_system, times)
+        power_system.solve()
+
+        load = power_system.loads()[0]
+        assert load.shed(times[1], evaluate=True) == Pdt[1] - pmax
+        assert power_system.buses[0].price(times[1]) == \
+            user_config.cost_load_shedding
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def shedding_slacks_resolve_in_place():
+    '''
+    Create a single generator and a load that exceeds its limit at t1.
+    Build the model with shedding slacks, for each model backend.
+    Ensure that the infeasible stage is re-solved in the same model
+    (with the same power balance constraint), that the minimum load is
+    shed at the shedding price and that the slacks are fixed again after.
+    '''
+    pmax = 100
+    Pdt = [110, 211, 110]
+    for model_backend in ['pyomo', 'sparse']:
+        user_config.update(duals=True, shedding_slacks=True,
+                           model_backend=model_backend)
+        generator = make_cheap_gen(pmax=pmax)
+        generator.set_initial_condition()
+        loads_times = make_loads_times(Pdt=Pdt)
+        times = loads_times['times']
+        power_system = powersystems.PowerSystem(
+            [generator], loads_times['loads'], [])
+        solve.create_problem(power_system, times)
+        bus = power_system.buses[0]
+
+        def balance():
+            # the sparse backend's constraints are views of a row
+            constraint = bus.get_constraint('power balance', times[1])
+            return getattr(constraint, '_row', constraint)
+
+        built = balance()
+        power_system.solve_problem(times)
+
+        load = power_system.loads()[0]
+        assert balance() == built
+        assert load.shed(times[1], evaluate=True) == Pdt[1] - pmax
+        assert bus.price(times[1]) == user_config.cost_load_shedding
+        power_system.disallow_shedding()
+        assert load.get_variable('shed', times[1], indexed=True).ub == 0
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def shedding_slacks_per_scenario():
+    '''
+    Build a model with load and wind shedding slacks and treat two
+    copies of it as the scenario instances of a stochastic problem
+    (stochastic UC does not construct with this pyomo version).
+    Ensure that allowing shedding releases the slacks of every scenario
+    (without rebuilding them) and that they are fixed again after.
+    '''
+    user_config.shedding_slacks = True
+    Pdt = [110, 211, 110]
+    loads_times = make_loads_times(Pdt=Pdt)
+    times = loads_times['times']
+    wind = Generator_nonControllable(
+        name='wind', index=1, sheddingallowed=True,
+        schedule=pd.Series(40.0, index=times.strings.values))
+    generators = [make_cheap_gen(pmax=100), wind]
+    for gen in generators:
+        gen.set_initial_condition()
+    power_system = powersystems.PowerSystem(
+        generators, loads_times['loads'], [])
+    solve.create_problem(power_system, times)
+    power_system._scenario_instances = dict(
+        s0=power_system._model.clone(), s1=power_system._model.clone())
+    power_system.stochastic_formulation = True
+    power_system._clear_handles()
+    load = power_system.loads()[0]
+
+    def slacks(scenario):
+        return [load.get_variable('shed', scenario=scenario, indexed=True),
+                wind.get_variable('power_shed', scenario=scenario,
+                                  indexed=True)]
+
+    built = dict((s, slacks(s)) for s in power_system._scenario_instances)
+    power_system.allow_shedding(times)
+    for scenario, (shed, power_shed) in built.items():
+        assert slacks(scenario) == [shed, power_shed]
+        assert [shed[str(t)].ub for t in times] == Pdt
+        assert [power_shed[str(t)].ub for t in times] == [40] * len(times)
+
+    power_system.disallow_shedding()
+    for shed, power_shed in built.values():
+        assert all(shed[str(t)].ub == 0 for t in times)
+        assert all(power_shed[str(t)].ub == 0 for t in times)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_elastic_shedding():
+    '''
+    Solve a rolling UC which doesn't need shedding with elastic shedding
+    (rebuilding and reusing the stage models).
+    Ensure that the stage objectives and commitments match.
+    '''
+    objectives, status = solve_rolling(False, 'pyomo')
+    for reuse_stage_model in [False, True]:
+        elastic_objectives, elastic_status = solve_rolling(
+            reuse_stage_model, 'pyomo', elastic_shedding=True)
+        for inelastic, elastic in zip(objectives, elastic_objectives):
+            assertAlmostEqual(inelastic, elastic)
+        for inelastic, elastic in zip(status, elastic_status):
+            assert_frame_equal(inelastic, elastic)
+
+
 @istest
 @with_setup(teardown=reset_config)
 def reserve_fixed_amount():
@@ -130,3 +265,215 @@ def startup_ramprate_default():
     # the minimum load was shed
     assert_series_equal(pd.Series([0.0, 100.0, 0.0], index=times.times),
                         generators[1].values('power', times.times))
+
+
+def solve_rolling(reuse_stage_model, model_backend, **config):
+    '''solve a 24hr UC in six hour stages (with a two hour overlap)'''
+    user_config.update(reuse_stage_model=reuse_stage_model,
+                       model_backend=model_backend,
+                       hours_commitment=6, hours_overlap=2, **config)
+    stage_solutions = solve_rolling_system()
+    return [sln.objective for sln in stage_solutions], \
+        [sln.generators_status for sln in stage_solutions]
+
+
+def solve_rolling_system(wind=False):
+    '''
+    solve the rolling UC (with a wind farm with a forecast and
+    observed values, if `wind`), returning the stage solutions
+    '''
+    generators = [
+        make_cheap_gen(pmin=50, pmax=200, minuptime=4, mindowntime=3,
+                       rampratemax=60, rampratemin=-60, startupcost=300),
+        make_mid_gen(pmin=20, pmax=100, minuptime=2, mindowntime=2,
+                     rampratemax=40, rampratemin=-40, startupcost=100),
+        make_expensive_gen(pmax=150)]
+    initial = [{}, {'power': 0, 'status': 0, 'hoursinstatus': 1}, {}]
+    for g, gen in enumerate(generators):
+        gen.index = g
+        gen.set_initial_condition(**initial[g])
+    Pdt = [230, 260, 290, 300, 310, 280, 240, 200, 160, 150, 140, 170,
+           220, 280, 330, 350, 330, 290, 240, 190, 160, 150, 170, 210]
+    loads_times = make_loads_times(Pdt=Pdt)
+    if wind:
+        strings = loads_times['times'].strings.values
+        forecast = pd.Series(40.0, index=strings)
+        observed = forecast + [(-1) ** t * 10 for t in range(len(Pdt))]
+        generators.append(Generator_nonControllable(
+            name='wind', index=len(generators),
+            schedule=forecast, observed_values=observed))
+    power_system = powersystems.PowerSystem(
+        generators, loads_times['loads'], [])
+    stage_solutions, stage_times = solve.solve_multistage(
+        power_system, loads_times['times'])
+    return stage_solutions
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_stage_model_reuse():
+    '''
+    Solve a rolling UC with min up/down times and ramp limits,
+    rebuilding each stage's model and reusing the first stage's model.
+    Ensure that the stage objectives and commitments match.
+    '''
+    for model_backend in ['pyomo', 'sparse']:
+        rebuilt_objectives, rebuilt_status = solve_rolling(
+            False, model_backend)
+        reused_objectives, reused_status = solve_rolling(True, model_backend)
+        for rebuilt, reused in zip(rebuilt_objectives, reused_objectives):
+            assertAlmostEqual(rebuilt, reused)
+        for rebuilt, reused in zip(rebuilt_status, reused_status):
+            assert_frame_equal(rebuilt, reused)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_fast_resolve():
+    '''
+    Solve a rolling UC with a wind forecast and resolve each stage with
+    the observed wind, by rebuilding the stage model and in the solved
+    model, for each model backend.
+    Ensure that the observed costs and the generator outputs match.
+    '''
+    for model_backend in ['pyomo', 'sparse']:
+        solutions = []
+        for fast_resolve in [False, True]:
+            user_config.update(model_backend=model_backend,
+                               deterministic_solve=True,
+                               fast_resolve=fast_resolve,
+                               hours_commitment=6, hours_overlap=2)
+            solutions.append(solve_rolling_system(wind=True))
+        for rebuilt, fast in zip(*solutions):
+            assertAlmostEqual(rebuilt.observed_totalcost.sum().sum(),
+                              fast.observed_totalcost.sum().sum())
+            assert_frame_equal(rebuilt.generators_power,
+                               fast.generators_power)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_warm_start():
+    '''
+    Solve a rolling UC, starting each stage from the last stage's solution.
+    Ensure that the stage objectives and commitments match a cold start.
+    '''
+    cold_objectives, cold_status = solve_rolling(False, 'pyomo')
+    warm_objectives, warm_status = solve_rolling(False, 'pyomo',
+                                                 warm_start=True)
+    for cold, warm in zip(cold_objectives, warm_objectives):
+        assertAlmostEqual(cold, warm)
+    for cold, warm in zip(cold_status, warm_status):
+        assert_frame_equal(cold, warm)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_warm_start_reaches_solver():
+    '''
+    Solve a rolling UC with warm starts, with a solver taken to accept them.
+    Ensure that each later stage is solved with the warm start flag and
+    that the variables hold the last stage's solution at the solve.
+    '''
+    def start_values(gen, times):
+        return [(value(gen.status(t)), value(gen.power(t))) for t in times]
+
+    starts, warm_solves = [], []
+    set_warm_start = Generator.set_warm_start
+    get_solver = optimization.get_solver
+    warm_start_capable = optimization._warm_start_capable
+
+    def recorded_warm_start(gen, times, power, status):
+        set_warm_start(gen, times, power, status)
+        starts.append((gen, times, start_values(gen, times)))
+
+    def recording_solver(*args, **kwargs):
+        opt_solver = get_solver(*args, **kwargs)
+        solve = opt_solver.solve
+
+        def recorded_solve(instance, **kwds):
+            # the solver here may not take the flag, so only record it
+            if kwds.pop('warmstart', False) and starts:
+                warm_solves.append(all(
+                    start_values(gen, times) == values
+                    for gen, times, values in starts))
+                del starts[:]
+            return solve(instance, **kwds)
+        opt_solver.solve = recorded_solve
+        return opt_solver
+
+    Generator.set_warm_start = recorded_warm_start
+    optimization.get_solver = recording_solver
+    optimization._warm_start_capable = lambda opt_solver: True
+    try:
+        objectives, status = solve_rolling(False, 'pyomo', warm_start=True)
+    finally:
+        Generator.set_warm_start = set_warm_start
+        optimization.get_solver = get_solver
+        optimization._warm_start_capable = warm_start_capable
+
+    assert len(warm_solves) == len(objectives) - 1
+    assert all(warm_solves)
+
+
+@istest
+def stage_budget_limits():
+    '''
+    Get stage limits from a 100s budget for 4 stages.
+    Ensure that the first stage gets the tightest gap,
+    that fast stages keep it and leave more time for later stages
+    and that slow stages (or stages stopped by their time limit)
+    get the loosest gap.
+    '''
+    def limits(solve_times, mipgaps=()):
+        return budget.stage_limits(len(solve_times), 4, solve_times,
+                                   mipgaps or [0.001] * len(solve_times),
+                                   budget=100, mipgap=0.001, mipgap_max=0.01)
+    assert limits([]) == (0.001, 50)
+    mipgap, time_limit = limits([5, 5])
+    assert mipgap == 0.001 and time_limit == 90
+    assertAlmostEqual(limits([60])[0], 0.01)
+    assertAlmostEqual(limits([5], [0.05])[0], 0.01)
+    assert 0.001 < limits([25, 25])[0] < 0.01
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def rolling_solver_time_budget():
+    '''
+    Solve a rolling UC with a solver time budget.
+    Ensure that each stage's objective is within
+    the loosest gap of the objective without a budget.
+    '''
+    objectives, status = solve_rolling(False, 'pyomo')
+    budget_objectives, budget_status = solve_rolling(
+        False, 'pyomo', solver_time_budget=600, mipgap_max=0.01)
+    for unlimited, limited in zip(objectives, budget_objectives):
+        assert abs(limited - unlimited) <= 0.01 * abs(unlimited)
+
+
+@istest
+@with_setup(reset_config, reset_config)
+def warm_start_values():
+    '''
+    Set a warm start from a solution of the first two of four hours.
+    Ensure that the start takes the solution's status and power,
+    then holds the last status and power.
+    '''
+    generator = make_cheap_gen(pmin=20, pmax=100, startupcost=50)
+    generator.index = 0
+    generator.set_initial_condition(power=0, status=0)
+    loads_times = make_loads_times(Pdt=[50, 60, 70, 80])
+    times = loads_times['times']
+    power_system = powersystems.PowerSystem(
+        [generator], loads_times['loads'], [])
+    solve.create_problem(power_system, times)
+
+    solved = times.times[:2]
+    power_system.set_warm_start(
+        times,
+        pd.DataFrame({'g0': [0, 50]}, index=solved),
+        pd.DataFrame({'g0': [0, 1]}, index=solved))
+    assert [value(generator.status(t)) for t in times] == [0, 1, 1, 1]
+    assert [value(generator.power(t)) for t in times] == [0, 50, 50, 50]
+    assert [value(generator.cost_startup(t)) for t in times] == [0, 50, 0, 0]
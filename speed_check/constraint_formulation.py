@@ -0,0 +1,55 @@
+from vbench.benchmark import Benchmark
+
+SECTION = 'Constraint formulation'
+
+common_setup = """
+from minpower_benchmark_utils import *
+"""
+
+# a 50 bus, 48 hour OPF-UC: build the model with one constraint per time
+# or with one indexed constraint per family
+statement = """
+create_problem(n_buses=50, n_hours=48, indexed_constraints={indexed})
+"""
+
+bm_scalar_constraints = Benchmark(statement.format(indexed=False),
+                                  common_setup, ncalls=1,
+                                  name='create_problem_scalar_constraints')
+
+bm_indexed_constraints = Benchmark(statement.format(indexed=True),
+                                   common_setup, ncalls=1,
+                                   name='create_problem_indexed_constraints')
+
+# a 10 bus, 96 hour rolling UC, with each min up/down time formulation
+# (the root gaps are reported by experiments/formulation_speed_check.py)
+updown_statement = """
+solve_rolling(n_buses=10, n_hours=96, updown_formulation='{formulation}')
+"""
+
+bm_updown_one_variable = Benchmark(
+    updown_statement.format(formulation='one variable sum of status'),
+    common_setup, ncalls=1, name='solve_rolling_updown_one_variable')
+
+bm_updown_three_variable = Benchmark(
+    updown_statement.format(formulation='three variable sum of status'),
+    common_setup, ncalls=1, name='solve_rolling_updown_three_variable')
+
+bm_updown_startup_windows = Benchmark(
+    updown_statement.format(formulation='three variable sum of startups'),
+    common_setup, ncalls=1, name='solve_rolling_updown_startup_windows')
+
+# a 10 bus, 96 hour rolling UC with ramp limits, with each ramp formulation
+# (the root gaps and node counts are reported by
+# experiments/formulation_speed_check.py)
+ramp_statement = """
+solve_rolling(n_buses=10, n_hours=96, ramp_rate=40,
+              ramp_formulation='{formulation}')
+"""
+
+bm_ramp_status_change = Benchmark(
+    ramp_statement.format(formulation='status change'),
+    common_setup, ncalls=1, name='solve_rolling_ramp_status_change')
+
+bm_ramp_above_minimum = Benchmark(
+    ramp_statement.format(formulation='generation above minimum'),
+    common_setup, ncalls=1, name='solve_rolling_ramp_above_minimum')
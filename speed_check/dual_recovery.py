@@ -0,0 +1,21 @@
+from vbench.benchmark import Benchmark
+
+SECTION = 'Prices'
+
+common_setup = """
+from minpower_benchmark_utils import *
+"""
+
+# a 10 bus, two day rolling UC: the MIP solves alone
+# and with a fixed-binary LP resolve for the prices
+statement = """
+solve_rolling(n_buses=10, n_hours=48, hours_commitment=24, duals={duals})
+"""
+
+bm_rolling_no_duals = Benchmark(statement.format(duals=False),
+                                common_setup, ncalls=1,
+                                name='rolling_uc_without_duals')
+
+bm_rolling_duals = Benchmark(statement.format(duals=True),
+                             common_setup, ncalls=1,
+                             name='rolling_uc_with_duals')
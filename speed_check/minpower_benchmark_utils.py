@@ -1,8 +1,90 @@
 import pandas as pd
 import numpy as np
 
-from minpower.powersystem import PowerSystem
-from minpower.generators import Generator
+from minpower import powersystems, schedule, solve
+from minpower.powersystems import PowerSystem
+from minpower.generators import Generator, Generator_nonControllable
 
 from minpower.config import user_config
 from minpower.solve import solve_problem
+
+
+def make_system(n_buses=10, n_hours=24, gens_per_bus=2, seed=0,
+                taps_per_line=0, wind_per_bus=0, observed_wind=False,
+                ramp_rate=None, identical_units=False):
+    '''
+    a ring network of buses, each with
+    a load, some (randomly priced) generators
+    and `wind_per_bus` wind generators (with no cost)
+    (and with each line split by `taps_per_line` buses
+    with no generators or loads).
+    With `observed_wind`, the first bus has a wind farm
+    with a forecast and observed values.
+    With a `ramp_rate`, the generators have ramp limits (up and down).
+    With `identical_units`, the generators at each bus have the same cost.
+    '''
+    rng = np.random.RandomState(seed)
+    times = schedule.make_times_basic(N=n_hours)
+    generators, loads, lines = [], [], []
+    for b in range(n_buses):
+        bus = 'bus{}'.format(b)
+        cost = rng.randint(10, 40)
+        for g in range(gens_per_bus):
+            if not identical_units and g > 0:
+                cost = rng.randint(10, 40)
+            generators.append(Generator(
+                name='g{}-{}'.format(b, g), bus=bus, index=len(generators),
+                costcurveequation='{}P'.format(cost),
+                pmin=20, pmax=200, minuptime=2, mindowntime=2,
+                rampratemax=ramp_rate,
+                rampratemin=-ramp_rate if ramp_rate else None))
+        for w in range(wind_per_bus):
+            generators.append(Generator_nonControllable(
+                name='w{}-{}'.format(b, w), bus=bus, index=len(generators),
+                schedule=pd.Series(rng.uniform(0, 10, n_hours),
+                                   index=times.strings.values)))
+        load = rng.uniform(0.3, 0.7, n_hours) * 200 * gens_per_bus
+        loads.append(powersystems.Load(
+            name='d{}'.format(b), bus=bus, index=b,
+            schedule=pd.Series(load, index=times)))
+        ends = [bus] + ['tap{}-{}'.format(b, k) for k in range(taps_per_line)]
+        ends.append('bus{}'.format((b + 1) % n_buses))
+        for frombus, tobus in zip(ends[:-1], ends[1:]):
+            lines.append(powersystems.Line(
+                name='k{}'.format(len(lines)), index=len(lines), pmax=100,
+                reactance=0.05 / (taps_per_line + 1),
+                frombus=frombus, tobus=tobus))
+    if observed_wind:
+        forecast = rng.uniform(100, 300, n_hours)
+        observed = np.maximum(forecast + rng.normal(0, 20, n_hours), 0)
+        generators.append(Generator_nonControllable(
+            name='wind', bus='bus0', index=len(generators),
+            schedule=pd.Series(forecast, index=times.strings.values),
+            observed_values=pd.Series(observed, index=times.strings.values)))
+    for gen in generators:
+        gen.set_initial_condition()
+    return PowerSystem(generators, loads, lines), times
+
+
+def create_problem(n_buses=10, n_hours=24, taps_per_line=0, wind_per_bus=0,
+                   **config):
+    '''build (but don't solve) a problem using some config options'''
+    user_config.update(config)
+    power_system, times = make_system(n_buses, n_hours,
+                                      taps_per_line=taps_per_line,
+                                      wind_per_bus=wind_per_bus)
+    solve.create_problem(power_system, times)
+    return power_system
+
+
+def solve_rolling(n_buses=10, n_hours=96, observed_wind=False,
+                  ramp_rate=None, gens_per_bus=2, identical_units=False,
+                  **config):
+    '''solve a rolling UC (in 24hr stages) using some config options'''
+    user_config.update(config)
+    power_system, times = make_system(n_buses, n_hours,
+                                      gens_per_bus=gens_per_bus,
+                                      observed_wind=observed_wind,
+                                      ramp_rate=ramp_rate,
+                                      identical_units=identical_units)
+    return solve.solve_multistage(power_system, times)
@@ -0,0 +1,71 @@
+from vbench.benchmark import Benchmark
+
+SECTION = 'Network size'
+
+common_setup = """
+from minpower_benchmark_utils import *
+"""
+
+# build a 24 hour OPF-UC on ring networks of increasing size
+# (the build time should grow with the number of lines, not buses squared)
+statement = """
+create_problem(n_buses={n_buses}, n_hours=24)
+"""
+
+bm_network_100_buses = Benchmark(statement.format(n_buses=100),
+                                 common_setup, ncalls=1,
+                                 name='create_problem_100_buses')
+
+bm_network_500_buses = Benchmark(statement.format(n_buses=500),
+                                 common_setup, ncalls=1,
+                                 name='create_problem_500_buses')
+
+# the 500 bus network without bus angles or line flow constraints
+bm_network_500_buses_ptdf = Benchmark(
+    "create_problem(n_buses=500, n_hours=24, network_formulation='ptdf')",
+    common_setup, ncalls=1, name='create_problem_500_buses_ptdf')
+
+# a 100 bus network with each line split by three buses with no
+# generators or loads, with and without eliminating those buses
+taps_statement = """
+create_problem(n_buses=100, n_hours=24, taps_per_line=3,
+               network_reduction={reduction})
+"""
+
+bm_network_100_buses_taps = Benchmark(
+    taps_statement.format(reduction=False),
+    common_setup, ncalls=1, name='create_problem_100_buses_taps')
+
+bm_network_100_buses_taps_reduced = Benchmark(
+    taps_statement.format(reduction=True),
+    common_setup, ncalls=1, name='create_problem_100_buses_taps_reduced')
+
+# a 100 bus network with five wind generators (with no cost) per bus,
+# with and without folding them into the buses' net loads
+wind_statement = """
+create_problem(n_buses=100, n_hours=24, wind_per_bus=5,
+               aggregate_noncontrollable={aggregate})
+"""
+
+bm_network_100_buses_wind = Benchmark(
+    wind_statement.format(aggregate=False),
+    common_setup, ncalls=1, name='create_problem_100_buses_wind')
+
+bm_network_100_buses_wind_aggregated = Benchmark(
+    wind_statement.format(aggregate=True),
+    common_setup, ncalls=1, name='create_problem_100_buses_wind_aggregated')
+
+# screen every single line outage of a 1000 line network, over 24 hours
+screening_setup = """
+import numpy as np
+from minpower import contingency
+rng = np.random.RandomState(0)
+lodf = rng.normal(scale=0.1, size=(1000, 1000))
+np.fill_diagonal(lodf, -1)
+flows = rng.normal(scale=50, size=(1000, 24))
+limits = np.repeat(120.0, 1000)
+"""
+
+bm_contingency_screening = Benchmark(
+    "contingency.screen(flows, lodf, np.arange(1000), -limits, limits)",
+    screening_setup, ncalls=1, name='contingency_screening_1000_lines')
@@ -0,0 +1,38 @@
+from vbench.benchmark import Benchmark
+
+SECTION = 'Rolling unit commitment'
+
+common_setup = """
+from minpower_benchmark_utils import *
+"""
+
+# a 10 bus, four day rolling UC: rebuild the model for each stage
+# or update the first stage's model
+statement = """
+solve_rolling(n_buses=10, n_hours=96, hours_commitment=24,
+              reuse_stage_model={reuse})
+"""
+
+bm_rolling_rebuilt = Benchmark(statement.format(reuse=False),
+                               common_setup, ncalls=1,
+                               name='rolling_uc_rebuilt_stages')
+
+bm_rolling_reused = Benchmark(statement.format(reuse=True),
+                              common_setup, ncalls=1,
+                              name='rolling_uc_reused_stage_model')
+
+# the rolling UC with a wind forecast, with each stage resolved for
+# the observed wind in a rebuilt model or in the solved model
+observed_statement = """
+solve_rolling(n_buses=10, n_hours=96, hours_commitment=24, hours_overlap=12,
+              observed_wind=True, deterministic_solve=True,
+              fast_resolve={fast})
+"""
+
+bm_rolling_observed_rebuilt = Benchmark(
+    observed_statement.format(fast=False),
+    common_setup, ncalls=1, name='rolling_uc_observed_resolve_rebuilt')
+
+bm_rolling_observed_fast = Benchmark(
+    observed_statement.format(fast=True),
+    common_setup, ncalls=1, name='rolling_uc_observed_resolve_in_place')
@@ -5,7 +5,11 @@ import os
 
 modules = [
     'unit_commitment',
-    'data_in_out'
+    'data_in_out',
+    'constraint_formulation',
+    'stage_model_reuse',
+    'dual_recovery',
+    'network_size',
     ]
 
 by_module = {}
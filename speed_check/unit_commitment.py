@@ -19,3 +19,59 @@ solve_problem(directory,
 
 bm_simple_uc = Benchmark(statement, setup, ncalls=1,
                        name='simple_uc')
+
+# hand the final conditions of a stage to the next stage
+# for a fleet of 10000 units
+fleet_setup = common_setup + """
+power_system, times = make_system(n_buses=2500, n_hours=24, gens_per_bus=4)
+fleet = power_system.fleet
+status = pd.DataFrame(
+    np.random.RandomState(0).randint(0, 2, (len(times), len(fleet))),
+    index=times.strings.index, columns=fleet.names)
+"""
+fleet_statement = """
+hours = fleet.hours_in_status(status, times.intervalhrs)
+fleet.set_final_conditions(status.ix[-1], fleet.values('pmin'), hours)
+fleet.set_initial_conditions()
+"""
+
+bm_fleet_handoff = Benchmark(fleet_statement, fleet_setup, ncalls=1,
+                             name='fleet_stage_handoff_10000_units')
+
+# a 4 bus, 96 hour rolling UC of 40 units (in groups of 10 identical
+# units) with the full model and with the identical units clustered
+# (the cost differences are reported by experiments/clustering_check.py)
+cluster_statement = """
+solve_rolling(n_buses=4, gens_per_bus=10, identical_units=True,
+              cluster_units={cluster})
+"""
+
+bm_identical_units_full = Benchmark(
+    cluster_statement.format(cluster=False),
+    common_setup, ncalls=1, name='solve_rolling_identical_units_full')
+
+bm_identical_units_clustered = Benchmark(
+    cluster_statement.format(cluster=True),
+    common_setup, ncalls=1, name='solve_rolling_identical_units_clustered')
+
+# the test cases with and without the presolve of the generator
+# constraints (the rows and columns removed are logged)
+presolve_statement = """
+user_config.presolve = {presolve}
+solve_problem('~/minpower/minpower/tests/{case}',
+    shell=False,
+    problemfile=False,
+    csv=False)
+"""
+
+bm_simple_uc_presolve = Benchmark(
+    presolve_statement.format(case='uc', presolve=True),
+    common_setup, ncalls=1, name='simple_uc_presolve')
+
+bm_rolling_uc = Benchmark(
+    presolve_statement.format(case='uc-rolling', presolve=False),
+    common_setup, ncalls=1, name='rolling_uc')
+
+bm_rolling_uc_presolve = Benchmark(
+    presolve_statement.format(case='uc-rolling', presolve=True),
+    common_setup, ncalls=1, name='rolling_uc_presolve')